@@ -0,0 +1,256 @@
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Triggers append every job posted, proposal, acceptance, completed contract and rating to
+# activity_events. RollupProcessor folds the rows past its watermark into hourly and daily
+# buckets (rollup_activity procedure), so the admin charts read one row per bucket and
+# category for the selected window, however large the base tables grow.
+
+BUCKET_SIZES = {'hour': timedelta(hours=1), 'day': timedelta(days=1)}
+
+METRICS = ['jobs_posted', 'proposals', 'acceptances', 'completed_contracts', 'revenue']
+
+# Units for TIMESTAMPDIFF when consecutive buckets are summed into one point (step > 1)
+BUCKET_UNITS = {'hour': "HOUR", 'day': "DAY"}
+
+
+def process_batch(batch_size=5000, settle_seconds=5):
+    """ Roll up one batch of new events; returns the number of events processed. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        result = cursor.callproc("rollup_activity", (batch_size, settle_seconds, 0))
+        cursor.close()
+    finally:
+        connection.close()
+    return result[2] or 0
+
+
+def process_pending(batch_size=5000, settle_seconds=5):
+    """ Roll up everything past the watermark, one batch per transaction. """
+    total = 0
+    while True:
+        processed = process_batch(batch_size, settle_seconds)
+        total += processed
+        if processed < batch_size:
+            return total
+
+
+def prune(retention_days=7, batch_size=10000):
+    """ Delete rolled-up events older than retention_days in batches; returns the number deleted.
+
+    Only events at or below the watermark go, so nothing is deleted before it is counted.
+    """
+    deleted = 0
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT last_event_id FROM rollup_watermarks WHERE name = 'activity'")
+        row = cursor.fetchone()
+        watermark = row[0] if row else 0
+        while True:
+            cursor.execute("""
+                DELETE FROM activity_events
+                WHERE id <= %s AND occurred_at < NOW() - INTERVAL %s DAY
+                ORDER BY id
+                LIMIT %s
+            """, (watermark, retention_days, batch_size))
+            connection.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        cursor.close()
+    finally:
+        connection.close()
+    return deleted
+
+
+class RollupProcessor:
+    """ Background worker that keeps activity_rollups up to date. """
+
+    def __init__(self, batch_size=5000, poll_interval=30.0, settle_seconds=5):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                processed = process_batch(self.batch_size, self.settle_seconds)
+            except Exception:
+                # The watermark only moves on commit, so a failed batch is simply retried
+                logger.exception("Activity rollup failed")
+                processed = 0
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="activity-rollups", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_processor = None
+_processor_lock = threading.Lock()
+
+
+def ensure_processor():
+    """ Start the process-wide rollup thread once if ANALYTICS_ROLLUP=thread; safe to call on every rerun.
+
+    Off by default: the rollups are kept current by one `python activity_rollups.py` for the deployment.
+    """
+    global _processor
+    if os.environ.get("ANALYTICS_ROLLUP", "none").lower() != "thread":
+        return None
+    with _processor_lock:
+        if _processor is None:
+            _processor = RollupProcessor(
+                batch_size=int(os.environ.get("ANALYTICS_ROLLUP_BATCH_SIZE", 5000)),
+                poll_interval=float(os.environ.get("ANALYTICS_ROLLUP_INTERVAL", 30)),
+                settle_seconds=int(os.environ.get("ANALYTICS_ROLLUP_SETTLE", 5)),
+            )
+            _processor.start()
+    return _processor
+
+
+def window_start(bucket, buckets, now=None):
+    """ Start of the earliest of the last `buckets` buckets, aligned to the bucket size. """
+    now = now or datetime.now()
+    if bucket == 'hour':
+        current = now.replace(minute=0, second=0, microsecond=0)
+    else:
+        current = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return current - BUCKET_SIZES[bucket] * (buckets - 1)
+
+
+def _period(bucket, since, step):
+    """ (SELECT expression, params) numbering the groups of step buckets from since. """
+    if step == 1:
+        return "bucket_start", []
+    return f"FLOOR(TIMESTAMPDIFF({BUCKET_UNITS[bucket]}, %s, bucket_start) / %s)", [since, step]
+
+
+def _period_starts(rows, bucket, since, step):
+    # since is aligned to the bucket size (window_start), so group n starts n * step buckets later
+    if step > 1:
+        for row in rows:
+            row['bucket_start'] = since + BUCKET_SIZES[bucket] * step * int(row['bucket_start'])
+    return rows
+
+
+def fetch_series(bucket, since, category=None, step=1):
+    """ Platform totals per bucket from `since` on; one row per non-empty bucket, oldest first.
+
+    With step > 1 every step consecutive buckets are summed into one row, starting at the first.
+    """
+    period, params = _period(bucket, since, step)
+    query = f"""
+        SELECT {period} AS bucket_start,
+               SUM(jobs_posted) AS jobs_posted,
+               SUM(proposals) AS proposals,
+               SUM(acceptances) AS acceptances,
+               SUM(completed_contracts) AS completed_contracts,
+               SUM(revenue) AS revenue,
+               SUM(rating_sum) / NULLIF(SUM(rating_count), 0) AS avg_rating
+        FROM activity_rollups
+        WHERE bucket = %s AND bucket_start >= %s
+    """
+    params += [bucket, since]
+    if category is not None:
+        query += " AND category = %s"
+        params.append(category)
+    query += " GROUP BY 1 ORDER BY 1"
+
+    connection = DatabaseManager.get_read_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return _period_starts(rows, bucket, since, step)
+
+
+def fetch_ratings_by_category(bucket, since, category=None, step=1):
+    """ Average rating per category and bucket from `since` on, for buckets with ratings.
+
+    step sums consecutive buckets as in fetch_series.
+    """
+    period, params = _period(bucket, since, step)
+    query = f"""
+        SELECT {period} AS bucket_start, category, SUM(rating_sum) / SUM(rating_count) AS avg_rating,
+               SUM(rating_count) AS ratings
+        FROM activity_rollups
+        WHERE bucket = %s AND bucket_start >= %s AND rating_count > 0
+    """
+    params += [bucket, since]
+    if category is not None:
+        query += " AND category = %s"
+        params.append(category)
+    query += " GROUP BY 1, category ORDER BY 1, category"
+
+    connection = DatabaseManager.get_read_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, tuple(params))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return _period_starts(rows, bucket, since, step)
+
+
+def lag():
+    """ Events not yet rolled up and when the watermark last moved. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT W.updated_at,
+                   (SELECT COUNT(*) FROM activity_events E WHERE E.id > W.last_event_id) AS pending_events
+            FROM rollup_watermarks W
+            WHERE W.name = 'activity'
+        """)
+        row = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+    return row or {'updated_at': None, 'pending_events': 0}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Roll up platform activity into hourly and daily buckets.")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("ANALYTICS_ROLLUP_BATCH_SIZE", 5000)))
+    parser.add_argument("--settle-seconds", type=int, default=int(os.environ.get("ANALYTICS_ROLLUP_SETTLE", 5)))
+    parser.add_argument("--poll-interval", type=float, default=float(os.environ.get("ANALYTICS_ROLLUP_INTERVAL", 30)))
+    parser.add_argument("--once", action="store_true", help="roll up everything pending and exit")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete rolled-up events older than --retention days and exit")
+    parser.add_argument("--retention", type=float,
+                        default=float(os.environ.get("ANALYTICS_EVENT_RETENTION_DAYS", 7)), help="days to keep")
+    args = parser.parse_args()
+
+    if args.prune:
+        print(f"deleted {prune(args.retention)} rolled-up events older than {args.retention:g} days")
+    elif args.once:
+        print(f"rolled up {process_pending(args.batch_size, args.settle_seconds)} events")
+    else:
+        processor = RollupProcessor(args.batch_size, args.poll_interval, args.settle_seconds)
+        try:
+            processor.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -1,8 +1,20 @@
 import streamlit as st
 import mysql.connector
-import plotly.graph_objs as go
-import plotly.express as px
-import pandas as pd
+from database import DatabaseManager
+import platform_stats
+import skill_index
+import bulk_import
+import query_metrics
+import read_cache
+import activity_rollups
+import job_expiry
+import archive
+import chart_data
+import data_export
+import offline_analytics
+import auth
+from job_feed import JOB_CATEGORIES
+import page_style
 
 
 
@@ -13,71 +25,33 @@ st.set_page_config(
     layout="wide"
 )
 
-# MySQL Database connection
+# Serve /metrics and /queries for this process when QUERY_METRICS_PORT is set
+query_metrics.ensure_metrics_server()
+
+# The rollup, expiry and archive workers normally run as their own services (python
+# activity_rollups.py, job_expiry.py, archive.py). Setting ANALYTICS_ROLLUP, JOB_EXPIRY or
+# ARCHIVE to "thread" runs them inside this process instead, for a single-process setup.
+activity_rollups.ensure_processor()
+job_expiry.ensure_scheduler()
+archive.ensure_archiver()
+
+# MySQL Database connection (shared process-wide pool, configured from DB_* environment variables)
 def connect_db():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="root",
-        database="dbmsproject"
-    )
+    return DatabaseManager.get_connection()
 
 # Custom CSS for a futuristic look
-st.markdown("""
-    <style>
-        .stApp {
-            background-color: #0f1729;
-            color: #e0e6f3;
-        }
-        .stTitle {
-            color: #4ecdc4 !important;
-            font-size: 2.5rem !important;
-            text-align: center;
-            text-shadow: 0 0 10px rgba(78, 205, 196, 0.5);
-        }
-        .stTabs [data-baseweb="tab-list"] {
-            background-color: #1a2747;
-            border-radius: 15px;
-        }
-        .stTabs [data-baseweb="tab"] {
-            color: #4ecdc4;
-            padding: 10px 20px;
-            transition: all 0.3s ease;
-        }
-        .stTabs [data-baseweb="tab"]:hover {
-            background-color: #2a3d5a;
-        }
-        .stTabs [data-baseweb="tab"][aria-selected="true"] {
-            background-color: #4ecdc4;
-            color: #0f1729;
-        }
-        .stTextInput > div > div > input {
-            background-color: #1a2747;
-            color: #e0e6f3;
-            border: 1px solid #4ecdc4;
-        }
-        .stButton > button {
-            background-color: #4ecdc4 !important;
-            color: #0f1729 !important;
-            border: none;
-            border-radius: 10px;
-            transition: all 0.3s ease;
-        }
-        .stButton > button:hover {
-            background-color: #3aa69b !important;
-            transform: scale(1.05);
-        }
-    </style>
-""", unsafe_allow_html=True)
+page_style.apply("admin")
 
 # Streamlit App
 st.title("Freelance Platform Dashboard")
 
-# Tab-based navigation
-tab1, tab2 = st.tabs(["👥 User Management", "📊 Platform Analytics"])
+# Sidebar navigation: unlike tabs, which run every tab's queries and charts on each rerun,
+# only the selected section runs (and only it imports pandas and plotly)
+view = st.sidebar.radio("Section", ["👥 User Management", "📊 Platform Analytics", "⏱️ Performance",
+                                    "📦 Offline Analytics"])
 
 # Add Users Section
-with tab1:
+if view == "👥 User Management":
     st.header("User Registration")
     
     # User type selection
@@ -94,6 +68,8 @@ with tab1:
                 phone = st.text_input("Phone", placeholder="1234567890")
                 skills = st.text_input("Skills", placeholder="Web Dev, Design")
             
+            password = st.text_input("Initial Password", type="password",
+                                     help="Leave empty to get a one-time reset code the freelancer sets a password with")
             rating = st.slider("Rating", 0.0, 5.0, 4.0)
             is_available = st.toggle("Currently Available")
 
@@ -101,19 +77,29 @@ with tab1:
             if submitted:
                 try:
                     db = connect_db()
-                    cursor = db.cursor()
-                    query = """
-                        INSERT INTO freelancer (name, email, phone, skills, rating, is_available)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (name, email, phone, skills, rating, int(is_available)))
-                    db.commit()
+                    try:
+                        cursor = db.cursor()
+                        reset_code, stored = (None, auth.hash_password(password)) if password else auth.new_reset_code()
+                        query = """
+                            INSERT INTO freelancer (name, email, phone, skills, rating, is_available, password_hash)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        """
+                        cursor.execute(query, (name, email, phone, skills, rating, int(is_available), stored))
+                        freelancer_id = cursor.lastrowid
+                        skill_index.index_freelancer_skills(cursor, freelancer_id, skills)
+                        db.commit()
+                        cursor.close()
+                    finally:
+                        db.close()
+                    platform_stats.invalidate()
+                    read_cache.invalidate(read_cache.freelancer(freelancer_id))
                     st.success("Freelancer registered successfully!")
+                    if reset_code:
+                        st.info("Share this one-time code; the freelancer sets a password with it under "
+                                "**Set a password** on the login page:")
+                        st.code(reset_code)
                 except Exception as e:
                     st.error(f"Registration failed: {e}")
-                finally:
-                    cursor.close()
-                    db.close()
 
     # Client Form
     else:
@@ -126,63 +112,112 @@ with tab1:
                 phone = st.text_input("Phone", placeholder="9876543210")
                 company_name = st.text_input("Company", placeholder="TechCorp")
             
+            password = st.text_input("Initial Password", type="password",
+                                     help="Leave empty to get a one-time reset code the client sets a password with")
             posted_jobs = st.number_input("Jobs Posted", min_value=0, step=1)
 
             submitted = st.form_submit_button("Register Client")
             if submitted:
                 try:
                     db = connect_db()
-                    cursor = db.cursor()
-                    query = """
-                        INSERT INTO client (name, email, phone, company_name, posted_jobs)
-                        VALUES (%s, %s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (name, email, phone, company_name, posted_jobs))
-                    db.commit()
+                    try:
+                        cursor = db.cursor()
+                        reset_code, stored = (None, auth.hash_password(password)) if password else auth.new_reset_code()
+                        query = """
+                            INSERT INTO client (name, email, phone, company_name, posted_jobs, password_hash)
+                            VALUES (%s, %s, %s, %s, %s, %s)
+                        """
+                        cursor.execute(query, (name, email, phone, company_name, posted_jobs, stored))
+                        client_id = cursor.lastrowid
+                        db.commit()
+                        cursor.close()
+                    finally:
+                        db.close()
+                    platform_stats.invalidate()
+                    read_cache.invalidate(read_cache.client(client_id))
                     st.success("Client registered successfully!")
+                    if reset_code:
+                        st.info("Share this one-time code; the client sets a password with it under "
+                                "**Set a password** on the login page:")
+                        st.code(reset_code)
                 except Exception as e:
                     st.error(f"Registration failed: {e}")
-                finally:
-                    cursor.close()
-                    db.close()
-
-# View Stats Section
-with tab2:
-    st.header("Platform Insights")
-
-    def get_stats():
-        db = connect_db()
-        cursor = db.cursor(dictionary=True)
 
-        stats = {}
-        cursor.execute("SELECT COUNT(*) AS total_clients FROM client")
-        stats['total_clients'] = cursor.fetchone()['total_clients']
+    # Password Reset Section
+    st.header("Password Reset")
+    with st.form("password_reset_form"):
+        reset_id = st.number_input(f"{user_type} ID", min_value=1, step=1)
+        if st.form_submit_button("Issue Reset Code"):
+            try:
+                code = auth.issue_reset_code(user_type.lower(), int(reset_id))
+            except Exception as e:
+                st.error(f"Reset failed: {e}")
+            else:
+                if code:
+                    st.info(f"The current password no longer works. Share this one-time code; it expires in "
+                            f"{auth.reset_ttl() / 3600:.0f} hours:")
+                    st.code(code)
+                else:
+                    st.warning(f"No {user_type.lower()} with ID {int(reset_id)}")
 
-        cursor.execute("SELECT COUNT(*) AS total_freelancers FROM freelancer")
-        stats['total_freelancers'] = cursor.fetchone()['total_freelancers']
+    # Bulk Import Section
+    st.header("Bulk Import")
+    st.caption(
+        "Freelancer columns: name, email, phone, skills, rating, is_available. "
+        "Client columns: name, email, phone, company_name, posted_jobs."
+    )
+    upload = st.file_uploader(f"{user_type} file", type=["csv", "parquet"], key="bulk_import_file")
 
-        cursor.execute("SELECT COUNT(*) AS total_jobs FROM jobs")
-        stats['total_jobs'] = cursor.fetchone()['total_jobs']
+    if upload is not None and st.button(f"Import {user_type}s"):
+        progress = st.progress(0.0, text="Starting import...")
+        total_size = max(upload.size, 1)
 
-        cursor.execute("SELECT COUNT(*) AS open_jobs FROM jobs WHERE status = 'Open'")
-        stats['open_jobs'] = cursor.fetchone()['open_jobs']
+        def show_progress(report):
+            # Parquet is read through pyarrow, so byte position is only meaningful for CSV
+            fraction = min(upload.tell() / total_size, 1.0) if upload.name.endswith(".csv") else 0.0
+            progress.progress(fraction, text=f"Processed {report['processed']:,} rows | "
+                                             f"inserted {report['inserted']:,} | rejected {report['rejected']:,}")
 
-        cursor.execute("SELECT COUNT(*) AS completed_contracts FROM contracts WHERE status = 'Completed'")
-        stats['completed_contracts'] = cursor.fetchone()['completed_contracts']
+        try:
+            report = bulk_import.import_file(
+                upload,
+                user_type.lower(),
+                file_format="parquet" if upload.name.endswith(".parquet") else "csv",
+                on_progress=show_progress,
+            )
+        except Exception as e:
+            st.error(f"Import failed: {e}")
+        else:
+            progress.progress(1.0, text="Import complete")
+            platform_stats.invalidate()
+            import matching
+            matching.invalidate()
+            rate = report['processed'] / report['seconds'] * 60 if report['seconds'] else 0
+            st.success(f"Imported {report['inserted']:,} of {report['processed']:,} rows "
+                       f"in {report['seconds']:.1f}s ({rate:,.0f} rows/min)")
+            if report['reset_codes']:
+                import pandas as pd
 
-        cursor.execute("SELECT SUM(payment) AS total_payment FROM contracts WHERE status = 'Completed'")
-        stats['total_payment'] = cursor.fetchone()['total_payment'] or 0
+                st.info("Imported accounts have no password yet. Each sets one with its one-time reset code.")
+                st.download_button("Download Reset Codes", pd.DataFrame(report['reset_codes']).to_csv(index=False),
+                                   "reset_codes.csv", "text/csv")
+            if report['rejects']:
+                import pandas as pd
 
-        cursor.execute("SELECT AVG(rating) AS avg_rating FROM freelancer WHERE rating IS NOT NULL")
-        stats['avg_freelancer_rating'] = cursor.fetchone()['avg_rating']
+                rejects = pd.DataFrame(report['rejects'])
+                st.warning(f"{report['rejected']:,} rows rejected" + (
+                    f"; the first {len(report['rejects']):,} are listed" if report['rejects_dropped'] else ""))
+                st.dataframe(rejects, use_container_width=True)
+                st.download_button("Download Rejects", rejects.to_csv(index=False), "rejects.csv", "text/csv")
 
-        cursor.close()
-        db.close()
+# View Stats Section
+elif view == "📊 Platform Analytics":
+    import plotly.graph_objs as go
 
-        return stats
+    st.header("Platform Insights")
 
-    # Fetch stats
-    stats = get_stats()
+    # Fetch stats (one query, cached across admin sessions for STATS_CACHE_TTL seconds)
+    stats = platform_stats.get_stats(force_refresh=st.button("Refresh Stats"))
 
     # Create columns for visualizations
     col1, col2 = st.columns(2)
@@ -208,18 +243,15 @@ with tab2:
 
     # Job Status Bar Chart
     with col2:
-        job_data = {
-            'Status': ['Total Jobs', 'Open Jobs', 'Completed Contracts'],
-            'Count': [stats['total_jobs'], stats['open_jobs'], stats['completed_contracts']]
-        }
-        fig2 = px.bar(
-            job_data, 
-            x='Status', 
-            y='Count', 
-            color_discrete_sequence=['#4ecdc4'],
-            title='Job Status Overview'
-        )
+        fig2 = go.Figure(data=[go.Bar(
+            x=['Total Jobs', 'Open Jobs', 'Completed Contracts'],
+            y=[stats['total_jobs'], stats['open_jobs'], stats['completed_contracts']],
+            marker_color='#4ecdc4'
+        )])
         fig2.update_layout(
+            title_text='Job Status Overview',
+            xaxis_title='Status',
+            yaxis_title='Count',
             paper_bgcolor='rgba(0,0,0,0)',
             plot_bgcolor='rgba(0,0,0,0)',
             font_color='#e0e6f3'
@@ -232,3 +264,198 @@ with tab2:
     metrics_cols[0].metric("Total Payment", f"${stats['total_payment']:.2f}", "Platform Revenue")
     metrics_cols[1].metric("Avg Freelancer Rating", f"{stats['avg_freelancer_rating']:.2f}/5.0", "Performance")
     metrics_cols[2].metric("Open Jobs", stats['open_jobs'], "Current Opportunities")
+
+    # Activity Over Time (reads only the rollup buckets inside the selected window)
+    st.subheader("Activity Over Time")
+    windows = {
+        "Last 48 hours": ('hour', 48),
+        "Last 30 days": ('day', 30),
+        "Last 365 days": ('day', 365),
+    }
+    window_cols = st.columns([2, 2, 1])
+    window = window_cols[0].selectbox("Window", list(windows))
+    category = window_cols[1].selectbox("Category", ["All", *JOB_CATEGORIES])
+    if window_cols[2].button("Roll Up Now"):
+        activity_rollups.process_pending()
+
+    # Summed and, past CHART_MAX_POINTS buckets, downsampled by MySQL; one array per axis
+    bucket, buckets = windows[window]
+    category_filter = None if category == "All" else category
+    series = chart_data.activity_series(bucket, buckets, category_filter)
+    per = "" if series['step'] == 1 else f" (per {series['step']} {bucket}s)"
+
+    chart_layout = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='#e0e6f3',
+                        xaxis_title=None, legend_title=None)
+    activity_cols = st.columns(2)
+    with activity_cols[0]:
+        fig3 = go.Figure(data=[go.Scatter(x=series['x'], y=series[metric], name=metric, mode='lines')
+                               for metric in ['jobs_posted', 'proposals', 'acceptances', 'completed_contracts']])
+        fig3.update_layout(title_text='Marketplace Activity' + per, yaxis_title='Count', **chart_layout)
+        st.plotly_chart(fig3)
+    with activity_cols[1]:
+        fig4 = go.Figure(data=[go.Bar(x=series['x'], y=series['revenue'], marker_color='#4ecdc4')])
+        fig4.update_layout(title_text='Completed Contract Revenue' + per, yaxis_title='Revenue ($)', **chart_layout)
+        st.plotly_chart(fig4)
+
+    ratings = chart_data.ratings_by_category(bucket, buckets, category_filter)
+    if not ratings:
+        st.info("No ratings in this window.")
+    else:
+        fig5 = go.Figure(data=[go.Scatter(x=line['x'], y=line['avg_rating'], name=name, mode='lines+markers')
+                               for name, line in ratings.items()])
+        fig5.update_layout(title_text='Average Rating by Category' + per, yaxis_title='Rating',
+                           yaxis_range=[0, 5.2], **chart_layout)
+        st.plotly_chart(fig5, use_container_width=True)
+
+    rollup_lag = activity_rollups.lag()
+    st.caption(f"Rollups last advanced {rollup_lag['updated_at'] or 'never'}; "
+               f"{rollup_lag['pending_events']:,} events waiting to be rolled up.")
+
+# Query Performance Section
+elif view == "⏱️ Performance":
+    import pandas as pd
+
+    st.header("Query Performance")
+
+    st.subheader("Connection Pools")
+    st.dataframe(pd.DataFrame(DatabaseManager.pool_stats()), use_container_width=True)
+    st.subheader("Read Routing")
+    routing = DatabaseManager.read_routing_stats()
+    replicas = routing.pop('replicas')
+    st.dataframe(pd.DataFrame([routing]), use_container_width=True)
+    if replicas:
+        st.dataframe(pd.DataFrame(replicas).rename(columns={'lag': "Lag (s)"}), use_container_width=True)
+    else:
+        st.caption("No replicas configured (DB_REPLICAS); every read goes to the primary.")
+    st.subheader("Read Cache")
+    st.dataframe(pd.DataFrame([read_cache.cache.stats()]), use_container_width=True)
+
+    st.subheader("Deadline Expiry")
+    if st.button("Close Expired Jobs Now"):
+        with st.spinner("Closing expired jobs..."):
+            run = job_expiry.run_pending(notify=job_expiry.notify_enabled())
+        st.success(f"Closed {run['jobs_closed']:,} jobs and rejected {run['proposals_rejected']:,} proposals "
+                   f"in {run['seconds']:.1f}s.")
+    expiry_totals, expiry_runs = job_expiry.stats()
+    st.dataframe(pd.DataFrame([expiry_totals]), use_container_width=True)
+    if expiry_runs:
+        st.dataframe(pd.DataFrame(expiry_runs), use_container_width=True)
+
+    st.subheader("History Archive")
+    st.caption(f"Proposals, contracts and ratings closed more than {archive.after_days():g} days ago "
+               "are moved to the archive tables.")
+    if st.button("Archive Closed History Now"):
+        with st.spinner("Archiving..."):
+            run = archive.run_pending(archive.after_days())
+        st.success(f"Archived {run['proposals']:,} proposals, {run['contracts']:,} contracts and "
+                   f"{run['ratings']:,} ratings in {run['seconds']:.1f}s.")
+    try:
+        st.dataframe(pd.DataFrame(archive.table_sizes()), use_container_width=True)
+    except mysql.connector.Error as err:
+        st.error(f"Error reading table sizes: {err}")
+    archive_totals, archive_runs = archive.stats()
+    st.dataframe(pd.DataFrame([archive_totals]), use_container_width=True)
+    if archive_runs:
+        st.dataframe(pd.DataFrame(archive_runs), use_container_width=True)
+
+    # This process records its own queries; the other dashboards are read from their /queries endpoints
+    sources = {"Admin dashboard (this process)": query_metrics.recorder.shapes()}
+    for url, shapes in query_metrics.peer_shapes().items():
+        if isinstance(shapes, Exception):
+            st.warning(f"Could not read query metrics from {url}: {shapes}")
+        else:
+            sources[url] = shapes
+
+    source_col, sort_col, reset_col = st.columns([3, 2, 1])
+    source = source_col.selectbox("Source", list(sources))
+    sort_by = sort_col.selectbox("Sort by", ["total_ms", "p95_ms", "max_ms", "mean_ms", "calls"])
+    if reset_col.button("Reset"):
+        query_metrics.recorder.reset()
+        st.rerun()
+
+    shapes = sorted(sources[source], key=lambda row: row[sort_by], reverse=True)[:25]
+    if not shapes:
+        st.info("No queries recorded yet.")
+    else:
+        columns = ["shape", "calls", "total_ms", "mean_ms", "p95_ms", "max_ms", "rows_per_call", "callers"]
+        st.dataframe(pd.DataFrame(shapes)[columns], use_container_width=True)
+
+        selected = st.selectbox("Query shape", range(len(shapes)), format_func=lambda i: shapes[i]['shape'][:150])
+        shape = shapes[selected]
+        st.code(shape['example'] or shape['shape'], language="sql")
+        st.caption(f"Slowest run: {shape['max_ms']:.1f} ms, parameter types {shape['param_types']}")
+        # CALL cannot be explained, and executemany statements keep no parameters to explain with
+        explainable = shape['operation'].split()[0] in ("SELECT", "UPDATE", "DELETE", "INSERT", "REPLACE")
+        if explainable and (shape['param_types'] is not None or "%s" not in (shape['example'] or "")):
+            if st.button("EXPLAIN", help="Runs with a stand-in value of each parameter type; values are not recorded"):
+                try:
+                    st.dataframe(pd.DataFrame(query_metrics.explain(shape['example'], shape['param_types'])),
+                                 use_container_width=True)
+                except mysql.connector.Error as err:
+                    st.error(f"Error: {err}")
+
+# Offline Analytics Section (reads exported Parquet/Arrow snapshots, never the live database)
+elif view == "📦 Offline Analytics":
+    import plotly.express as px
+
+    st.header("Offline Analytics")
+
+    export_cols = st.columns([2, 1])
+    export_format = export_cols[0].radio("Export format", list(data_export.FORMATS), horizontal=True)
+    if export_cols[1].button("Export Snapshot"):
+        progress = st.empty()
+        try:
+            exported = data_export.export_snapshot(
+                file_format=export_format,
+                on_progress=lambda table, rows: progress.text(f"Exporting {table}: {rows:,} rows")
+            )
+            data_export.prune_snapshots()
+            progress.success(f"Exported snapshot {exported['snapshot']} in {exported['seconds']}s")
+        except (mysql.connector.Error, OSError) as err:
+            progress.error(f"Export failed: {err}")
+
+    manifest = offline_analytics.latest_snapshot()
+    if manifest is None:
+        st.info(f"No snapshot in {data_export.export_dir()} yet. Export one above or run `python data_export.py`.")
+    else:
+        st.caption(f"Snapshot {manifest['snapshot']} ({manifest['format']}), exported {manifest['exported_at']}: "
+                   + ", ".join(f"{rows:,} {table}" for table, rows in manifest['rows'].items()))
+
+        def label_categories(frame):
+            return frame.assign(category=frame['category'].replace('', 'Uncategorized'))
+
+        offline_layout = dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', font_color='#e0e6f3')
+        offline_cols = st.columns(2)
+        with offline_cols[0]:
+            revenue = label_categories(offline_analytics.revenue_by_category(manifest))
+            fig6 = px.bar(revenue, x='category', y='revenue', color_discrete_sequence=['#4ecdc4'],
+                          title='Completed Contract Revenue by Category')
+            fig6.update_layout(**offline_layout)
+            st.plotly_chart(fig6)
+        with offline_cols[1]:
+            acceptance = label_categories(offline_analytics.acceptance_by_category(manifest))
+            fig7 = px.bar(acceptance, x='category', y=['Accepted', 'Rejected', 'Pending'],
+                          title='Proposals by Outcome and Category')
+            fig7.update_layout(legend_title=None, **offline_layout)
+            st.plotly_chart(fig7)
+
+        offline_cols = st.columns(2)
+        with offline_cols[0]:
+            distribution = offline_analytics.rating_distribution(manifest)
+            fig8 = px.bar(distribution, x='rating_score', y='ratings', color_discrete_sequence=['#ff6b6b'],
+                          title='Rating Distribution')
+            fig8.update_layout(**offline_layout)
+            st.plotly_chart(fig8)
+        with offline_cols[1]:
+            monthly = label_categories(offline_analytics.ratings_by_month(manifest))
+            fig9 = px.line(monthly, x='rating_month', y='avg_rating', color='category', markers=True,
+                           title='Average Rating by Month')
+            fig9.update_layout(legend_title=None, **offline_layout)
+            st.plotly_chart(fig9)
+
+        st.subheader("Budget vs Proposed Rate")
+        st.dataframe(label_categories(offline_analytics.budget_vs_rate(manifest)), use_container_width=True)
+        st.subheader("Acceptance Rate by Category")
+        st.dataframe(acceptance, use_container_width=True)
+        st.subheader("Top Freelancers by Revenue")
+        st.dataframe(offline_analytics.top_freelancers(manifest), use_container_width=True)
@@ -0,0 +1,337 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+
+import read_cache
+from database import DatabaseManager, run_in_transaction
+
+logger = logging.getLogger(__name__)
+
+# Rejected proposals, completed contracts and their ratings never leave the tables the
+# dashboards page through, so every list and index keeps growing with history nobody opens.
+# The archiver moves rows closed more than ARCHIVE_AFTER_DAYS ago (by updated_at, which the
+# closing update sets) into the *_archive tables, batch_size rows per transaction: rejected
+# proposals on their own, completed contracts together with their ratings and their job's
+# accepted proposal. Rows keep their ids, so a list that asks for full history pages through
+# the hot and archive tables as one (with_history). The materialized totals (platform_stats,
+# freelancer ratings) keep counting archived rows: @archiving_history tells the delete
+# triggers to leave them alone.
+
+HOT_TABLES = {'proposals': "proposals", 'contracts': "contracts", 'ratings': "ratings"}
+ARCHIVE_TABLES = {name: f"{table}_archive" for name, table in HOT_TABLES.items()}
+
+REJECTED_PROPOSALS_QUERY = """
+    SELECT P.id, P.job_id, P.freelancer_id, J.client_id
+    FROM proposals P JOIN jobs J ON J.id = P.job_id
+    WHERE P.status = 'Rejected' AND P.updated_at < %s
+    ORDER BY P.updated_at, P.id
+    LIMIT %s
+    FOR UPDATE OF P SKIP LOCKED
+"""
+
+COMPLETED_CONTRACTS_QUERY = """
+    SELECT C.id, C.job_id, C.freelancer_id, J.client_id
+    FROM contracts C JOIN jobs J ON J.id = C.job_id
+    WHERE C.status = 'Completed' AND C.updated_at < %s
+    ORDER BY C.updated_at, C.id
+    LIMIT %s
+    FOR UPDATE OF C SKIP LOCKED
+"""
+
+
+def with_history(query, params, order_by, limit=None):
+    """ query over the hot tables followed by the same query over the archive tables.
+
+    query names the tables it reads as {proposals}, {contracts} and {ratings}. With a limit,
+    each side is cut to limit rows before the union is ordered and cut again, so a keyset
+    page reads at most limit rows per side. Returns (sql, params).
+    """
+    hot, archived = query.format(**HOT_TABLES), query.format(**ARCHIVE_TABLES)
+    if limit is None:
+        return f"{hot} UNION ALL {archived} ORDER BY {order_by}", params + params
+    return (f"({hot} ORDER BY {order_by} LIMIT %s) UNION ALL ({archived} ORDER BY {order_by} LIMIT %s) "
+            f"ORDER BY {order_by} LIMIT %s", params + (limit,) + params + (limit,) + (limit,))
+
+
+def hot_only(query, params, order_by, limit=None):
+    """ The same query over the hot tables alone; the default for every list. """
+    sql = f"{query.format(**HOT_TABLES)} ORDER BY {order_by}"
+    return (sql, params) if limit is None else (f"{sql} LIMIT %s", params + (limit,))
+
+
+def _tags(rows):
+    return ({read_cache.job(job_id) for _, job_id, _, _ in rows}
+            | {read_cache.freelancer(freelancer_id) for _, _, freelancer_id, _ in rows}
+            | {read_cache.client(client_id) for _, _, _, client_id in rows})
+
+
+def archive_proposals_batch(cutoff, batch_size=1000):
+    """ Move up to batch_size proposals rejected before cutoff; returns the rows moved. """
+    def work(cursor):
+        cursor.execute(REJECTED_PROPOSALS_QUERY, (cutoff, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return []
+        ids = tuple(row[0] for row in rows)
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(f"""
+            INSERT INTO proposals_archive
+                (id, job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status, updated_at, closed_on)
+            SELECT id, job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status, updated_at,
+                   DATE(updated_at)
+            FROM proposals WHERE id IN ({placeholders})
+        """, ids)
+        cursor.execute(f"DELETE FROM proposals WHERE id IN ({placeholders})", ids)
+        return rows
+
+    rows = run_in_transaction(work)
+    if rows:
+        read_cache.invalidate(*_tags(rows))
+    return len(rows)
+
+
+def archive_contracts_batch(cutoff, batch_size=1000):
+    """ Move up to batch_size contracts completed before cutoff, with their ratings and accepted
+    proposal; returns (contracts, ratings, proposals) moved. """
+    def work(cursor):
+        cursor.execute(COMPLETED_CONTRACTS_QUERY, (cutoff, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return [], 0, 0
+        ids = tuple(row[0] for row in rows)
+        job_ids = tuple(row[1] for row in rows)
+        placeholders = ", ".join(["%s"] * len(ids))
+        # Ratings and proposals are filed under the year their contract was closed
+        cursor.execute(f"""
+            INSERT INTO ratings_archive (rating_id, contract_id, rating_score, review_text, rating_date, closed_on)
+            SELECT R.rating_id, R.contract_id, R.rating_score, R.review_text, R.rating_date, DATE(C.updated_at)
+            FROM ratings R JOIN contracts C ON C.id = R.contract_id
+            WHERE R.contract_id IN ({placeholders})
+        """, ids)
+        ratings = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO proposals_archive
+                (id, job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status, updated_at, closed_on)
+            SELECT P.id, P.job_id, P.cover_letter, P.proposed_rate, P.estimated_time, P.freelancer_id, P.status,
+                   P.updated_at, DATE(C.updated_at)
+            FROM proposals P JOIN contracts C ON C.job_id = P.job_id
+            WHERE C.id IN ({placeholders}) AND P.status = 'Accepted'
+        """, ids)
+        proposals = cursor.rowcount
+        cursor.execute(f"""
+            INSERT INTO contracts_archive (id, job_id, freelancer_id, payment, status, updated_at, closed_on)
+            SELECT id, job_id, freelancer_id, payment, status, updated_at, DATE(updated_at)
+            FROM contracts WHERE id IN ({placeholders})
+        """, ids)
+
+        # The variable lives on the pooled connection, so it is cleared even when a DELETE fails
+        # (e.g. a deadlock that run_in_transaction retries); otherwise the connection's next
+        # borrower would skip the totals maintenance of the delete triggers.
+        cursor.execute("SET @archiving_history = 1")
+        try:
+            cursor.execute(f"DELETE FROM ratings WHERE contract_id IN ({placeholders})", ids)
+            cursor.execute(f"DELETE FROM proposals WHERE job_id IN ({placeholders}) AND status = 'Accepted'", job_ids)
+            cursor.execute(f"DELETE FROM contracts WHERE id IN ({placeholders})", ids)
+        finally:
+            cursor.execute("SET @archiving_history = NULL")
+        return rows, ratings, proposals
+
+    rows, ratings, proposals = run_in_transaction(work)
+    if rows:
+        read_cache.invalidate(*_tags(rows))
+    return len(rows), ratings, proposals
+
+
+def ensure_partitions(years_ahead=1, today=None):
+    """ Split a yearly partition off pmax for each year up to years_ahead from now; returns those added.
+
+    Splitting is cheap while pmax is still empty, so this runs before rows for a year arrive.
+    """
+    last_year = (today or date.today()).year + years_ahead
+    added = []
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        for table in ARCHIVE_TABLES.values():
+            cursor.execute("""
+                SELECT PARTITION_NAME FROM information_schema.PARTITIONS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME <> 'pmax'
+            """, (table,))
+            years = [int(name[1:]) for (name,) in cursor.fetchall()]
+            missing = list(range(max(years) + 1, last_year + 1)) if years else []
+            if not missing:
+                continue
+            partitions = ", ".join(f"PARTITION p{year} VALUES LESS THAN ('{year + 1}-01-01')" for year in missing)
+            cursor.execute(f"ALTER TABLE {table} REORGANIZE PARTITION pmax INTO "
+                           f"({partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+            added += [f"{table}.p{year}" for year in missing]
+        cursor.close()
+    finally:
+        connection.close()
+    return added
+
+
+_totals = {'runs': 0, 'proposals': 0, 'contracts': 0, 'ratings': 0, 'failed_runs': 0}
+_recent_runs = deque(maxlen=20)
+_stats_lock = threading.Lock()
+
+
+def run_pending(after_days=180, batch_size=1000, max_batches=None, pause=0.05):
+    """ Archive everything closed more than after_days ago (or max_batches per kind); returns this run's metrics. """
+    cutoff = datetime.now() - timedelta(days=after_days)
+    run = {'started_at': datetime.now(), 'cutoff': cutoff, 'batches': 0, 'proposals': 0, 'contracts': 0,
+           'ratings': 0, 'seconds': 0.0, 'max_batch_seconds': 0.0, 'partitions_added': []}
+    start = time.perf_counter()
+
+    def drain(batch):
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            batch_start = time.perf_counter()
+            moved = batch()
+            if not moved:
+                break
+            batches += 1
+            run['batches'] += 1
+            run['max_batch_seconds'] = max(run['max_batch_seconds'], time.perf_counter() - batch_start)
+            if moved < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+    def proposals_batch():
+        moved = archive_proposals_batch(cutoff, batch_size)
+        run['proposals'] += moved
+        return moved
+
+    def contracts_batch():
+        contracts, ratings, proposals = archive_contracts_batch(cutoff, batch_size)
+        run['contracts'] += contracts
+        run['ratings'] += ratings
+        run['proposals'] += proposals
+        return contracts
+
+    try:
+        run['partitions_added'] = ensure_partitions()
+        drain(proposals_batch)
+        drain(contracts_batch)
+    finally:
+        run['seconds'] = time.perf_counter() - start
+        with _stats_lock:
+            _totals['runs'] += 1
+            for key in ('proposals', 'contracts', 'ratings'):
+                _totals[key] += run[key]
+            _recent_runs.append(run)
+    return run
+
+
+def stats():
+    """ Totals since the process started and the most recent runs, newest first. """
+    with _stats_lock:
+        return dict(_totals), list(reversed(_recent_runs))
+
+
+def table_sizes():
+    """ Approximate rows in each hot and archive table, from the table statistics. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT TABLE_NAME AS table_name, TABLE_ROWS AS approx_rows,
+                   ROUND((DATA_LENGTH + INDEX_LENGTH) / 1024 / 1024, 1) AS size_mb
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN (%s, %s, %s, %s, %s, %s)
+            ORDER BY TABLE_NAME
+        """, (*HOT_TABLES.values(), *ARCHIVE_TABLES.values()))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+
+class Archiver:
+    """ Background worker that archives closed history every interval seconds. """
+
+    def __init__(self, after_days=180, batch_size=1000, interval=3600.0, pause=0.05):
+        self.after_days = after_days
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                run_pending(self.after_days, self.batch_size, pause=self.pause)
+            except Exception:
+                # Every batch commits on its own, so a failure only leaves the rest for the next run
+                logger.exception("Archive run failed")
+                with _stats_lock:
+                    _totals['failed_runs'] += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_archiver = None
+_archiver_lock = threading.Lock()
+
+
+def after_days():
+    return float(os.environ.get("ARCHIVE_AFTER_DAYS", 180))
+
+
+def ensure_archiver():
+    """ Start the process-wide archive thread once if ARCHIVE=thread; safe to call on every rerun.
+
+    Off by default: history is archived by one `python archive.py` for the deployment.
+    """
+    global _archiver
+    if os.environ.get("ARCHIVE", "none").lower() != "thread":
+        return None
+    with _archiver_lock:
+        if _archiver is None:
+            _archiver = Archiver(
+                after_days=after_days(),
+                batch_size=int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000)),
+                interval=float(os.environ.get("ARCHIVE_INTERVAL", 3600)),
+                pause=float(os.environ.get("ARCHIVE_PAUSE", 0.05)),
+            )
+            _archiver.start()
+    return _archiver
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move closed proposals, contracts and ratings to the archive tables.")
+    parser.add_argument("--after-days", type=float, default=after_days(),
+                        help="archive history closed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("ARCHIVE_BATCH_SIZE", 1000)))
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("ARCHIVE_INTERVAL", 3600)))
+    parser.add_argument("--pause", type=float, default=float(os.environ.get("ARCHIVE_PAUSE", 0.05)))
+    parser.add_argument("--once", action="store_true", help="archive everything pending and exit")
+    args = parser.parse_args()
+
+    if args.once:
+        run = run_pending(args.after_days, args.batch_size, pause=args.pause)
+        print(f"archived {run['proposals']} proposals, {run['contracts']} contracts and {run['ratings']} ratings "
+              f"in {run['batches']} batches ({run['seconds']:.1f}s, longest batch {run['max_batch_seconds']:.3f}s)")
+        for partition in run['partitions_added']:
+            print(f"added partition {partition}")
+    else:
+        archiver = Archiver(args.after_days, args.batch_size, args.interval, args.pause)
+        try:
+            archiver.run_forever()
+        except KeyboardInterrupt:
+            pass
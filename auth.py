@@ -0,0 +1,463 @@
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import state_store
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Login for freelancers and clients. Passwords are stored as salted scrypt hashes in
+# <table>.password_hash. An account created without a password holds a reset marker there
+# instead (a one-time code's hash and expiry, see issue_reset_code) and cannot sign in until
+# the code is used to set a password. Accounts from before the column existed are upgraded
+# once with `python auth.py migrate-phone-passwords`. A successful login issues
+# a signed session token whose session lives in the state store until it expires, so
+# validating it on every Streamlit rerun needs no database query. With a shared STATE_STORE
+# and the same AUTH_SECRET, a token issued by one dashboard replica validates on all of them.
+
+USER_TABLES = {
+    'freelancer': ('freelancer', 'freelancer_id'),
+    'client': ('client', 'client_id'),
+}
+
+
+class RateLimitedError(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Too many failed logins; try again in {int(retry_after) + 1} seconds")
+        self.retry_after = retry_after
+
+
+# Password hashing
+
+def _scrypt_params():
+    return int(os.environ.get("AUTH_SCRYPT_N", 2 ** 14)), 8, 1
+
+
+def hash_password(password, params=None):
+    n, r, p = params or _scrypt_params()
+    salt = secrets.token_bytes(16)
+    digest = hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * 1024 * 1024, dklen=32)
+    return f"scrypt${n}${r}${p}${salt.hex()}${digest.hex()}"
+
+
+def verify_password(password, stored):
+    try:
+        scheme, n, r, p, salt, digest = stored.split("$")
+        if scheme != "scrypt":
+            return False
+        candidate = hashlib.scrypt(password.encode(), salt=bytes.fromhex(salt), n=int(n), r=int(r), p=int(p),
+                                   maxmem=256 * 1024 * 1024, dklen=len(digest) // 2)
+    except (ValueError, AttributeError):
+        return False
+    return hmac.compare_digest(candidate.hex(), digest)
+
+
+def needs_rehash(stored):
+    """ True when the hash was made with different scrypt parameters than the current ones. """
+    n, r, p = _scrypt_params()
+    return not stored.startswith(f"scrypt${n}${r}${p}$")
+
+
+# Password reset markers: "reset$<expires at>$<sha256 of the code>" in password_hash. Nothing
+# verifies as a password against one, and setting the password replaces it, so a code works
+# once. Codes are random, so an unsalted digest is enough to keep them out of the database.
+
+def reset_ttl():
+    return float(os.environ.get("AUTH_RESET_TTL", 3 * 24 * 3600))
+
+
+def new_reset_code():
+    """ (code, marker to store as the account's password_hash). """
+    code = secrets.token_urlsafe(12)
+    return code, f"reset${int(time.time() + reset_ttl())}${hashlib.sha256(code.encode()).hexdigest()}"
+
+
+def _reset_code_matches(marker, code):
+    try:
+        scheme, expires_at, digest = (marker or "").split("$")
+    except ValueError:
+        return False
+    return (scheme == "reset" and time.time() < int(expires_at)
+            and hmac.compare_digest(hashlib.sha256(code.encode()).hexdigest(), digest))
+
+
+# Verifying against this when the email is unknown keeps failed logins equally slow either way
+_DUMMY_HASH = None
+
+
+def _dummy_hash():
+    global _DUMMY_HASH
+    if _DUMMY_HASH is None:
+        _DUMMY_HASH = hash_password(secrets.token_hex(8))
+    return _DUMMY_HASH
+
+
+# Session tokens: "<payload>.<signature>", both urlsafe base64. The payload names the user and
+# the session id; the signature stops anyone from forging or altering one.
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def _signing_key():
+    global _secret
+    with _secret_lock:
+        if _secret is None:
+            configured = os.environ.get("AUTH_SECRET")
+            if configured:
+                _secret = configured.encode()
+            else:
+                # Tokens then only validate in this process, and not after a restart
+                logger.warning("AUTH_SECRET is not set; using a random per-process signing key")
+                _secret = secrets.token_bytes(32)
+        return _secret
+
+
+def _sign(payload):
+    return _b64encode(hmac.new(_signing_key(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(session_id, user_type, user_id, expires_at):
+    payload = _b64encode(json.dumps({'sid': session_id, 'type': user_type, 'uid': user_id,
+                                     'exp': int(expires_at)}, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def read_token(token):
+    """ The token's claims if its signature is valid and it has not expired, else None. """
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, AttributeError):
+        return None
+    if claims.get('exp', 0) < time.time():
+        return None
+    return claims
+
+
+class SessionStore:
+    """ Sessions by id in the state store, each dropped once it expires. """
+
+    def put(self, session_id, session):
+        state_store.get_store().set(f"session:{session_id}", session, ttl=session['expires_at'] - time.time())
+
+    def get(self, session_id):
+        session = state_store.get_store().get(f"session:{session_id}")
+        if session is not None and session['expires_at'] < time.time():
+            return None
+        return session
+
+    def delete(self, session_id):
+        state_store.get_store().delete(f"session:{session_id}")
+        state_store.get_store().delete(f"session_state:{session_id}")
+
+    def load_state(self, session_id):
+        """ Dashboard state saved for the session by save_state(), or {}. """
+        return state_store.get_store().get(f"session_state:{session_id}") or {}
+
+    def save_state(self, session_id, values, expires_at):
+        state_store.get_store().set(f"session_state:{session_id}", values, ttl=expires_at - time.time())
+
+
+class LoginRateLimiter:
+    """ Locks an account out after max_failures failed logins within window seconds.
+
+    Attempts are counted in the state store, so the limit holds across dashboard replicas. Each
+    attempt is counted with one atomic increment before the password is checked, and a
+    successful login clears the count, so concurrent guesses cannot slip past the limit between
+    a check and a later increment. The count starts at the first attempt and resets window
+    seconds later.
+    """
+
+    def __init__(self, max_failures=5, window=300.0):
+        self.max_failures = max_failures
+        self.window = window
+
+    @staticmethod
+    def _key(key):
+        return "login_failures:" + ":".join(str(part) for part in key)
+
+    def attempt(self, key):
+        """ Count one login attempt; raise RateLimitedError once it is beyond max_failures. """
+        store = state_store.get_store()
+        if store.incr(self._key(key), ttl=self.window) > self.max_failures:
+            # The window started with the first counted attempt; report what is left of it
+            remaining = store.ttl(self._key(key))
+            raise RateLimitedError(self.window if remaining is None else remaining)
+
+    def success(self, key):
+        state_store.get_store().delete(self._key(key))
+
+
+sessions = SessionStore()
+rate_limiter = LoginRateLimiter(
+    max_failures=int(os.environ.get("AUTH_MAX_FAILURES", 5)),
+    window=float(os.environ.get("AUTH_LOCKOUT_WINDOW", 300)),
+)
+_counters = {'logins': 0, 'failed_logins': 0, 'rate_limited': 0, 'validations': 0, 'rejected_tokens': 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+
+
+def session_ttl():
+    return float(os.environ.get("AUTH_SESSION_TTL", 8 * 3600))
+
+
+def set_password(user_type, user_id, password, cursor=None):
+    """ Store a new password hash; pass a cursor to take part in the caller's transaction. """
+    table, id_column = USER_TABLES[user_type]
+    query = f"UPDATE {table} SET password_hash = %s WHERE {id_column} = %s"
+    if cursor is not None:
+        cursor.execute(query, (hash_password(password), user_id))
+        return
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, (hash_password(password), user_id))
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def login(user_type, email, password):
+    """ Check the credentials and open a session; returns (token, session) or None.
+
+    Raises RateLimitedError while the account is locked out after repeated failures.
+    """
+    table, id_column = USER_TABLES[user_type]
+    email = email.strip().lower()
+    limit_key = (user_type, email)
+    try:
+        rate_limiter.attempt(limit_key)
+    except RateLimitedError:
+        _count('rate_limited')
+        raise
+
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        # Point lookup on the UNIQUE email index
+        cursor.execute(f"SELECT {id_column} AS user_id, name, password_hash FROM {table} WHERE email = %s",
+                       (email,))
+        user = cursor.fetchone()
+        cursor.close()
+    finally:
+        connection.close()
+
+    stored = user['password_hash'] if user is not None else None
+    if stored and stored.startswith("scrypt$"):
+        valid = verify_password(password, stored)
+    else:
+        # Unknown email, or an account without a password yet: just as slow, never valid
+        verify_password(password, _dummy_hash())
+        valid = False
+
+    if not valid:
+        # The attempt counted above stays counted as a failure
+        _count('failed_logins')
+        return None
+    rate_limiter.success(limit_key)
+
+    if needs_rehash(stored):
+        set_password(user_type, user['user_id'], password)
+
+    session_id = secrets.token_urlsafe(16)
+    expires_at = time.time() + session_ttl()
+    session = {'user_type': user_type, 'user_id': user['user_id'], 'name': user['name'], 'expires_at': expires_at}
+    sessions.put(session_id, session)
+    _count('logins')
+    return issue_token(session_id, user_type, user['user_id'], expires_at), session
+
+
+def issue_reset_code(user_type, user_id):
+    """ Replace the account's password with a one-time reset code and return the code.
+
+    The account cannot sign in until reset_password is called with the code.
+    """
+    table, id_column = USER_TABLES[user_type]
+    code, marker = new_reset_code()
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"UPDATE {table} SET password_hash = %s WHERE {id_column} = %s", (marker, user_id))
+        found = cursor.rowcount
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    return code if found else None
+
+
+def reset_password(user_type, email, code, password):
+    """ Set the password of the account with this email if code is its current reset code; returns True if set.
+
+    Attempts count against the same lockout as logins. Raises RateLimitedError while it holds.
+    """
+    table, id_column = USER_TABLES[user_type]
+    email = email.strip().lower()
+    limit_key = (user_type, email)
+    rate_limiter.attempt(limit_key)
+
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"SELECT {id_column}, password_hash FROM {table} WHERE email = %s", (email,))
+        user = cursor.fetchone()
+        if user is None or not _reset_code_matches(user[1], code.strip()):
+            connection.rollback()
+            _count('failed_logins')
+            return False
+        # Conditional on the marker, so two concurrent resets with the same code cannot both win
+        cursor.execute(f"UPDATE {table} SET password_hash = %s WHERE {id_column} = %s AND password_hash = %s",
+                       (hash_password(password), user[0], user[1]))
+        changed = cursor.rowcount
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    if changed:
+        rate_limiter.success(limit_key)
+    return bool(changed)
+
+
+def migrate_phone_passwords(batch_size=500, workers=4):
+    """ One-off upgrade of accounts from before password_hash existed; returns the accounts upgraded.
+
+    Those accounts signed in with their phone number, which becomes their hashed password;
+    accounts without a phone get a reset marker with no known code, so an admin has to issue
+    one. Only NULL hashes are touched: every account created since has a hash or a marker.
+    """
+    upgraded = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for table, id_column in USER_TABLES.values():
+            while True:
+                connection = DatabaseManager.get_connection()
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(f"SELECT {id_column}, phone FROM {table} WHERE password_hash IS NULL "
+                                   f"ORDER BY {id_column} LIMIT %s", (batch_size,))
+                    rows = cursor.fetchall()
+                    if not rows:
+                        cursor.close()
+                        break
+                    # scrypt releases the GIL, so the batch is hashed in parallel
+                    hashes = executor.map(lambda row: hash_password(row[1]) if row[1] else new_reset_code()[1], rows)
+                    cursor.executemany(f"UPDATE {table} SET password_hash = %s "
+                                       f"WHERE {id_column} = %s AND password_hash IS NULL",
+                                       [(stored, row[0]) for stored, row in zip(hashes, rows)])
+                    connection.commit()
+                    cursor.close()
+                finally:
+                    connection.close()
+                upgraded += len(rows)
+    return upgraded
+
+
+def validate(token, user_type=None):
+    """ The session behind token, or None. Served from the session store without touching MySQL. """
+    if not token:
+        return None
+    _count('validations')
+    claims = read_token(token)
+    session = sessions.get(claims['sid']) if claims else None
+    if session is None or (user_type is not None and session['user_type'] != user_type):
+        _count('rejected_tokens')
+        return None
+    return session
+
+
+def logout(token):
+    claims = read_token(token) if token else None
+    if claims:
+        sessions.delete(claims['sid'])
+
+
+def load_state(token):
+    """ Dashboard state saved under the token's session, or {} when there is none. """
+    claims = read_token(token) if token else None
+    return sessions.load_state(claims['sid']) if claims else {}
+
+
+def save_state(token, values):
+    """ Save JSON-serializable dashboard state for the session until it expires. """
+    claims = read_token(token) if token else None
+    if claims:
+        sessions.save_state(claims['sid'], values, claims['exp'])
+
+
+# Resume codes: what a shared-store deployment puts in the page URL instead of the session token.
+# A code stands for one session for AUTH_RESUME_TTL seconds and can be exchanged only once; the
+# dashboard replaces it with a fresh one as soon as it is used and whenever it gets old, so a
+# URL that ends up in browser history, proxy logs or a Referer header stops working shortly.
+
+def resume_ttl():
+    return float(os.environ.get("AUTH_RESUME_TTL", 600))
+
+
+def issue_resume_code(token):
+    code = secrets.token_urlsafe(24)
+    state_store.get_store().set(f"resume_code:{code}", token, ttl=resume_ttl())
+    return code
+
+
+def redeem_resume_code(code):
+    """ The session token behind code, or None; a code is only ever redeemed once. """
+    store = state_store.get_store()
+    # The atomic increment decides which of two concurrent redemptions wins
+    if not code or store.incr(f"resume_redeemed:{code}", ttl=resume_ttl()) != 1:
+        return None
+    token = store.get(f"resume_code:{code}")
+    store.delete(f"resume_code:{code}")
+    return token
+
+
+def revoke_resume_code(code):
+    if code:
+        state_store.get_store().delete(f"resume_code:{code}")
+
+
+def stats():
+    with _counters_lock:
+        return dict(_counters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sign-in maintenance for freelancer and client accounts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate-phone-passwords",
+                                  help="hash the phone number of pre-password accounts as their password (run once)")
+    migrate.add_argument("--batch-size", type=int, default=500)
+    reset = commands.add_parser("reset-code", help="issue a one-time code the user sets a new password with")
+    reset.add_argument("user_type", choices=list(USER_TABLES))
+    reset.add_argument("user_id", type=int)
+    args = parser.parse_args()
+
+    if args.command == "migrate-phone-passwords":
+        print(f"upgraded {migrate_phone_passwords(args.batch_size)} accounts")
+    else:
+        code = issue_reset_code(args.user_type, args.user_id)
+        print(code if code else f"no {args.user_type} with id {args.user_id}")
@@ -0,0 +1,184 @@
+"""Concurrency stress test for accept_proposal.
+
+    DB_NAME=dbmsproject_bench python benchmarks/accept_stress.py --setup --recreate --workers 32
+
+Two scenarios, each fired from --workers threads through proposal_review.accept_proposal
+(the path the client dashboard uses):
+
+  hot job     one freshly inserted job with --hot-proposals pending proposals, all accepted at once
+  many jobs   every pending proposal of --jobs open jobs, shuffled and accepted at once
+
+Afterwards it checks that every job ended with exactly one contract and one accepted
+proposal, and that the p99 latency stayed under --max-p99-ms. Exits non-zero if either check
+fails, so it can gate changes to the acceptance path.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import harness
+import marketplace
+
+import proposal_review
+from database import DatabaseManager, transaction_stats
+from query_benchmark import column
+
+
+def create_hot_job(proposals, seed):
+    """ One open job with the given number of pending proposals from distinct freelancers. """
+    rng = random.Random(seed)
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT MIN(client_id) FROM client")
+        client_id = cursor.fetchone()[0]
+        cursor.execute("""
+            INSERT INTO jobs (title, budget, deadline, description, status, category, client_id)
+            VALUES ('Stress test job', 1000, CURDATE() + INTERVAL 30 DAY, 'Accepted concurrently', 'Open', 'Writing', %s)
+        """, (client_id,))
+        job_id = cursor.lastrowid
+        cursor.execute("SELECT freelancer_id FROM freelancer ORDER BY freelancer_id LIMIT %s", (proposals,))
+        freelancers = [row[0] for row in cursor.fetchall()]
+        cursor.executemany("""
+            INSERT INTO proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+            VALUES (%s, 'Pick me', %s, 7, %s, 'Pending')
+        """, [(job_id, round(rng.uniform(500, 1500), 2), freelancers[i % len(freelancers)]) for i in range(proposals)])
+        connection.commit()
+        cursor.execute("SELECT id FROM proposals WHERE job_id = %s", (job_id,))
+        proposal_ids = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        connection.close()
+    return [job_id], proposal_ids
+
+
+def pending_on_open_jobs(jobs, seed):
+    job_ids = column("""
+        SELECT J.id
+        FROM jobs J JOIN proposals P ON P.job_id = J.id
+        WHERE J.status = 'Open' AND P.status = 'Pending'
+        GROUP BY J.id
+        HAVING COUNT(*) > 1
+        ORDER BY J.id
+        LIMIT %s
+    """, (jobs,))
+    if not job_ids:
+        return [], []
+    placeholders = ", ".join(["%s"] * len(job_ids))
+    proposal_ids = column(f"SELECT id FROM proposals WHERE status = 'Pending' AND job_id IN ({placeholders})",
+                          tuple(job_ids))
+    random.Random(seed).shuffle(proposal_ids)
+    return job_ids, proposal_ids
+
+
+def fire(proposal_ids, workers):
+    """ Accept every proposal concurrently; returns (latencies, accepted count, errors). """
+    samples, errors = [], []
+    accepted = 0
+    lock = threading.Lock()
+    start_line = threading.Barrier(min(workers, len(proposal_ids)) or 1)
+
+    def accept(index):
+        nonlocal accepted
+        if index < start_line.parties:
+            start_line.wait()  # release the first wave together
+        call_start = time.perf_counter()
+        try:
+            ok, _ = proposal_review.accept_proposal(proposal_ids[index])
+            error = None
+        except Exception as e:
+            ok, error = False, e
+        elapsed = time.perf_counter() - call_start
+        with lock:
+            samples.append(elapsed)
+            accepted += int(ok)
+            if error is not None:
+                errors.append(error)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(accept, range(len(proposal_ids))))
+    return samples, accepted, errors
+
+
+def violations(job_ids):
+    """ Jobs that do not have exactly one contract and exactly one accepted proposal. """
+    placeholders = ", ".join(["%s"] * len(job_ids))
+    return column(f"""
+        SELECT J.id
+        FROM jobs J
+        LEFT JOIN (SELECT job_id, COUNT(*) AS n FROM contracts WHERE job_id IN ({placeholders}) GROUP BY job_id) C
+            ON C.job_id = J.id
+        LEFT JOIN (SELECT job_id, COUNT(*) AS n FROM proposals
+                   WHERE status = 'Accepted' AND job_id IN ({placeholders}) GROUP BY job_id) P
+            ON P.job_id = J.id
+        WHERE J.id IN ({placeholders})
+        AND (COALESCE(C.n, 0) <> 1 OR COALESCE(P.n, 0) <> 1 OR J.status <> 'Closed')
+    """, tuple(job_ids) * 3)
+
+
+def run(args):
+    scenarios = {
+        'hot job': create_hot_job(args.hot_proposals, args.seed),
+        'many jobs': pending_on_open_jobs(args.jobs, args.seed),
+    }
+    results, failed = {}, False
+    for name, (job_ids, proposal_ids) in scenarios.items():
+        if not proposal_ids:
+            print(f"{name}: no pending proposals, skipped")
+            continue
+        print(f"running {name}: {len(proposal_ids)} accepts on {len(job_ids)} jobs with {args.workers} workers...")
+        retries_before = transaction_stats()['retries']
+        start = time.perf_counter()
+        samples, accepted, errors = fire(proposal_ids, args.workers)
+        summary = harness.summarize(samples, time.perf_counter() - start)
+        summary.update(accepted=accepted, errors=len(errors), retries=transaction_stats()['retries'] - retries_before)
+        results[name] = summary
+
+        bad_jobs = violations(job_ids)
+        print(f"  accepted {accepted} of {len(proposal_ids)}, {len(errors)} errors, {summary['retries']} deadlock retries")
+        for error in errors[:5]:
+            print(f"  error: {error}")
+        if bad_jobs or accepted != len(job_ids):
+            print(f"  FAIL: {len(bad_jobs)} jobs without exactly one contract (e.g. {bad_jobs[:5]}), "
+                  f"{accepted} accepts for {len(job_ids)} jobs")
+            failed = True
+        if summary['p99'] > args.max_p99_ms:
+            print(f"  FAIL: p99 {summary['p99']:.1f} ms above {args.max_p99_ms} ms")
+            failed = True
+    return results, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fire concurrent accept_proposal calls and verify one contract per job.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--hot-proposals", type=int, default=2000, help="proposals competing for the single hot job")
+    parser.add_argument("--jobs", type=int, default=500, help="open jobs whose proposals are all accepted at once")
+    parser.add_argument("--max-p99-ms", type=float, default=500.0)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    # One pooled connection per worker thread
+    os.environ.setdefault("DB_POOL_SIZE", str(args.workers))
+    os.environ.setdefault("DB_POOL_TIMEOUT", "60")
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    results, failed = run(args)
+    harness.print_report(results, title=f"\n{args.workers} concurrent workers")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(workers=args.workers, scale=args.scale))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,137 @@
+"""Hot/cold split of closed history: the dashboards' lists before and after archiving.
+
+    DB_NAME=dbmsproject_bench python benchmarks/archive_history.py --setup --recreate --scale 5
+
+The synthetic marketplace closes every proposal and contract at generation time, so --setup
+also spreads their updated_at over the last --history-days days. The run measures, with the
+read cache off (as in query_benchmark):
+
+  client accepted / rejected   first page of a client's decided proposals
+  freelancer contracts         a freelancer's contract list
+  freelancer ratings           a freelancer's rating rows
+
+before archiving, after archive.run_pending(--after-days), and after with full history
+requested (the union of hot and archive tables). Exits non-zero if archiving changed the
+platform totals, the freelancers' rating totals or the number of history rows.
+"""
+import argparse
+import random
+import sys
+
+import harness
+import marketplace
+
+import archive
+import platform_stats
+from client_work import ClientWork
+from database import DatabaseManager
+from freelancer_dashboard import ContractService, RatingService
+from query_benchmark import column
+
+
+def scalar(query, params=()):
+    return column(query, params)[0]
+
+
+def backdate(history_days):
+    """ Spread the closing time of decided proposals and completed contracts over history_days. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        # Setting updated_at explicitly keeps ON UPDATE CURRENT_TIMESTAMP from overwriting it
+        cursor.execute("""
+            UPDATE proposals SET updated_at = NOW() - INTERVAL (id MOD %s) DAY WHERE status <> 'Pending'
+        """, (history_days,))
+        cursor.execute("""
+            UPDATE contracts SET updated_at = NOW() - INTERVAL (id MOD %s) DAY WHERE status = 'Completed'
+        """, (history_days,))
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def snapshot():
+    """ Everything archiving must preserve. """
+    return {
+        'stats': {key: float(value or 0) for key, value in platform_stats.fetch_stats(summary=False).items()},
+        'summary': {key: float(value or 0) for key, value in platform_stats.fetch_stats(summary=True).items()},
+        'rating_total': float(scalar("SELECT COALESCE(SUM(rating_total), 0) FROM freelancer")),
+        'rating_count': float(scalar("SELECT COALESCE(SUM(rating_count), 0) FROM freelancer")),
+        'rows': {name: scalar(f"SELECT COUNT(*) FROM {hot}") + scalar(f"SELECT COUNT(*) FROM {archive.ARCHIVE_TABLES[name]}")
+                 for name, hot in archive.HOT_TABLES.items()},
+    }
+
+
+def cases(clients, freelancers, history):
+    rng = random.Random(1)
+    return {
+        'client accepted': lambda i: ClientWork.proposals(rng.choice(clients), "Accepted", include_archive=history),
+        'client rejected': lambda i: ClientWork.proposals(rng.choice(clients), "Rejected", include_archive=history),
+        'freelancer contracts': lambda i: ContractService.fetch_contracts(rng.choice(freelancers), history),
+        'freelancer ratings': lambda i: RatingService.fetch_ratings(rng.choice(freelancers), history),
+    }
+
+
+def measure_all(label, clients, freelancers, iterations, history=False):
+    results = {}
+    for name, operation in cases(clients, freelancers, history).items():
+        print(f"running {name} ({label})...")
+        results[f"{name} ({label})"] = harness.measure(operation, iterations, warmup=10)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the dashboards' history lists before and after archiving.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--history-days", type=int, default=720, help="spread closing times over this many days")
+    parser.add_argument("--after-days", type=float, default=180)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+        backdate(args.history_days)
+
+    # The busiest users, whose lists grow the most with history
+    clients = column("""
+        SELECT J.client_id FROM jobs J JOIN proposals P ON P.job_id = J.id
+        GROUP BY J.client_id ORDER BY COUNT(*) DESC LIMIT 50
+    """)
+    freelancers = column("SELECT freelancer_id FROM contracts GROUP BY freelancer_id ORDER BY COUNT(*) DESC LIMIT 50")
+
+    before = snapshot()
+    results = measure_all("hot, before", clients, freelancers, args.iterations)
+
+    print(f"archiving history closed more than {args.after_days:g} days ago...")
+    run = archive.run_pending(args.after_days, args.batch_size, pause=0)
+    print(f"  archived {run['proposals']:,} proposals, {run['contracts']:,} contracts and {run['ratings']:,} ratings "
+          f"in {run['seconds']:.1f}s (longest batch {run['max_batch_seconds']:.3f}s)")
+
+    results.update(measure_all("hot, after", clients, freelancers, args.iterations))
+    results.update(measure_all("full history", clients, freelancers, args.iterations, history=True))
+
+    after = snapshot()
+    harness.print_report(results, title=f"\nhistory over {args.history_days} days, archived after {args.after_days:g}")
+    for row in archive.table_sizes():
+        print(f"  {row['table_name']:<20} ~{row['approx_rows'] or 0:>12,} rows  {row['size_mb']:>8} MB")
+    passed = True
+    for key in before:
+        if before[key] != after[key]:
+            print(f"  {key} changed: {before[key]} -> {after[key]}")
+            passed = False
+    print("  totals, rating totals and history rows unchanged" if passed else "  archiving lost or double-counted rows")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(history_days=args.history_days,
+                                                                    after_days=args.after_days, archive_run=run))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,121 @@
+"""Login throughput and session validation cost.
+
+    DB_NAME=dbmsproject_bench python benchmarks/auth_benchmark.py --setup --recreate --users 200 --workers 8
+
+Gives --users freelancers a password, then:
+
+  login        logs every user in from --workers threads (one scrypt verify and one indexed
+               email lookup each) and reports logins per second
+  validate     validates the issued tokens --validations times, the way every dashboard rerun
+               does, and counts the database queries issued meanwhile (expected: zero)
+  lockout      fails logins against one account until the rate limiter locks it
+
+Exits non-zero if session validation touched the database or the lockout did not engage.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import harness
+import marketplace
+
+import auth
+import query_metrics
+from database import DatabaseManager
+
+# Queries issued during validation are counted through the query recorder
+os.environ["QUERY_METRICS"] = "on"
+
+
+def pick_users(count):
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT freelancer_id, email FROM freelancer ORDER BY freelancer_id LIMIT %s", (count,))
+        users = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return users
+
+
+def queries_recorded():
+    return sum(shape['calls'] for shape in query_metrics.recorder.shapes())
+
+
+def run(users, workers, validations):
+    results = {}
+    password = "correct horse battery staple"
+
+    print(f"setting passwords for {len(users)} users...")
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda user: auth.set_password("freelancer", user[0], password), users))
+
+    print(f"running login with {workers} workers...")
+    samples = []
+
+    def login(user):
+        start = time.perf_counter()
+        result = auth.login("freelancer", user[1], password)
+        samples.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        logins = list(executor.map(login, users))
+    results['login'] = harness.summarize(samples, time.perf_counter() - start)
+    tokens = [result[0] for result in logins if result]
+    failed = len(users) - len(tokens)
+
+    print(f"running validate ({validations} validations)...")
+    queries_before = queries_recorded()
+    results['validate'] = harness.measure(lambda i: auth.validate(tokens[i % len(tokens)], "freelancer"),
+                                          validations)
+    validation_queries = queries_recorded() - queries_before
+    results['validate']['db_queries'] = validation_queries
+
+    print("running lockout...")
+    victim = users[0][1]
+    attempts = 0
+    locked = False
+    while attempts < auth.rate_limiter.max_failures + 1:
+        try:
+            auth.login("freelancer", victim, "wrong password")
+        except auth.RateLimitedError:
+            locked = True
+            break
+        attempts += 1
+    auth.rate_limiter.success(("freelancer", victim.strip().lower()))
+
+    print(f"  {failed} logins failed; validation issued {validation_queries} database queries; "
+          f"lockout after {attempts} failures: {'yes' if locked else 'NO'}")
+    return results, failed == 0 and validation_queries == 0 and locked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure login throughput and database-free session validation.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--validations", type=int, default=100000)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    results, passed = run(pick_users(args.users), args.workers, args.validations)
+    harness.print_report(results, title=f"\n{args.users} users, {args.workers} workers")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(users=args.users, workers=args.workers))
+    sys.exit(0 if passed else 1)
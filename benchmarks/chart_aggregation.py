@@ -0,0 +1,118 @@
+"""Chart data counted by MySQL versus built from raw rows in pandas.
+
+    DB_NAME=dbmsproject_bench python benchmarks/chart_aggregation.py --setup --recreate --scale 5
+
+With the read cache off (as in query_benchmark), times building each chart and reports the
+size of the figure JSON sent to the browser:
+
+  ratings chart (rows)        what the freelancer's rating chart did: every rating row of the
+                              busiest freelancers into a DataFrame, value_counts(), px.bar
+  ratings chart (GROUP BY)    chart_data.rating_distribution and one go.Bar
+  activity <window> (rows)    the admin activity charts as before: every bucket of the window
+                              reindexed in a DataFrame and drawn with plotly.express
+  activity <window> (arrays)  chart_data.activity_series, downsampled to --max-points
+
+Activity is only charted once rollups exist; --setup rolls up the synthetic events first.
+"""
+import argparse
+import os
+
+import harness
+import marketplace
+
+import activity_rollups
+import chart_data
+from database import DatabaseManager
+from freelancer_dashboard import RatingService
+from query_benchmark import column
+
+WINDOWS = {'48 hours': ('hour', 48), '30 days': ('day', 30), '365 days': ('day', 365)}
+ACTIVITY = ['jobs_posted', 'proposals', 'acceptances', 'completed_contracts']
+
+
+def ratings_rows(freelancer_id):
+    import pandas as pd
+    import plotly.express as px
+
+    _, ratings = RatingService.fetch_ratings(freelancer_id)
+    counts = pd.DataFrame(ratings)['rating_score'].value_counts().sort_index()
+    return px.bar(counts, x=counts.index, y=counts.values, color=counts.index, color_continuous_scale="Viridis")
+
+
+def ratings_grouped(freelancer_id):
+    import plotly.graph_objs as go
+
+    distribution = chart_data.rating_distribution(freelancer_id)
+    return go.Figure(data=[go.Bar(x=distribution['scores'], y=distribution['counts'],
+                                  marker=dict(color=distribution['scores'], colorscale="Viridis"))])
+
+
+def activity_rows(bucket, buckets):
+    import pandas as pd
+    import plotly.express as px
+
+    since = activity_rollups.window_start(bucket, buckets)
+    series = pd.DataFrame(activity_rollups.fetch_series(bucket, since),
+                          columns=['bucket_start', *activity_rollups.METRICS, 'avg_rating'])
+    timeline = pd.date_range(since, periods=buckets, freq='h' if bucket == 'hour' else 'D')
+    series = series.set_index(pd.to_datetime(series['bucket_start'])).drop(columns='bucket_start')
+    series = series.astype(float).reindex(timeline)
+    series[activity_rollups.METRICS] = series[activity_rollups.METRICS].fillna(0)
+    return px.line(series, y=ACTIVITY)
+
+
+def activity_arrays(bucket, buckets, max_points):
+    import plotly.graph_objs as go
+
+    series = chart_data.activity_series(bucket, buckets, limit=max_points)
+    return go.Figure(data=[go.Scatter(x=series['x'], y=series[metric], name=metric, mode='lines')
+                           for metric in ACTIVITY])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SQL-side chart aggregation with pandas over raw rows.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--max-points", type=int, default=chart_data.max_points())
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+        activity_rollups.process_pending(settle_seconds=0)
+    os.environ["READ_CACHE"] = "off"
+
+    # The freelancers with the most ratings, whose row-based chart cost the most
+    freelancers = column("""
+        SELECT C.freelancer_id FROM ratings R JOIN contracts C ON R.contract_id = C.id
+        GROUP BY C.freelancer_id ORDER BY COUNT(*) DESC LIMIT 50
+    """)
+    cases = {
+        'ratings chart (rows)': lambda i: ratings_rows(freelancers[i % len(freelancers)]),
+        'ratings chart (GROUP BY)': lambda i: ratings_grouped(freelancers[i % len(freelancers)]),
+    }
+    for name, (bucket, buckets) in WINDOWS.items():
+        cases[f"activity {name} (rows)"] = lambda i, bucket=bucket, buckets=buckets: activity_rows(bucket, buckets)
+        cases[f"activity {name} (arrays)"] = lambda i, bucket=bucket, buckets=buckets: \
+            activity_arrays(bucket, buckets, args.max_points)
+
+    results = {}
+    for name, build in cases.items():
+        print(f"running {name}...")
+        results[name] = harness.measure(lambda i: build(i).to_json(), args.iterations, warmup=5)
+        results[name]['figure_bytes'] = len(build(0).to_json())
+
+    harness.print_report(results, title=f"\nchart data, at most {args.max_points} points per series")
+    for name, summary in results.items():
+        print(f"  {name:<38}{summary['figure_bytes']:>10,} bytes of figure JSON")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(max_points=args.max_points,
+                                                                    freelancers=len(freelancers)))
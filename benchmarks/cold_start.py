@@ -0,0 +1,171 @@
+"""Cold start of the three dashboards: what they import before the first page is drawn, and how long it takes.
+
+    python benchmarks/cold_start.py --repeat 5 --budget-ms 2500
+    AUTH_SECRET=... python benchmarks/cold_start.py --compose --repeat 3
+
+Each run starts a fresh interpreter under python -X importtime and draws the app's first
+page through streamlit.testing's AppTest, as a new server process does for its first
+session: the login page of the client and freelancer apps, the User Management section of
+the admin app. Neither needs MySQL. Per app:
+
+  cold start       interpreter start until the first page is drawn
+  first render     the script's first run, including every module it imports
+  rerun            the next run of the same page, with everything imported and the CSS loaded
+
+and the packages the first run imported, by self time (the import-time profile). With
+--compose, each compose service is instead recreated (docker compose up --force-recreate)
+and timed until Streamlit's health endpoint answers inside the container, then a first
+render runs in the fresh container:
+
+  container ready        recreate until /_stcore/health answers (polled with docker
+                         compose exec, so resolution is roughly the cost of one exec)
+  container first page   ready plus the first render, i.e. until a first visitor's page is drawn
+
+The rest of the stack (MySQL, Redis) must be up already. --budget-ms exits non-zero when
+the median cold start (container first page with --compose) of any app exceeds it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import harness
+
+APPS = {
+    'client': "client_dashboard.py",
+    'freelancer': "freelancer_dashboard.py",
+    'admin': "admin_dashboard.py",
+}
+
+# Background workers the apps start at import; a benchmark process must not run them
+WORKERS_OFF = {
+    'NOTIFICATION_DISPATCHER': "none",
+    'ANALYTICS_ROLLUP': "none",
+    'JOB_EXPIRY': "none",
+    'ARCHIVE': "none",
+}
+
+MARKER = "cold_start: first render"
+HEALTH = "import urllib.request; urllib.request.urlopen('http://localhost:8501/_stcore/health', timeout=1)"
+
+
+def render(app):
+    """ Draw the app's first page in this (fresh) interpreter; prints the timings as JSON. """
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    loaded = time.perf_counter()
+    # Everything importtime reports after this line was imported by the app's first run
+    print(MARKER, file=sys.stderr, flush=True)
+    test = AppTest.from_file(os.path.join(harness.ROOT, APPS[app]), default_timeout=120)
+    test.run()
+    rendered = time.perf_counter()
+    if test.exception:
+        sys.exit(f"{APPS[app]} raised: {test.exception[0].message}")
+    test.run()
+    print(json.dumps({'streamlit': loaded - start, 'first_render': rendered - loaded,
+                      'rerun': time.perf_counter() - rendered}))
+
+
+def imported_packages(importtime):
+    """ {top-level package: self import time in ms} of the modules imported after MARKER. """
+    packages = {}
+    lines = importtime.splitlines()
+    for line in lines[lines.index(MARKER) + 1:] if MARKER in lines else []:
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0.0) + int(self_us) / 1000
+    return packages
+
+
+def profile(app):
+    """ One cold start of app in a new interpreter: (wall seconds, timings, imported packages). """
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable, "-X", "importtime", os.path.abspath(__file__), "--render", app],
+                             capture_output=True, text=True, cwd=harness.ROOT, env={**os.environ, **WORKERS_OFF})
+    wall = time.perf_counter() - start
+    if process.returncode:
+        sys.exit(process.stderr.strip().splitlines()[-1])
+    return wall, json.loads(process.stdout.strip().splitlines()[-1]), imported_packages(process.stderr)
+
+
+def compose(*args, check=True):
+    return subprocess.run(["docker", "compose", *args], capture_output=True, text=True, cwd=harness.ROOT, check=check)
+
+
+def container_start(app, timeout):
+    """ Recreate the app's compose service: (seconds until healthy, timings of a first render in it). """
+    service = f"{app}_dashboard"
+    start = time.perf_counter()
+    compose("up", "-d", "--no-deps", "--force-recreate", service)
+    while compose("exec", "-T", service, "python", "-c", HEALTH, check=False).returncode:
+        if time.perf_counter() - start > timeout:
+            sys.exit(f"{service} did not answer on /_stcore/health within {timeout:g}s")
+        time.sleep(0.2)
+    ready = time.perf_counter() - start
+    workers = [arg for name, value in WORKERS_OFF.items() for arg in ("-e", f"{name}={value}")]
+    process = compose("exec", "-T", *workers, service, "python", "benchmarks/cold_start.py", "--render", app)
+    return ready, json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_packages(app, runs, top):
+    medians = {package: statistics.median(run.get(package, 0.0) for run in runs)
+               for package in {package for run in runs for package in run}}
+    print(f"\n{app}: imported by the first render, median self time ({sum(medians.values()):.0f} ms in total)")
+    for package, ms in sorted(medians.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {package:<30}{ms:>10.1f} ms")
+    return medians
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile the dashboards' imports and time their cold start.")
+    parser.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    parser.add_argument("--repeat", type=int, default=5, help="fresh processes (or containers) per app")
+    parser.add_argument("--top", type=int, default=10, help="packages listed per app in the import profile")
+    parser.add_argument("--compose", action="store_true", help="recreate the docker compose services instead")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds a container may take to get healthy")
+    parser.add_argument("--budget-ms", type=float, help="exit non-zero if an app's median cold start exceeds it")
+    parser.add_argument("--render", choices=list(APPS), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.render:
+        render(args.render)
+        sys.exit(0)
+
+    results, packages = {}, {}
+    for app in args.apps:
+        print(f"starting {app} {args.repeat} times{' in a new container' if args.compose else ''}...")
+        if args.compose:
+            runs = [container_start(app, args.timeout) for _ in range(args.repeat)]
+            results[f"{app} container ready"] = harness.summarize([ready for ready, _ in runs])
+            results[f"{app} container first page"] = harness.summarize([ready + timings['first_render']
+                                                                        for ready, timings in runs])
+        else:
+            runs = [profile(app) for _ in range(args.repeat)]
+            results[f"{app} cold start"] = harness.summarize([wall for wall, _, _ in runs])
+            packages[app] = [imported for _, _, imported in runs]
+        timings = [run[1] for run in runs]
+        results[f"{app} first render"] = harness.summarize([timing['first_render'] for timing in timings])
+        results[f"{app} rerun"] = harness.summarize([timing['rerun'] for timing in timings])
+
+    harness.print_report(results, title=f"\ncold start, {args.repeat} runs per app")
+    profile_ms = {app: print_packages(app, runs, args.top) for app, runs in packages.items()}
+
+    passed = True
+    if args.budget_ms:
+        case = "container first page" if args.compose else "cold start"
+        print()
+        for app in args.apps:
+            p50 = results[f"{app} {case}"]['p50']
+            within = p50 <= args.budget_ms
+            passed = passed and within
+            print(f"  {app} {case}: {p50:.0f} ms {'within' if within else 'over'} the {args.budget_ms:g} ms budget")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(repeat=args.repeat, compose=args.compose,
+                                                                    budget_ms=args.budget_ms, imports_ms=profile_ms))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,215 @@
+"""Clearing a backlog of expired jobs with the deadline-expiry scheduler.
+
+    DB_NAME=dbmsproject_bench python benchmarks/expiry_backlog.py --setup --recreate --expired 2000000
+
+Adds --expired open jobs whose deadline has passed, each with --proposals-per-job pending
+proposals, on top of the synthetic marketplace (generated in SQL, so millions of rows take
+minutes rather than hours). Then:
+
+  feed before    the first browse_jobs page, which the expired jobs now crowd out
+  expire batch   job_expiry.expire_batch() until the backlog is gone, one transaction each
+  probe ...      meanwhile, a foreground thread keeps reading the feed and submitting proposals
+                 on live jobs, to show batches do not hold locks long enough to stall them
+  feed after     the first feed page once the backlog is closed
+
+Exits non-zero if an expired job is still open or a proposal on one is still pending.
+"""
+import argparse
+import sys
+import threading
+import time
+from datetime import date
+
+import harness
+import marketplace
+
+import job_expiry
+from database import DatabaseManager
+from job_feed import JOB_CATEGORIES, JobFeed
+from query_benchmark import column
+
+BACKLOG_TITLE = "Expired backlog job"
+
+
+def scalar(query, params=()):
+    return column(query, params)[0]
+
+
+def create_backlog(expired, proposals_per_job, chunk_size=50_000):
+    """ Insert the expired jobs and their pending proposals; returns the (first, last) job id. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM client")
+        n_clients = cursor.fetchone()[0]
+        cursor.execute("SELECT COUNT(*) FROM freelancer")
+        n_freelancers = cursor.fetchone()[0]
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM jobs")
+        first_id = cursor.fetchone()[0] + 1
+        cursor.execute("SET SESSION cte_max_recursion_depth = %s", (chunk_size + 1,))
+        categories = ", ".join(f"'{category}'" for category in JOB_CATEGORIES)
+
+        for offset in range(0, expired, chunk_size):
+            rows = min(chunk_size, expired - offset)
+            cursor.execute(f"""
+                INSERT INTO jobs (title, budget, deadline, description, status, category, client_id)
+                WITH RECURSIVE seq (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+                SELECT %s, 100 + (n + %s) MOD 900, CURDATE() - INTERVAL (1 + (n + %s) MOD 365) DAY,
+                       'Deadline passed without a hire', 'Open', ELT(1 + (n + %s) MOD {len(JOB_CATEGORIES)}, {categories}),
+                       1 + (n + %s) MOD %s
+                FROM seq
+            """, (rows - 1, BACKLOG_TITLE, offset, offset, offset, offset, n_clients))
+            connection.commit()
+            print(f"  jobs: {offset + rows:,} / {expired:,}")
+        last_id = first_id + expired - 1
+
+        copies = " UNION ALL ".join(f"SELECT {k} AS k" for k in range(proposals_per_job))
+        for start in range(first_id, last_id + 1, chunk_size):
+            cursor.execute(f"""
+                INSERT INTO proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+                SELECT J.id, 'Still interested', J.budget, 7, 1 + (J.id * {proposals_per_job} + copies.k) MOD %s, 'Pending'
+                FROM jobs J CROSS JOIN ({copies}) copies
+                WHERE J.id BETWEEN %s AND %s
+            """, (n_freelancers, start, min(start + chunk_size - 1, last_id)))
+            connection.commit()
+        print(f"  proposals: {expired * proposals_per_job:,}")
+        cursor.close()
+    finally:
+        connection.close()
+    return first_id, last_id
+
+
+def feed_page():
+    query, params = JobFeed.build_query()
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+
+def expired_on_first_page():
+    return sum(job['deadline'] < date.today() for job in feed_page())
+
+
+def probe(stop, samples, live_job_ids, freelancer_id):
+    """ Foreground traffic during the expiry run: feed reads and proposal submissions on live jobs. """
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        feed_page()
+        samples['feed'].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        connection = DatabaseManager.get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                INSERT INTO proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+                VALUES (%s, 'Probe', 100, 7, %s, 'Pending')
+            """, (live_job_ids[i % len(live_job_ids)], freelancer_id))
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+        samples['submit'].append(time.perf_counter() - start)
+        i += 1
+        time.sleep(0.01)
+
+
+def run(batch_size, pause, notify, first_id, last_id):
+    results = {}
+    open_before = scalar("SELECT COUNT(*) FROM jobs WHERE status = 'Open'")
+    expired_before = scalar("SELECT COUNT(*) FROM jobs WHERE status = 'Open' AND deadline < CURDATE()")
+    print(f"{open_before:,} open jobs, {expired_before:,} of them past their deadline; "
+          f"{expired_on_first_page()} of the first feed page's jobs are expired")
+
+    print("running feed before...")
+    results['feed before'] = harness.measure(lambda i: feed_page(), 200, warmup=10)
+
+    live_job_ids = column("SELECT id FROM jobs WHERE status = 'Open' AND deadline >= CURDATE() ORDER BY id LIMIT 100")
+    freelancer_id = scalar("SELECT MIN(freelancer_id) FROM freelancer")
+    samples = {'feed': [], 'submit': []}
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(stop, samples, live_job_ids, freelancer_id), daemon=True)
+
+    print(f"running expire batch (batch size {batch_size})...")
+    batch_samples = []
+    closed = rejected = 0
+    prober.start()
+    start = time.perf_counter()
+    try:
+        while True:
+            batch_start = time.perf_counter()
+            jobs, proposals = job_expiry.expire_batch(batch_size, notify)
+            if not jobs:
+                break
+            batch_samples.append(time.perf_counter() - batch_start)
+            closed += jobs
+            rejected += proposals
+            if len(batch_samples) % 100 == 0:
+                print(f"  {closed:,} jobs closed, {rejected:,} proposals rejected")
+            if pause:
+                time.sleep(pause)
+    finally:
+        elapsed = time.perf_counter() - start
+        stop.set()
+        prober.join()
+    results['expire batch'] = harness.summarize(batch_samples, elapsed)
+    results['expire batch']['jobs_per_second'] = closed / elapsed if elapsed else 0.0
+    results['probe feed during expiry'] = harness.summarize(samples['feed'])
+    results['probe submit during expiry'] = harness.summarize(samples['submit'])
+
+    print("running feed after...")
+    results['feed after'] = harness.measure(lambda i: feed_page(), 200, warmup=10)
+
+    still_open = scalar("SELECT COUNT(*) FROM jobs WHERE status = 'Open' AND deadline < CURDATE()")
+    still_pending = scalar("""
+        SELECT COUNT(*) FROM proposals
+        WHERE job_id BETWEEN %s AND %s AND status = 'Pending'
+    """, (first_id, last_id)) if first_id else 0
+    open_after = scalar("SELECT COUNT(*) FROM jobs WHERE status = 'Open'")
+    print(f"  {expired_on_first_page()} of the first feed page's jobs are expired now")
+    print(f"  closed {closed:,} jobs and rejected {rejected:,} proposals in {elapsed:.1f}s "
+          f"({closed / elapsed if elapsed else 0:,.0f} jobs/s); open jobs {open_before:,} -> {open_after:,}")
+    print(f"  expired jobs still open: {still_open}; backlog proposals still pending: {still_pending}")
+    return results, still_open == 0 and still_pending == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure closing a backlog of expired jobs in bounded batches.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--expired", type=int, default=1_000_000, help="expired jobs to add before the run")
+    parser.add_argument("--proposals-per-job", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    parser.add_argument("--notify", action="store_true", help="also queue the expiry notifications")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    first_id = last_id = None
+    if args.expired:
+        print(f"adding {args.expired:,} expired jobs...")
+        first_id, last_id = create_backlog(args.expired, args.proposals_per_job)
+
+    results, passed = run(args.batch_size, args.pause, args.notify, first_id, last_id)
+    harness.print_report(results, title=f"\n{args.expired:,} expired jobs, batch size {args.batch_size}")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(expired=args.expired,
+                                                                    batch_size=args.batch_size))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,106 @@
+"""Timing and reporting helpers shared by the benchmark scripts.
+
+Every benchmark records raw latencies per case and reports p50/p95/p99 in milliseconds.
+Reports are written as JSON together with run metadata, so two runs (e.g. before and
+after a schema change) can be compared with --compare.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if len(samples) == 1:
+        return {'p50': samples[0], 'p95': samples[0], 'p99': samples[0]}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+def summarize(samples, elapsed=None):
+    """ Latency summary in milliseconds for a list of per-operation durations in seconds. """
+    if not samples:
+        return {'count': 0}
+    ms = [sample * 1000 for sample in samples]
+    summary = {
+        'count': len(ms),
+        'mean': statistics.fmean(ms),
+        'min': min(ms),
+        'max': max(ms),
+        **percentiles(ms),
+    }
+    if elapsed:
+        summary['ops_per_sec'] = len(ms) / elapsed
+    return summary
+
+
+def measure(operation, iterations, warmup=0):
+    """ Call operation(i) iterations times and return a summary of the per-call latencies. """
+    for i in range(warmup):
+        operation(i)
+    samples = []
+    start = time.perf_counter()
+    for i in range(iterations):
+        call_start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - call_start)
+    return summarize(samples, time.perf_counter() - start)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        **extra,
+    }
+
+
+def print_report(results, title=None):
+    if title:
+        print(title)
+    print(f"{'case':<40}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'ops/s':>10}")
+    for case, summary in results.items():
+        if not summary.get('count'):
+            print(f"{case:<40}{0:>8}")
+            continue
+        print(f"{case:<40}{summary['count']:>8}{summary['p50']:>10.2f}{summary['p95']:>10.2f}"
+              f"{summary['p99']:>10.2f}{summary['max']:>10.2f}{summary.get('ops_per_sec', 0):>10.1f}")
+
+
+def write_report(path, results, meta):
+    with open(path, "w") as f:
+        json.dump({'metadata': meta, 'results': results}, f, indent=2, default=str)
+
+
+def compare(baseline_path, results):
+    """ Print p50/p99 change against a previous report, per case present in both. """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f"\n{'case':<40}{'p50 before':>12}{'p50 after':>12}{'change':>9}{'p99 before':>12}{'p99 after':>12}{'change':>9}")
+    for case, summary in results.items():
+        before = baseline.get(case)
+        if not before or not before.get('count') or not summary.get('count'):
+            continue
+        row = f"{case:<40}"
+        for key in ("p50", "p99"):
+            change = (summary[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            row += f"{before[key]:>12.2f}{summary[key]:>12.2f}{change:>8.1f}%"
+        print(row)
@@ -0,0 +1,165 @@
+"""Keeping the client's proposal list current: full-page reruns versus change-feed polls.
+
+    DB_NAME=dbmsproject_bench python benchmarks/live_updates_poll.py --setup --recreate --sessions 200
+
+--sessions signed-in clients each refresh their page every --tick seconds while a writer
+thread submits --writes-per-second proposals on their open jobs. Two cases:
+
+  full rerun    what every refresh cost before: the client page's list queries (pending
+                proposals, contracts in progress, unrated contracts, notification inbox),
+                run against MySQL each tick
+  feed poll     live_updates: the shared head check each tick, the session's own events only
+                when the head moved, and the proposal list reloaded only when one arrived
+
+Reports the latency of one refresh, the MySQL queries per refresh, and for the feed the
+delay from a proposal's commit to its client's panel seeing it.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+
+import harness
+import marketplace
+
+import live_updates
+import notifications
+import read_cache
+from client_work import ClientWork
+from database import DatabaseManager
+from query_benchmark import column
+
+
+def full_rerun(client_id):
+    ClientWork.proposals(client_id, "Pending")
+    ClientWork.contracts(client_id, "In Progress")
+    ClientWork.contracts(client_id, "Completed", unrated_only=True)
+    notifications.inbox("client", client_id, limit=10)
+    return 4
+
+
+def feed_poll(client_id, cursor, submitted):
+    """ One refresh of the live proposals panel; mirrors live_updates.poll() without a Streamlit session. """
+    queries = 0
+    checked_at = live_updates._head['checked_at']
+    latest = live_updates.head()
+    queries += live_updates._head['checked_at'] != checked_at
+    if latest > cursor['head']:
+        events = live_updates.fetch_events("client", client_id, cursor['cursor'])
+        queries += 1
+        cursor['head'] = latest
+        if events:
+            cursor['cursor'] = max(cursor['cursor'], *events.values())
+            live_updates.apply("client", client_id, events)
+            seen = time.perf_counter()
+            while submitted[client_id]:
+                cursor['delays'].append(seen - submitted[client_id].pop())
+    # Served from the read cache unless apply() just invalidated the client's tag
+    hits = read_cache.cache.stats()['hits']
+    ClientWork.proposals(client_id, "Pending")
+    queries += read_cache.cache.stats()['hits'] == hits
+    return queries
+
+
+def writer(stop, clients, jobs, freelancer_ids, rate, submitted, lock):
+    rng = random.Random(7)
+    while not stop.is_set():
+        client_id = rng.choice(clients)
+        connection = DatabaseManager.get_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                INSERT INTO proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+                VALUES (%s, 'Live update probe', 100, 7, %s, 'Pending')
+            """, (rng.choice(jobs[client_id]), rng.choice(freelancer_ids)))
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+        with lock:
+            submitted[client_id].append(time.perf_counter())
+        stop.wait(1 / rate)
+
+
+def run_case(name, clients, refresh, seconds, tick, jobs, freelancer_ids, rate):
+    submitted = {client_id: [] for client_id in clients}
+    lock = threading.Lock()
+    samples, queries = [], []
+    cursors = {}
+    for client_id in clients:
+        latest = live_updates.head()
+        cursors[client_id] = {'cursor': latest, 'head': latest, 'delays': []}
+        refresh(client_id, cursors[client_id], submitted)
+
+    stop = threading.Event()
+    threads = [threading.Thread(target=writer, args=(stop, clients, jobs, freelancer_ids, rate, submitted, lock),
+                                daemon=True)]
+
+    def session(client_id):
+        while not stop.is_set():
+            start = time.perf_counter()
+            with lock:
+                queries.append(refresh(client_id, cursors[client_id], submitted))
+            samples.append(time.perf_counter() - start)
+            stop.wait(tick)
+
+    threads += [threading.Thread(target=session, args=(client_id,), daemon=True) for client_id in clients]
+    print(f"running {name}...")
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    summary = harness.summarize(samples, time.perf_counter() - start)
+    summary['queries_per_refresh'] = sum(queries) / len(queries) if queries else 0.0
+    delays = [delay for cursor in cursors.values() for delay in cursor['delays']]
+    return summary, delays
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare full-page refreshes with change-feed polling.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sessions", type=int, default=100, help="signed-in clients refreshing their page")
+    parser.add_argument("--tick", type=float, default=1.0, help="seconds between refreshes of one session")
+    parser.add_argument("--writes-per-second", type=float, default=5)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DB_POOL_SIZE", str(max(args.sessions + 2, 10)))
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    clients = column("""
+        SELECT client_id FROM jobs WHERE status = 'Open' GROUP BY client_id ORDER BY client_id LIMIT %s
+    """, (args.sessions,))
+    jobs = {client_id: column("SELECT id FROM jobs WHERE client_id = %s AND status = 'Open'", (client_id,))
+            for client_id in clients}
+    freelancer_ids = column("SELECT freelancer_id FROM freelancer ORDER BY freelancer_id LIMIT 1000")
+
+    results = {}
+    os.environ["READ_CACHE"] = "off"
+    results['full rerun'], _ = run_case("full rerun", clients, lambda client_id, cursor, submitted: full_rerun(client_id),
+                                        args.seconds, args.tick, jobs, freelancer_ids, args.writes_per_second)
+    os.environ["READ_CACHE"] = "on"
+    results['feed poll'], delays = run_case("feed poll", clients, feed_poll, args.seconds, args.tick, jobs,
+                                            freelancer_ids, args.writes_per_second)
+    results['feed delivery delay'] = harness.summarize(delays)
+
+    harness.print_report(results, title=f"\n{len(clients)} sessions, refresh every {args.tick:g}s")
+    for name in ('full rerun', 'feed poll'):
+        print(f"  {name}: {results[name]['queries_per_refresh']:.2f} MySQL queries per refresh")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(sessions=len(clients), tick=args.tick,
+                                                                    writes_per_second=args.writes_per_second))
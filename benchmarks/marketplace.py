@@ -0,0 +1,206 @@
+"""Schema setup and synthetic marketplace data for benchmarks.
+
+Creates the database named by DB_NAME (use a scratch name such as dbmsproject_bench),
+loads the tables from something.sql and the routines from "function and procedure",
+and fills it with clients, freelancers, jobs, proposals, contracts and ratings whose
+proportions follow a real marketplace: most jobs attract several proposals, a fraction
+get accepted, and most completed contracts get rated.
+"""
+import random
+from datetime import date, timedelta
+
+import mysql.connector
+
+from harness import ROOT
+
+import skill_index
+from database import load_config
+from job_feed import JOB_CATEGORIES
+
+BASE_COUNTS = {
+    'clients': 1_000,
+    'freelancers': 5_000,
+    'jobs': 10_000,
+    'proposals_per_job': 5,
+    'accepted_fraction': 0.4,
+    'completed_fraction': 0.6,
+    'rated_fraction': 0.8,
+}
+
+SKILLS = [
+    "python", "django", "flask", "javascript", "react", "vue", "node.js", "sql", "mysql", "postgresql",
+    "aws", "docker", "kubernetes", "figma", "photoshop", "illustrator", "ui design", "logo design",
+    "copywriting", "seo", "technical writing", "blogging", "translation", "data analysis", "excel",
+    "machine learning", "php", "wordpress", "java", "swift", "kotlin", "flutter", "go", "rust",
+]
+
+WORDS = (
+    "build design write responsive website dashboard landing page mobile app api integration "
+    "brand identity marketing content article blog backend frontend database migration report "
+    "analytics automation script performance audit redesign ecommerce store checkout payments"
+).split()
+
+
+def split_statements(sql):
+    """ Split a MySQL script into statements, honouring DELIMITER changes used around routines. """
+    delimiter = ";"
+    statements, buffer = [], []
+    for line in sql.splitlines():
+        stripped = line.strip()
+        if stripped.upper().startswith("DELIMITER "):
+            delimiter = stripped.split(None, 1)[1]
+            continue
+        buffer.append(line)
+        if stripped.endswith(delimiter):
+            statement = "\n".join(buffer).strip()
+            statement = statement[:-len(delimiter)].strip()
+            buffer = []
+            code = [l for l in statement.splitlines() if l.strip() and not l.strip().startswith("--")]
+            if code:
+                statements.append(statement)
+    return statements
+
+
+def schema_scripts():
+    """ Tables from something.sql plus the routines file; something.sql ends with a copy of the latter. """
+    with open(f"{ROOT}/something.sql") as f:
+        schema = f.read()
+    with open(f"{ROOT}/function and procedure") as f:
+        routines = f.read()
+    if schema.endswith(routines):
+        schema = schema[:-len(routines)]
+    return schema, routines
+
+
+def create_database(drop_existing=False):
+    """ Create DB_NAME from scratch and load the schema. """
+    config = load_config()['connection']
+    database = config.pop('database')
+    connection = mysql.connector.connect(**config)
+    try:
+        cursor = connection.cursor()
+        if drop_existing:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{database}`")
+        cursor.execute(f"CREATE DATABASE `{database}`")
+        cursor.execute(f"USE `{database}`")
+        for script in schema_scripts():
+            for statement in split_statements(script):
+                cursor.execute(statement)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def _chunks(rows, size):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def _insert(connection, query, rows, chunk_size=2_000):
+    cursor = connection.cursor()
+    for chunk in _chunks(rows, chunk_size):
+        cursor.executemany(query, chunk)
+        connection.commit()
+    cursor.close()
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def generate(connection, scale=1.0, seed=42, progress=print):
+    """ Populate an empty schema; returns the row counts that were inserted. """
+    rng = random.Random(seed)
+    n_clients = max(1, int(BASE_COUNTS['clients'] * scale))
+    n_freelancers = max(1, int(BASE_COUNTS['freelancers'] * scale))
+    n_jobs = max(1, int(BASE_COUNTS['jobs'] * scale))
+    today = date.today()
+
+    progress(f"clients: {n_clients}")
+    _insert(connection, "INSERT INTO client (name, email, phone, company_name, posted_jobs) VALUES (%s, %s, %s, %s, %s)", [
+        (f"Client {i}", f"client{i}@example.com", f"9{i:09d}", f"Company {i % 200}", 0)
+        for i in range(1, n_clients + 1)
+    ])
+
+    progress(f"freelancers: {n_freelancers}")
+    freelancer_skills = [", ".join(rng.sample(SKILLS, rng.randint(2, 6))) for _ in range(n_freelancers)]
+    _insert(connection, "INSERT INTO freelancer (name, email, phone, skills, rating, is_available) VALUES (%s, %s, %s, %s, %s, %s)", [
+        (f"Freelancer {i}", f"freelancer{i}@example.com", f"8{i:09d}", freelancer_skills[i - 1], None, int(rng.random() < 0.8))
+        for i in range(1, n_freelancers + 1)
+    ])
+
+    progress(f"jobs: {n_jobs}")
+    job_skills = [", ".join(rng.sample(SKILLS, rng.randint(1, 4))) for _ in range(n_jobs)]
+    job_budgets = [round(rng.lognormvariate(6, 1), 2) for _ in range(n_jobs)]
+    _insert(connection, """
+        INSERT INTO jobs (title, budget, deadline, description, status, category, required_skills, client_id)
+        VALUES (%s, %s, %s, %s, 'Open', %s, %s, %s)
+    """, [
+        (_sentence(rng, 4), job_budgets[i], today + timedelta(days=rng.randint(-30, 120)),
+         _sentence(rng, rng.randint(30, 150)), rng.choice(JOB_CATEGORIES), job_skills[i], rng.randint(1, n_clients))
+        for i in range(n_jobs)
+    ])
+
+    # Ids are dense from 1 on a fresh schema, so row i of each list has id i + 1
+    cursor = connection.cursor()
+    for start in range(0, n_freelancers, 2_000):
+        skill_index.index_freelancer_skills_bulk(cursor, [
+            (i + 1, freelancer_skills[i]) for i in range(start, min(start + 2_000, n_freelancers))
+        ])
+        connection.commit()
+    for start in range(0, n_jobs, 2_000):
+        skill_index.index_job_skills_bulk(cursor, [(i + 1, job_skills[i]) for i in range(start, min(start + 2_000, n_jobs))])
+        connection.commit()
+    cursor.close()
+
+    progress("proposals")
+    proposals, accepted = [], []
+    for job_id in range(1, n_jobs + 1):
+        n = max(1, int(rng.expovariate(1 / BASE_COUNTS['proposals_per_job'])))
+        bidders = rng.sample(range(1, n_freelancers + 1), min(n, n_freelancers))
+        is_accepted = rng.random() < BASE_COUNTS['accepted_fraction']
+        for position, freelancer_id in enumerate(bidders):
+            rate = round(job_budgets[job_id - 1] * rng.uniform(0.6, 1.3), 2)
+            status = "Pending"
+            if is_accepted:
+                status = "Accepted" if position == 0 else "Rejected"
+            proposals.append((job_id, _sentence(rng, rng.randint(20, 80)), rate, rng.randint(1, 60), freelancer_id, status))
+            if is_accepted and position == 0:
+                accepted.append((job_id, freelancer_id, rate))
+    _insert(connection, """
+        INSERT INTO proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, proposals)
+
+    progress(f"contracts: {len(accepted)}")
+    contracts = [
+        (job_id, freelancer_id, rate, "Completed" if rng.random() < BASE_COUNTS['completed_fraction'] else "In Progress")
+        for job_id, freelancer_id, rate in accepted
+    ]
+    _insert(connection, "INSERT INTO contracts (job_id, freelancer_id, payment, status) VALUES (%s, %s, %s, %s)", contracts)
+    closed_jobs = [(job_id,) for job_id, _, _ in accepted]
+    _insert(connection, "UPDATE jobs SET status = 'Closed' WHERE id = %s", closed_jobs)
+
+    ratings = [
+        (contract_id, rng.choices([1, 2, 3, 4, 5], weights=[2, 3, 10, 35, 50])[0], _sentence(rng, rng.randint(5, 30)))
+        for contract_id, (_, _, _, status) in enumerate(contracts, start=1)
+        if status == "Completed" and rng.random() < BASE_COUNTS['rated_fraction']
+    ]
+    progress(f"ratings: {len(ratings)}")
+    _insert(connection, "INSERT INTO ratings (contract_id, rating_score, review_text) VALUES (%s, %s, %s)", ratings)
+
+    # Start every run from an exact summary row rather than whatever the triggers accumulated
+    cursor = connection.cursor()
+    cursor.callproc("refresh_platform_stats")
+    connection.commit()
+    cursor.close()
+
+    return {
+        'clients': n_clients,
+        'freelancers': n_freelancers,
+        'jobs': n_jobs,
+        'proposals': len(proposals),
+        'contracts': len(contracts),
+        'ratings': len(ratings),
+    }
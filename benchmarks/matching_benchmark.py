@@ -0,0 +1,91 @@
+"""Throughput benchmark for matching.MatchingEngine on synthetic data.
+
+    python benchmarks/matching_benchmark.py --freelancers 100000 --jobs 100000 --k 10
+
+Scores the full freelancers x jobs cross product (top-k freelancers per job) and
+reports scored pairs per second. --sample-jobs limits the run to the first N jobs
+and extrapolates, for a quick estimate on small machines.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import sparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from matching import MatchingEngine  # noqa: E402
+
+
+def random_tags(rng, rows, n_tags, tags_per_row):
+    # Zipf-like tag popularity, as a handful of skills (python, design, ...) dominate real profiles
+    popularity = 1.0 / np.arange(1, n_tags + 1)
+    popularity /= popularity.sum()
+    counts = rng.integers(1, 2 * tags_per_row, size=rows)
+    row_index = np.repeat(np.arange(rows), counts)
+    col_index = rng.choice(n_tags, size=counts.sum(), p=popularity)
+    matrix = sparse.csr_matrix((np.ones(len(row_index), dtype=np.float32), (row_index, col_index)), shape=(rows, n_tags))
+    matrix.data[:] = 1.0  # duplicates were summed
+    return matrix
+
+
+def build_engine(n_freelancers, n_jobs, n_tags, tags_per_row, block_size, seed):
+    rng = np.random.default_rng(seed)
+    ratings = rng.uniform(1, 5, n_freelancers).astype(np.float32)
+    ratings[rng.random(n_freelancers) < 0.3] = np.nan
+    rates = rng.lognormal(4, 0.8, n_freelancers).astype(np.float32)
+    rates[rng.random(n_freelancers) < 0.2] = np.nan
+    return MatchingEngine(
+        freelancer_ids=np.arange(1, n_freelancers + 1),
+        freelancer_tags=random_tags(rng, n_freelancers, n_tags, tags_per_row),
+        ratings=ratings,
+        available=rng.random(n_freelancers) < 0.8,
+        avg_rates=rates,
+        job_ids=np.arange(1, n_jobs + 1),
+        job_tags=random_tags(rng, n_jobs, n_tags, tags_per_row),
+        budgets=rng.lognormal(5, 1, n_jobs).astype(np.float32),
+        block_size=block_size,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--freelancers", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=2_000)
+    parser.add_argument("--tags-per-row", type=int, default=5)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--block-size", type=int, default=256)
+    parser.add_argument("--sample-jobs", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    engine = build_engine(args.freelancers, args.jobs, args.tags, args.tags_per_row, args.block_size, args.seed)
+    build_time = time.perf_counter() - start
+
+    job_rows = np.arange(min(args.sample_jobs or args.jobs, args.jobs))
+    start = time.perf_counter()
+    engine.top_freelancers_for_jobs(job_rows, k=args.k)
+    elapsed = time.perf_counter() - start
+
+    pairs = len(job_rows) * args.freelancers
+    print(f"freelancers={args.freelancers} jobs={args.jobs} tags={args.tags} k={args.k} block={args.block_size}")
+    print(f"engine build:       {build_time:8.2f} s")
+    print(f"scored jobs:        {len(job_rows):8d} in {elapsed:.2f} s ({len(job_rows) / elapsed:,.0f} jobs/s)")
+    print(f"pair throughput:    {pairs / elapsed:,.0f} pairs/s")
+    if len(job_rows) < args.jobs:
+        print(f"full run estimate:  {elapsed * args.jobs / len(job_rows):8.1f} s")
+
+    start = time.perf_counter()
+    engine.recommend_jobs(1, k=args.k)
+    print(f"single freelancer:  {(time.perf_counter() - start) * 1000:8.1f} ms (recommend_jobs)")
+    start = time.perf_counter()
+    engine.recommend_freelancers(1, k=args.k)
+    print(f"single job:         {(time.perf_counter() - start) * 1000:8.1f} ms (recommend_freelancers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Latency benchmark for the queries and procedures the dashboards run.
+
+    DB_NAME=dbmsproject_bench python benchmarks/query_benchmark.py --setup --scale 1 --output before.json
+    DB_NAME=dbmsproject_bench python benchmarks/query_benchmark.py --output after.json --compare before.json
+
+--setup creates DB_NAME, loads something.sql and "function and procedure" and generates a
+synthetic marketplace (see marketplace.py); it refuses to touch an existing database unless
+--recreate is given, so never point it at the real dbmsproject. Every case calls the same
+module or statement the dashboards use and reports p50/p95/p99 latency in milliseconds.
+accept_proposal closes the jobs it accepts, so it runs last and consumes open jobs.
+"""
+import argparse
+import os
+import random
+import time
+
+import harness
+import marketplace
+
+import activity_rollups
+import platform_stats
+import proposal_review
+from database import DatabaseManager
+from job_feed import JOB_CATEGORIES, JobFeed
+
+# Measure MySQL, not the in-process read cache in front of the feed
+os.environ.setdefault("READ_CACHE", "off")
+
+
+def scalar(query, params=()):
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        value = cursor.fetchone()[0]
+        cursor.close()
+    finally:
+        connection.close()
+    return value
+
+
+def column(query, params=()):
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(query, params)
+        values = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+    finally:
+        connection.close()
+    return values
+
+
+def calculate_freelancer_rating(freelancer_id):
+    # Same statement as freelancer_dashboard.RatingService.view_ratings
+    return scalar("SELECT calculate_freelancer_rating(%s) as avg_rating", (freelancer_id,))
+
+
+def run(iterations, warmup, seed):
+    rng = random.Random(seed)
+    max_freelancer = scalar("SELECT MAX(freelancer_id) FROM freelancer")
+    deadlines = column("SELECT deadline FROM jobs WHERE status = 'Open' ORDER BY RAND(%s) LIMIT %s", (seed, iterations + warmup))
+    skills = column("SELECT name FROM skill_tags ORDER BY id")
+    # Fold the generated activity into the hourly/daily rollups the admin charts read
+    activity_rollups.process_pending(settle_seconds=0)
+    rated = column("SELECT freelancer_id FROM freelancer WHERE rating_count > 0 ORDER BY RAND(%s) LIMIT %s",
+                   (seed, iterations + warmup))
+
+    cases = {
+        'browse_jobs first page': lambda i: JobFeed.fetch_page(),
+        'browse_jobs category filter': lambda i: JobFeed.fetch_page(category=rng.choice(JOB_CATEGORIES)),
+        'browse_jobs budget + skill filter': lambda i: JobFeed.fetch_page(min_budget=200, max_budget=2000,
+                                                                         skills=[rng.choice(skills)]),
+        'browse_jobs deep page': lambda i: JobFeed.fetch_page(after=(deadlines[i % len(deadlines)], 0)),
+        'calculate_freelancer_rating': lambda i: calculate_freelancer_rating(rng.randint(1, max_freelancer)),
+        'calculate_freelancer_rating rated': lambda i: calculate_freelancer_rating(rated[i % len(rated)]),
+        'get_stats live': lambda i: platform_stats.fetch_stats(summary=False),
+        'get_stats summary': lambda i: platform_stats.fetch_stats(summary=True),
+        'activity series 48 hours': lambda i: activity_rollups.fetch_series(
+            'hour', activity_rollups.window_start('hour', 48)),
+        'activity series 365 days': lambda i: activity_rollups.fetch_series(
+            'day', activity_rollups.window_start('day', 365)),
+    }
+
+    results = {}
+    for name, operation in cases.items():
+        print(f"running {name}...")
+        results[name] = harness.measure(operation, iterations, warmup)
+
+    # One pending proposal per open job, so every call accepts a different job
+    proposal_ids = column("""
+        SELECT MIN(P.id)
+        FROM proposals P JOIN jobs J ON J.id = P.job_id
+        WHERE J.status = 'Open' AND P.status = 'Pending'
+        GROUP BY P.job_id
+        ORDER BY MIN(P.id)
+        LIMIT %s
+    """, (iterations,))
+    print("running accept_proposal...")
+    results['accept_proposal'] = harness.measure(lambda i: proposal_review.accept_proposal(proposal_ids[i]),
+                                                 len(proposal_ids))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the dashboard queries against a synthetic marketplace.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="1.0 = 1k clients, 5k freelancers, 10k jobs, ~50k proposals")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", help="write the report as JSON")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+
+    dataset = None
+    if args.setup:
+        start = time.perf_counter()
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            dataset = marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+        print(f"generated {dataset} in {time.perf_counter() - start:.1f}s")
+
+    results = run(args.iterations, args.warmup, args.seed)
+    meta = harness.metadata(scale=args.scale, seed=args.seed, iterations=args.iterations, dataset=dataset,
+                            mysql_version=scalar("SELECT VERSION()"))
+    harness.print_report(results, title=f"\nscale {args.scale}, {args.iterations} iterations per case")
+    if args.output:
+        harness.write_report(args.output, results, meta)
+    if args.compare:
+        harness.compare(args.compare, results)
@@ -0,0 +1,135 @@
+"""Throughput of batch proposal review against the per-click path.
+
+    DB_NAME=dbmsproject_bench python benchmarks/review_benchmark.py --setup --recreate --clients 100
+
+Picks clients with pending proposals on open jobs and decides every one of them: on even
+jobs the first proposal is accepted, on odd jobs every proposal is rejected. Half of the
+clients are reviewed the way the dashboard did per click (one accept_proposal call per
+accept, one UPDATE on a fresh connection per reject), the other half with a single
+review_proposals call per client. Both halves make the same kind of decisions, so
+decisions per second are directly comparable. Reviewing consumes the open jobs, so use
+--setup --recreate for repeated runs.
+"""
+import argparse
+import time
+from collections import defaultdict
+
+import harness
+import marketplace
+
+import proposal_review
+from database import DatabaseManager
+from query_benchmark import column
+
+
+def reject_proposal(proposal_id):
+    # Same statement as client_dashboard.reject_proposal
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("UPDATE Proposals SET status = 'Rejected' WHERE id = %s AND status = 'Pending'", (proposal_id,))
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def pending_work(clients):
+    """ {client_id: (accept_ids, reject_ids)} for the clients with the most pending proposals. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("""
+            SELECT J.client_id, P.job_id, P.id
+            FROM proposals P JOIN jobs J ON J.id = P.job_id
+            WHERE J.status = 'Open' AND P.status = 'Pending'
+            AND J.client_id IN (
+                SELECT client_id FROM (
+                    SELECT J2.client_id
+                    FROM jobs J2 JOIN proposals P2 ON P2.job_id = J2.id
+                    WHERE J2.status = 'Open' AND P2.status = 'Pending'
+                    GROUP BY J2.client_id
+                    ORDER BY COUNT(*) DESC
+                    LIMIT %s
+                ) busiest
+            )
+            ORDER BY J.client_id, P.job_id, P.id
+        """, (clients,))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+
+    jobs = defaultdict(lambda: defaultdict(list))
+    for client_id, job_id, proposal_id in rows:
+        jobs[client_id][job_id].append(proposal_id)
+
+    work = {}
+    for client_id, by_job in jobs.items():
+        accept_ids, reject_ids = [], []
+        for job_id, proposal_ids in by_job.items():
+            if job_id % 2 == 0:
+                accept_ids.append(proposal_ids[0])
+            else:
+                reject_ids.extend(proposal_ids)
+        work[client_id] = (accept_ids, reject_ids)
+    return work
+
+
+def per_click(client_id, accept_ids, reject_ids):
+    for proposal_id in accept_ids:
+        proposal_review.accept_proposal(proposal_id)
+    for proposal_id in reject_ids:
+        reject_proposal(proposal_id)
+
+
+def batch(client_id, accept_ids, reject_ids):
+    proposal_review.review_proposals(client_id, accept_ids, reject_ids)
+
+
+def run(clients):
+    work = pending_work(clients)
+    client_ids = sorted(work)
+    paths = {'per_click': (per_click, client_ids[0::2]), 'batch': (batch, client_ids[1::2])}
+
+    results = {}
+    for name, (review, assigned) in paths.items():
+        decisions = sum(len(work[c][0]) + len(work[c][1]) for c in assigned)
+        print(f"running {name}: {len(assigned)} clients, {decisions} decisions...")
+        samples = []
+        start = time.perf_counter()
+        for client_id in assigned:
+            call_start = time.perf_counter()
+            review(client_id, *work[client_id])
+            samples.append(time.perf_counter() - call_start)
+        elapsed = time.perf_counter() - start
+        results[f"{name} per client"] = harness.summarize(samples, elapsed)
+        results[f"{name} per client"]['decisions_per_sec'] = decisions / elapsed if elapsed else 0.0
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare batch proposal review with the per-click path.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--clients", type=int, default=100, help="number of busiest clients to review")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    results = run(args.clients)
+    harness.print_report(results, title=f"\n{args.clients} clients")
+    for case, summary in results.items():
+        print(f"{case}: {summary.get('decisions_per_sec', 0):,.0f} decisions/s")
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(clients=args.clients, scale=args.scale,
+                                                                    mysql_version=column("SELECT VERSION()")[0]))
@@ -0,0 +1,188 @@
+"""Dashboard throughput as replicas are added behind the load balancer.
+
+    STATE_STORE=redis://localhost:6379/0 DB_NAME=dbmsproject_bench \\
+        python benchmarks/scaleout_load.py --setup --recreate --replicas 1 2 4 --users 64 --seconds 20
+
+Each replica is a separate process with its own connection pool, read cache and sessions,
+as each Streamlit container is. --users freelancers log in once, from this process, and are
+spread evenly over the replicas, so every replica validates sessions it did not create. Each
+user then loads the freelancer's main page in a closed loop: validate the session token, read
+a page of the open-job feed and the notification inbox; --save-ratio of the page views also
+save the user's dashboard state, as shared_session.save() does after an interaction.
+
+Reports page views per second for each replica count, with the speedup over one replica and
+the scaling efficiency (speedup / replicas). With the read cache on, a page view is mostly
+Python work, so throughput grows with replicas until CPU cores, the state store or MySQL run
+out. --no-read-cache sends every read to MySQL instead.
+
+STATE_STORE must be shared between processes; when unset, a SQLite file in a temporary
+directory is used. Exits non-zero if efficiency at the largest replica count falls below
+--min-efficiency.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import secrets
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import harness
+import marketplace
+
+from database import DatabaseManager
+from job_feed import JOB_CATEGORIES
+
+PASSWORD = "correct horse battery staple"
+
+
+def pick_users(count):
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT freelancer_id, email FROM freelancer ORDER BY freelancer_id LIMIT %s", (count,))
+        users = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return users
+
+
+def log_in(users, workers=8):
+    import auth
+
+    def sign_in(user):
+        auth.set_password("freelancer", user[0], PASSWORD)
+        token, _ = auth.login("freelancer", user[1], PASSWORD)
+        return user[0], token
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(sign_in, users))
+
+
+def replica(sessions, start_at, seconds, save_ratio, seed, results):
+    """ One dashboard replica: a thread per signed-in user, running page views until the deadline. """
+    import auth
+    import notifications
+    from job_feed import JobFeed
+
+    def page_view(rng, freelancer_id, token):
+        if auth.validate(token, "freelancer") is None:
+            raise RuntimeError(f"session of freelancer {freelancer_id} did not validate on this replica")
+        JobFeed.fetch_page(category=rng.choice(JOB_CATEGORIES + [None]))
+        notifications.inbox("freelancer", freelancer_id)
+        if rng.random() < save_ratio:
+            auth.save_state(token, {'completed_jobs': [rng.randrange(1000)]})
+
+    def user(index):
+        rng = random.Random(seed * 1000 + index)
+        freelancer_id, token = sessions[index]
+        # Warm the connection and caches before the clock starts
+        page_view(rng, freelancer_id, token)
+        samples = []
+        late.append(time.time() > start_at)
+        time.sleep(max(0.0, start_at - time.time()))
+        deadline = start_at + seconds
+        while time.time() < deadline:
+            start = time.perf_counter()
+            page_view(rng, freelancer_id, token)
+            samples.append(time.perf_counter() - start)
+        return samples
+
+    late = []
+    try:
+        with ThreadPoolExecutor(max_workers=len(sessions)) as executor:
+            samples = [sample for user_samples in executor.map(user, range(len(sessions))) for sample in user_samples]
+    except Exception as err:
+        results.put({'error': repr(err)})
+        raise
+    results.put({'samples': samples, 'late': any(late)})
+
+
+def run(sessions, replica_counts, seconds, save_ratio, seed, startup):
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    baseline = None
+    for count in replica_counts:
+        shares = [sessions[i::count] for i in range(count)]
+        print(f"running {count} replica(s), {len(sessions)} users...")
+        queue = context.Queue()
+        start_at = time.time() + startup
+        processes = [context.Process(target=replica, args=(share, start_at, seconds, save_ratio, seed + i, queue))
+                     for i, share in enumerate(shares) if share]
+        for process in processes:
+            process.start()
+        outcomes = [queue.get() for _ in processes]
+        for process in processes:
+            process.join()
+        errors = [outcome['error'] for outcome in outcomes if 'error' in outcome]
+        if errors:
+            raise RuntimeError(f"replica failed with {count} replica(s): {errors[0]}")
+        if any(outcome['late'] for outcome in outcomes):
+            print(f"  warning: a replica started after the clock; raise --startup above {startup}s")
+
+        summary = harness.summarize([sample for outcome in outcomes for sample in outcome['samples']], seconds)
+        baseline = baseline or summary['ops_per_sec'] / count
+        summary['replicas'] = count
+        summary['speedup'] = summary['ops_per_sec'] / baseline
+        summary['efficiency'] = summary['speedup'] / count
+        results[f"{count} replica(s)"] = summary
+    return results
+
+
+def print_scaling(results):
+    print(f"\n{'replicas':>8}{'views/s':>12}{'speedup':>10}{'efficiency':>12}")
+    for summary in results.values():
+        print(f"{summary['replicas']:>8}{summary['ops_per_sec']:>12.1f}{summary['speedup']:>10.2f}"
+              f"{summary['efficiency']:>11.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure page-view throughput across dashboard replica counts.")
+    parser.add_argument("--setup", action="store_true", help="create DB_NAME and generate synthetic data first")
+    parser.add_argument("--recreate", action="store_true", help="drop DB_NAME if it exists (with --setup)")
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--users", type=int, default=64, help="signed-in users, spread over the replicas")
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument("--save-ratio", type=float, default=0.05,
+                        help="share of page views that also save dashboard state")
+    parser.add_argument("--startup", type=float, default=10,
+                        help="seconds allowed for replica processes to start before the clock")
+    parser.add_argument("--no-read-cache", action="store_true")
+    parser.add_argument("--min-efficiency", type=float, help="fail if efficiency at the largest count is lower")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    # Replica processes inherit the environment: one signing key and one shared store for all
+    os.environ.setdefault("AUTH_SECRET", secrets.token_hex(32))
+    os.environ.setdefault("STATE_STORE", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'state.db')}")
+    os.environ.setdefault("DB_POOL_SIZE", str(max(args.users, 10)))
+    os.environ.setdefault("NOTIFICATION_DISPATCHER", "none")
+    if args.no_read_cache:
+        os.environ["READ_CACHE"] = "off"
+    if os.environ["STATE_STORE"] == "memory":
+        parser.error("STATE_STORE=memory is not shared between replica processes")
+
+    if args.setup:
+        marketplace.create_database(drop_existing=args.recreate)
+        connection = DatabaseManager.get_connection()
+        try:
+            marketplace.generate(connection, args.scale, args.seed)
+        finally:
+            connection.close()
+
+    print(f"signing in {args.users} users (state store {os.environ['STATE_STORE']})...")
+    sessions = log_in(pick_users(args.users))
+    results = run(sessions, sorted(set(args.replicas)), args.seconds, args.save_ratio, args.seed, args.startup)
+    harness.print_report(results, title=f"\n{args.users} users, {args.seconds:g}s per replica count")
+    print_scaling(results)
+    if args.output:
+        harness.write_report(args.output, results, harness.metadata(users=args.users, seconds=args.seconds,
+                                                                    cpus=os.cpu_count(),
+                                                                    state_store=os.environ['STATE_STORE']))
+    efficiency = list(results.values())[-1]['efficiency']
+    sys.exit(1 if args.min_efficiency is not None and efficiency < args.min_efficiency else 0)
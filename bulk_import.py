@@ -0,0 +1,249 @@
+import argparse
+import csv
+import io
+import re
+import time
+
+import mysql.connector
+
+import auth
+from database import DatabaseManager
+import skill_index
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+PHONE_PATTERN = re.compile(r"^\+?[0-9]{7,15}$")
+
+USER_TABLES = {
+    'freelancer': {
+        'table': "freelancer",
+        'columns': ["name", "email", "phone", "skills", "rating", "is_available", "password_hash"],
+    },
+    'client': {
+        'table': "client",
+        'columns': ["name", "email", "phone", "company_name", "posted_jobs", "password_hash"],
+    },
+}
+
+
+# Readers yield chunks of (position, row dict), position being {'record': n, 'line': m}: the
+# 1-based index of the data record and, for CSV, the line the record ends on as counted by the
+# csv reader (quoted fields may span lines, so the two differ). Parquet has no lines.
+
+def read_csv(file, chunk_size):
+    """ Yield chunks of (position, row dict) from a CSV file object (text or binary) without loading it whole. """
+    if isinstance(file, (io.RawIOBase, io.BufferedIOBase)):
+        file = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(file)
+    chunk = []
+    for record, row in enumerate(reader, start=1):
+        chunk.append(({'record': record, 'line': reader.line_num}, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def read_parquet(file, chunk_size):
+    """ Yield chunks of (position, row dict) from a Parquet file, one record batch at a time. """
+    import pyarrow.parquet as pq
+
+    record = 0
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=chunk_size):
+        chunk = [({'record': record + offset, 'line': None}, row) for offset, row in enumerate(batch.to_pylist(), start=1)]
+        record += len(chunk)
+        yield chunk
+
+
+def _text(value):
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+def validate(user_type, row):
+    """ Return (values tuple, None) for a valid row or (None, reason) for a reject. """
+    name = _text(row.get("name"))
+    email = _text(row.get("email")).lower()
+    phone = re.sub(r"[\s\-()]", "", _text(row.get("phone")))
+
+    if not name:
+        return None, "missing name"
+    if len(name) > 255:
+        return None, "name too long"
+    if not EMAIL_PATTERN.match(email) or len(email) > 255:
+        return None, "invalid email"
+    if phone and (not PHONE_PATTERN.match(phone) or len(phone) > 15):
+        return None, "invalid phone"
+
+    if user_type == "freelancer":
+        rating = _text(row.get("rating"))
+        try:
+            rating = float(rating) if rating else None
+        except ValueError:
+            return None, "invalid rating"
+        if rating is not None and not 0 <= rating <= 5:
+            return None, "rating out of range"
+        available = _text(row.get("is_available")).lower()
+        is_available = 0 if available in ("0", "false", "no", "n") else 1
+        return (name, email, phone or None, _text(row.get("skills")) or None, rating, is_available), None
+
+    posted_jobs = _text(row.get("posted_jobs"))
+    try:
+        posted_jobs = int(float(posted_jobs)) if posted_jobs else 0
+    except ValueError:
+        return None, "invalid posted_jobs"
+    return (name, email, phone or None, _text(row.get("company_name"))[:255] or None, posted_jobs), None
+
+
+class BulkImporter:
+    """ Validates rows in chunks and inserts each chunk with one multi-row INSERT in its own transaction.
+
+    Duplicate emails (within the file or already in the table) are reported as rejects instead of
+    failing the chunk, so a partner file with a few bad rows still imports everything else. Only
+    the first max_rejects rejects are kept in the report; 'rejects_dropped' counts the rest.
+
+    Imported accounts have no password: each gets a one-time reset code (auth.new_reset_code),
+    listed with its email in the report's 'reset_codes' for the accounts actually inserted.
+    """
+
+    def __init__(self, user_type, chunk_size=1000, on_progress=None, max_rejects=1000):
+        self.user_type = user_type
+        self.spec = USER_TABLES[user_type]
+        self.chunk_size = chunk_size
+        self.on_progress = on_progress
+        self.max_rejects = max_rejects
+        self.report = {'processed': 0, 'inserted': 0, 'rejected': 0, 'rejects': [], 'rejects_dropped': 0,
+                       'reset_codes': [], 'seconds': 0.0}
+        self._seen_emails = set()
+
+        columns = self.spec['columns']
+        self._insert = (
+            f"INSERT INTO {self.spec['table']} ({', '.join(columns)}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})"
+        )
+
+    def _reject(self, position, email, reason):
+        self.report['rejected'] += 1
+        if len(self.report['rejects']) < self.max_rejects:
+            self.report['rejects'].append({**position, 'email': email, 'reason': reason})
+        else:
+            self.report['rejects_dropped'] += 1
+
+    def _existing_emails(self, cursor, emails):
+        if not emails:
+            return set()
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT email FROM {self.spec['table']} WHERE email IN ({placeholders})", tuple(emails))
+        return {email.lower() for (email,) in cursor.fetchall()}
+
+    def _insert_rows(self, connection, cursor, rows):
+        """ rows: [(position, values)]; returns the rows that were inserted. """
+        try:
+            # mysql-connector rewrites executemany on INSERT ... VALUES into a single multi-row INSERT
+            cursor.executemany(self._insert, [values for _, values in rows])
+            return rows
+        except mysql.connector.IntegrityError:
+            # Lost a race with a concurrent insert of the same email: redo the chunk row by row
+            connection.rollback()
+
+        inserted = []
+        for position, values in rows:
+            try:
+                cursor.execute(self._insert, values)
+                inserted.append((position, values))
+            except mysql.connector.IntegrityError as err:
+                self._reject(position, values[1], f"duplicate email ({err.msg})")
+        return inserted
+
+    def _index_skills(self, cursor, inserted):
+        emails = [values[1] for _, values in inserted]
+        placeholders = ", ".join(["%s"] * len(emails))
+        cursor.execute(f"SELECT freelancer_id, email FROM freelancer WHERE email IN ({placeholders})", tuple(emails))
+        ids = {email.lower(): freelancer_id for freelancer_id, email in cursor.fetchall()}
+        skill_index.index_freelancer_skills_bulk(
+            cursor, [(ids[values[1]], values[3]) for _, values in inserted if values[1] in ids]
+        )
+
+    def import_chunk(self, connection, cursor, chunk):
+        """ chunk: [(position, row dict)] as yielded by read_csv / read_parquet. """
+        valid = []
+        for position, row in chunk:
+            values, reason = validate(self.user_type, row)
+            if reason:
+                self._reject(position, _text(row.get("email")), reason)
+            elif values[1] in self._seen_emails:
+                self._reject(position, values[1], "duplicate email in file")
+            else:
+                self._seen_emails.add(values[1])
+                valid.append((position, values))
+
+        existing = self._existing_emails(cursor, [values[1] for _, values in valid])
+        rows, codes = [], {}
+        for position, values in valid:
+            if values[1] in existing:
+                self._reject(position, values[1], "duplicate email")
+            else:
+                codes[values[1]], marker = auth.new_reset_code()
+                rows.append((position, values + (marker,)))
+
+        if rows:
+            inserted = self._insert_rows(connection, cursor, rows)
+            if inserted and self.user_type == "freelancer":
+                self._index_skills(cursor, inserted)
+            self.report['inserted'] += len(inserted)
+        connection.commit()
+        if rows:
+            self.report['reset_codes'] += [{'email': values[1], 'code': codes[values[1]]} for _, values in inserted]
+
+        self.report['processed'] += len(chunk)
+        if self.on_progress:
+            self.on_progress(self.report)
+
+    def run(self, chunks):
+        start = time.perf_counter()
+        connection = DatabaseManager.get_connection()
+        try:
+            cursor = connection.cursor()
+            for chunk in chunks:
+                self.import_chunk(connection, cursor, chunk)
+            cursor.close()
+        finally:
+            connection.close()
+        self.report['seconds'] = time.perf_counter() - start
+        return self.report
+
+
+def import_file(file, user_type, file_format="csv", chunk_size=1000, on_progress=None, max_rejects=1000):
+    reader = read_parquet if file_format == "parquet" else read_csv
+    return BulkImporter(user_type, chunk_size, on_progress, max_rejects).run(reader(file, chunk_size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import freelancers or clients from CSV or Parquet.")
+    parser.add_argument("user_type", choices=list(USER_TABLES))
+    parser.add_argument("path")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--max-rejects", type=int, default=1000, help="rejects listed at the end; the rest are counted")
+    parser.add_argument("--reset-codes", default="reset_codes.csv",
+                        help="CSV of email and one-time password reset code of each imported account")
+    args = parser.parse_args()
+
+    file_format = "parquet" if args.path.endswith(".parquet") else "csv"
+    with open(args.path, "rb") as f:
+        report = import_file(
+            f, args.user_type, file_format, args.chunk_size, max_rejects=args.max_rejects,
+            on_progress=lambda r: print(f"processed {r['processed']} inserted {r['inserted']} rejected {r['rejected']}")
+        )
+    rate = report['processed'] / report['seconds'] * 60 if report['seconds'] else 0
+    print(f"done in {report['seconds']:.1f}s ({rate:,.0f} rows/min)")
+    for reject in report['rejects']:
+        where = f"record {reject['record']}" + (f" (line {reject['line']})" if reject['line'] is not None else "")
+        print(f"{where}: {reject['email']} - {reject['reason']}")
+    if report['rejects_dropped']:
+        print(f"... and {report['rejects_dropped']:,} more rejects not listed")
+    with open(args.reset_codes, "w", newline="", encoding="utf-8") as out:
+        writer = csv.DictWriter(out, fieldnames=["email", "code"])
+        writer.writeheader()
+        writer.writerows(report['reset_codes'])
+    print(f"reset codes for {len(report['reset_codes']):,} accounts written to {args.reset_codes}")
@@ -0,0 +1,89 @@
+import math
+import os
+
+import activity_rollups
+import archive
+import read_cache
+from database import DatabaseManager
+
+# Charts used to be fed raw rows: the freelancer's rating chart loaded every rating into a
+# DataFrame just to count scores, and the admin activity charts reindexed a DataFrame of every
+# bucket in the window on each rerun. The functions here leave the counting to MySQL (GROUP BY)
+# and return compact arrays, one list per axis, that go straight into plotly traces. Series
+# with more buckets than CHART_MAX_POINTS are downsampled in the same query by summing
+# consecutive buckets, so what reaches the browser is bounded whatever the window.
+
+RATING_SCORES = [1, 2, 3, 4, 5]
+
+RATING_DISTRIBUTION_QUERY = """
+    SELECT R.rating_score, COUNT(*)
+    FROM {ratings} R
+    JOIN {contracts} C ON R.contract_id = C.id
+    WHERE C.freelancer_id = %s
+    GROUP BY R.rating_score
+"""
+
+
+def max_points():
+    return int(os.environ.get("CHART_MAX_POINTS", 200))
+
+
+def step_for(buckets, limit=None):
+    """ Buckets summed into each point so that a series of `buckets` has at most limit points. """
+    return max(1, math.ceil(buckets / (limit or max_points())))
+
+
+def rating_distribution(freelancer_id, include_archive=False):
+    """ {'scores': [...], 'counts': [...]} of a freelancer's ratings, every score 1-5 included.
+
+    Counts the same ratings RatingService.fetch_ratings lists; cached under the same tag.
+    """
+    tags = [read_cache.freelancer(freelancer_id)]
+    tables = [archive.HOT_TABLES, archive.ARCHIVE_TABLES] if include_archive else [archive.HOT_TABLES]
+    query = " UNION ALL ".join(RATING_DISTRIBUTION_QUERY.format(**names) for names in tables)
+
+    def load():
+        connection = DatabaseManager.get_read_connection(tags)
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, (freelancer_id,) * len(tables))
+            counts = dict.fromkeys(RATING_SCORES, 0)
+            for score, count in cursor.fetchall():
+                counts[score] = counts.get(score, 0) + count
+            cursor.close()
+        finally:
+            connection.close()
+        return {'scores': sorted(counts), 'counts': [counts[score] for score in sorted(counts)]}
+
+    return read_cache.cached("rating_distribution", (freelancer_id, include_archive), tags, load)
+
+
+def activity_series(bucket, buckets, category=None, limit=None):
+    """ The last `buckets` activity buckets as {'x': [...], 'step': n, <metric>: [...], 'avg_rating': [...]}.
+
+    Every point of x is present; metrics are 0 and avg_rating None where nothing happened.
+    With more buckets than limit (CHART_MAX_POINTS), each point sums `step` buckets.
+    """
+    step = step_for(buckets, limit)
+    since = activity_rollups.window_start(bucket, buckets)
+    rows = {row['bucket_start']: row for row in activity_rollups.fetch_series(bucket, since, category, step)}
+    period = activity_rollups.BUCKET_SIZES[bucket] * step
+    series = {'x': [since + period * n for n in range(math.ceil(buckets / step))], 'step': step}
+    for metric in activity_rollups.METRICS:
+        series[metric] = [float(rows[x][metric]) if x in rows else 0.0 for x in series['x']]
+    series['avg_rating'] = [float(rows[x]['avg_rating']) if x in rows and rows[x]['avg_rating'] is not None else None
+                            for x in series['x']]
+    return series
+
+
+def ratings_by_category(bucket, buckets, category=None, limit=None):
+    """ {category: {'x': [...], 'avg_rating': [...], 'ratings': [...]}} for points with ratings. """
+    step = step_for(buckets, limit)
+    since = activity_rollups.window_start(bucket, buckets)
+    lines = {}
+    for row in activity_rollups.fetch_ratings_by_category(bucket, since, category, step):
+        line = lines.setdefault(row['category'] or "Uncategorized", {'x': [], 'avg_rating': [], 'ratings': []})
+        line['x'].append(row['bucket_start'])
+        line['avg_rating'].append(float(row['avg_rating']))
+        line['ratings'].append(int(row['ratings']))
+    return lines
@@ -1,62 +1,19 @@
 import streamlit as st
 import mysql.connector
-from plyer import notification  # Import plyer for Windows notifications
-
-st.markdown("""
-    <style>
-        /* Style for the main title */
-        .title {
-            font-size: 2.5em;
-            font-weight: bold;
-            color: #007BFF;
-            text-align: center;
-            margin-bottom: 1em;
-        }
-        
-        /* Style for headers */
-        .header {
-            font-size: 1.75em;
-            font-weight: bold;
-            color: #333333;
-            margin-top: 1em;
-            margin-bottom: 0.5em;
-        }
-        
-        /* Style for subheaders */
-        .subheader {
-            font-size: 1.3em;
-            color: #555555;
-            margin-bottom: 0.5em;
-        }
-        
-        /* Style for buttons */
-        .stButton button {
-            background-color: #28a745;
-            color: white;
-            font-size: 1em;
-            padding: 0.6em 1.2em;
-            border-radius: 8px;
-            transition: background-color 0.3s ease;
-        }
-        .stButton button:hover {
-            background-color: #218838;
-        }
-        
-        /* Style for sidebar */
-        .css-1d391kg {
-            background-color: #f0f2f6;
-        }
-        
-        /* Style for query information boxes */
-        .expander {
-            background-color: #e9ecef;
-            color: #333;
-            border: 1px solid #ccc;
-            padding: 0.8em;
-            border-radius: 8px;
-        }
-    </style>
-""", unsafe_allow_html=True)
+from database import DatabaseManager
+from client_work import ClientWork
+import notifications
+import query_metrics
+import read_cache
+import proposal_review
+import skill_index
+import virtual_list
+import auth
+import live_updates
+import shared_session
+import page_style
+
+page_style.apply("client")
 
 
 # Initialize session state for tracking proposal acceptance and completed contracts
@@ -70,52 +27,80 @@ if 'client_authenticated' not in st.session_state:
     st.session_state.client_authenticated = False
 if 'client_id' not in st.session_state:
     st.session_state.client_id = None
+if 'session_token' not in st.session_state:
+    st.session_state.session_token = None
 
-def show_notification(title, message):
-    notification.notify(
-        title=title,
-        message=message,
-        app_name="Freelancer App",
-        timeout=10  # Notification disappears after 10 seconds
-    )
+# Kept in the shared state store as well when the dashboard runs as several replicas
+PERSISTED_STATE = ('accepted_proposals', 'completed_contracts')
+
+# Deliver queued notifications in the background instead of on the request thread
+notifications.ensure_dispatcher()
+query_metrics.ensure_metrics_server()
 
 def get_db_connection():
     try:
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="root",
-            database="dbmsproject"
-        )
+        return DatabaseManager.get_connection()
     except mysql.connector.Error as err:
         st.error(f"Database connection error: {err}")
         return None
 
-def authenticate_client(email, phone):
-    connection = get_db_connection()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM client where email = %s AND phone = %s",(email, phone))
-    client= cursor.fetchone()
-    connection.close()
-    return client
+def restore_session():
+    """ Re-check the session token on every rerun; answered by the session store, not MySQL. """
+    session = shared_session.restore("client", PERSISTED_STATE)
+    st.session_state.client_authenticated = session is not None
+    if session is not None:
+        st.session_state.client_id = session['user_id']
+        st.session_state.name = session['name']
+
+def logout():
+    shared_session.end()
+    st.session_state.client_authenticated = False
+    st.session_state.client_id = None
 
 # Login form
 def login():
     st.markdown('<div class="title">Client Login</div>', unsafe_allow_html=True)
     
     email = st.text_input("Email")
-    phone = st.text_input("Phone", type="password")
+    password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        client = authenticate_client(email, phone)
-        if client:
-            st.session_state.client_authenticated = True
-            st.session_state.client_id = client['client_id']
-            st.session_state.name = client['name']
-            st.success(f"Welcome {client['name']}!")
+        try:
+            result = auth.login("client", email, password)
+        except auth.RateLimitedError as err:
+            st.error(str(err))
+            return False
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return False
+        if result:
+            token, session = result
+            shared_session.start(token)
+            restore_session()
+            st.success(f"Welcome {session['name']}!")
             return True
         else:
-            st.error("Invalid email or phone number. Please try again.")
+            st.error("Invalid email or password. Please try again.")
+
+    # New and imported accounts, and resets issued by an admin, come with a one-time code
+    with st.expander("Set a password"):
+        with st.form("set_password_form"):
+            reset_email = st.text_input("Email", key="reset_email")
+            code = st.text_input("Reset code")
+            new_password = st.text_input("New password", type="password")
+            if st.form_submit_button("Set password"):
+                if len(new_password) < 8:
+                    st.error("Choose a password of at least 8 characters.")
+                else:
+                    try:
+                        if auth.reset_password("client", reset_email, code, new_password):
+                            st.success("Password set. You can log in now.")
+                        else:
+                            st.error("That code is not valid for this email, or it has expired.")
+                    except auth.RateLimitedError as err:
+                        st.error(str(err))
+                    except mysql.connector.Error as err:
+                        st.error(f"Database error: {err}")
     return False
 
 def complete_contract(contract_id):
@@ -129,7 +114,9 @@ def complete_contract(contract_id):
             if contract:
                 # Update contract status to completed
                 cursor.execute("UPDATE Contracts SET status = 'Completed' WHERE id = %s", (contract_id,))
+                changed = read_cache.contract_tags(cursor, contract_id)
                 connection.commit()
+                read_cache.invalidate(*changed)
 
                 st.success(f"Contract {contract_id} marked as completed!")
                 st.session_state.completed_contracts.add(contract_id)
@@ -147,7 +134,10 @@ def add_rating(contract_id, rating_score, review_text):
         cursor = connection.cursor()
         try:
             cursor.callproc("AddRating", [contract_id, rating_score, review_text])
+            notifications.notify_contract_freelancer(cursor, contract_id, "New Rating", "Your work has been rated!")
+            changed = read_cache.contract_tags(cursor, contract_id)
             connection.commit()
+            read_cache.invalidate(*changed)
             st.success(f"Rating added for contract {contract_id}!")
         except mysql.connector.Error as err:
             st.error(f"Error adding rating: {err}")
@@ -155,6 +145,28 @@ def add_rating(contract_id, rating_score, review_text):
             cursor.close()
             connection.close()
 
+def fetch_page(list_key, fetch):
+    """ Fetch the current page of a keyset-paginated list; fetch(after_id) returns (rows, next_cursor). """
+    cursors = st.session_state.setdefault(f"{list_key}_cursors", [0])
+    try:
+        return fetch(cursors[-1])
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return [], None
+
+def page_controls(list_key, next_cursor):
+    cursors = st.session_state[f"{list_key}_cursors"]
+    if len(cursors) == 1 and next_cursor is None:
+        return
+    prev_col, page_col, next_col = st.columns([1, 2, 1])
+    if len(cursors) > 1 and prev_col.button("Previous", key=f"{list_key}_prev"):
+        cursors.pop()
+        st.rerun()
+    page_col.write(f"Page {len(cursors)}")
+    if next_cursor is not None and next_col.button("Next", key=f"{list_key}_next"):
+        cursors.append(next_cursor)
+        st.rerun()
+
 def display_query_info(query, description):
     """ Display the SQL query and its description in a modal. """
     with st.expander("Show Query", expanded=False):
@@ -170,10 +182,16 @@ def reject_proposal(proposal_id):
     try:
         cursor = connection.cursor(dictionary=True)
         
-        # Update the proposal status to 'Rejected'
-        update_query = "UPDATE Proposals SET status = 'Rejected' WHERE id = %s"
+        # Update the proposal status to 'Rejected' unless it was accepted meanwhile
+        update_query = "UPDATE Proposals SET status = 'Rejected' WHERE id = %s AND status = 'Pending'"
         cursor.execute(update_query, (proposal_id,))
+        if cursor.rowcount == 0:
+            connection.rollback()
+            st.error(f"Proposal {proposal_id} is no longer pending.")
+            return
+        changed = read_cache.proposal_tags(cursor, proposal_id)
         connection.commit()
+        read_cache.invalidate(*changed)
         st.success(f"Proposal {proposal_id} rejected successfully!")
     
     except mysql.connector.Error as err:
@@ -182,39 +200,22 @@ def reject_proposal(proposal_id):
         connection.close()
 
 def accept_proposal(proposal_id):
-    connection = get_db_connection()
-    if not connection:
-        st.error("Database connection error.")
-        return
-    
     try:
-        cursor = connection.cursor(dictionary=True)
-        
-        # Use our stored procedure instead of direct updates
-        cursor.execute("SET @status_message = ''")
-        cursor.callproc('accept_proposal', (proposal_id, '@status_message'))
-        
-        # Get the status message
-        cursor.execute("SELECT @status_message as message")
-        result = cursor.fetchone()
-        status_message = result['message']
-        
-        connection.commit()
-        
-        if 'success' in status_message.lower():
-            st.success(status_message)
-            show_notification("Attention Freelancer:", "Your Proposal has been Accepted")
-        else:
-            st.error(status_message)
-            
+        # Stored procedure with a job row lock, retried if InnoDB picks it as a deadlock victim
+        accepted, status_message = proposal_review.accept_proposal(proposal_id)
     except mysql.connector.Error as err:
         st.error(f"Error: {err}")
-    finally:
-        connection.close()
+        return
+
+    if accepted:
+        st.success(status_message)
+    else:
+        st.error(status_message)
 
 def post_job_and_review_proposals():
     st.markdown('<div class="title">Post A New Job</div>', unsafe_allow_html=True)
-    client_id = st.number_input("Client ID", min_value=1, step=1)
+    # Jobs are always posted for the signed-in client
+    client_id = st.session_state.client_id
     title = st.text_input("Job Title")
     description = st.text_area("Description")
     category = st.selectbox("Category", ["Web Development", "Graphic Design", "Writing"])
@@ -230,84 +231,245 @@ def post_job_and_review_proposals():
         if st.button("Show Query Info for Post Job"):
             display_query_info(query, "This query inserts a new job posting into the Jobs table.")
         
-        try:
-            connection = get_db_connection()
-            if connection:
-                cursor = connection.cursor()
-                cursor.execute(query, (title, description, category, budget, deadline, skills, client_id))
-                connection.commit()
-                cursor.close()
-                connection.close()
+        connection = get_db_connection()
+        if connection:
+            try:
+                try:
+                    cursor = connection.cursor()
+                    cursor.execute(query, (title, description, category, budget, deadline, skills, client_id))
+                    job_id = cursor.lastrowid
+                    skill_index.index_job_skills(cursor, job_id, skills)
+                    notifications.notify_matching_freelancers(cursor, job_id, "New Job Posted",
+                                                              f"A new job matching your skills was posted: {title}")
+                    connection.commit()
+                    cursor.close()
+                finally:
+                    connection.close()
+                import matching
+                matching.invalidate()
+                read_cache.invalidate(read_cache.OPEN_JOBS, read_cache.client(client_id))
                 st.success("Job posted successfully!")
-                show_notification("Attention Freelancer:", "A new Job has been Posted")
-        except mysql.connector.Error as err:
-            st.error(f"Error: {err}")
+            except mysql.connector.Error as err:
+                st.error(f"Error: {err}")
 
     # Display proposals for review immediately below the job posting section
+    review_posted_proposals()
+
+@live_updates.fragment
+def review_posted_proposals():
+    # Reruns on its own, so a new proposal shows up without repeating the rest of the page's queries
+    if 'proposal_submitted' in live_updates.poll("proposals", "client", st.session_state.client_id):
+        st.toast("New proposals arrived on your jobs.")
     st.markdown('<div class="title">Review Proposals for Your Posted Jobs</div>', unsafe_allow_html=True)
-    if client_id > 0:
-        connection = get_db_connection()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT * FROM Proposals WHERE job_id IN (SELECT id FROM Jobs WHERE client_id = %s)", (client_id,))
-            proposals = cursor.fetchall()
-            connection.close()
+    status = st.selectbox("Proposal Status", ["Pending", "Accepted", "Rejected"])
+    # Proposals decided long ago live in the archive tables and are only read on request
+    history = status != "Pending" and st.toggle("Include archived proposals", key="proposals_history")
+    list_key = f"proposals_{status}_history" if history else f"proposals_{status}"
+    proposals, next_cursor = fetch_page(
+        list_key,
+        lambda after_id: ClientWork.proposals(st.session_state.client_id, status, after_id, include_archive=history)
+    )
 
-            if proposals:
-                for proposal in proposals:
-                    st.subheader(f"Proposal for Job ID: {proposal['job_id']}")
-                    st.write(f"Cover Letter: {proposal['cover_letter']}")
-                    st.write(f"Proposed Rate: {proposal['proposed_rate']}")
-
-                    if proposal['id'] in st.session_state.accepted_proposals:
-                        st.success("Proposal already accepted!")
-                    else:
-                        # Accept proposal button
-                        if st.button("Accept Proposal", key=f"accept_{proposal['id']}"):
-                            query = "UPDATE Proposals SET status = 'Accepted' WHERE id = %s"
-                            display_query_info(query, "This query updates the proposal status to accepted.")
-                            st.session_state.accepted_proposals.add(proposal['id'])
-                            accept_proposal(proposal['id'])
-                            
-
-                        # Reject proposal button
-                        if st.button("Reject Proposal", key=f"reject_{proposal['id']}"):
-                            reject_proposal(proposal['id'])
-                            
-def review_contracts():
-    st.markdown('<div class="title">Review and Complete Contracts</div>', unsafe_allow_html=True)
+    if not proposals:
+        st.info(f"No {status.lower()} proposals on your jobs.")
+    elif status == "Pending" and st.toggle("Batch review", help="Decide on many proposals, then apply them in one go"):
+        review_proposals_batch(proposals)
+        page_controls(list_key, next_cursor)
+        return
+
+    if proposals:
+        virtual_list.render(list_key, proposals, PROPOSAL_LIST_COLUMNS, detail=review_proposal)
+    page_controls(list_key, next_cursor)
+
+# Columns of the proposal list; the full cover letter is only loaded for the selected proposal
+PROPOSAL_LIST_COLUMNS = {
+    'job_title': "Job", 'job_id': "Job ID", 'freelancer_name': "Freelancer", 'proposed_rate': "Proposed Rate",
+    'estimated_time': "Days", 'cover_letter': "Cover Letter",
+}
+
+def show_proposal(proposal):
+    st.subheader(f"Proposal for {proposal['job_title']} (Job ID: {proposal['job_id']})")
+    st.write(f"Freelancer: {proposal['freelancer_name']} | Estimated Time: {proposal['estimated_time']} days")
+    cover_letter = ClientWork.cover_letter(proposal['id']) if proposal['truncated'] else proposal['cover_letter']
+    st.write(f"Cover Letter: {cover_letter}")
+    st.write(f"Proposed Rate: {proposal['proposed_rate']}")
+
+def review_proposal(proposal):
+    show_proposal(proposal)
+
+    if proposal['status'] != 'Pending':
+        return
+    if proposal['id'] in st.session_state.accepted_proposals:
+        st.success("Proposal already accepted!")
+    else:
+        # Accept proposal button
+        if st.button("Accept Proposal", key=f"accept_{proposal['id']}"):
+            query = "UPDATE Proposals SET status = 'Accepted' WHERE id = %s"
+            display_query_info(query, "This query updates the proposal status to accepted.")
+            st.session_state.accepted_proposals.add(proposal['id'])
+            accept_proposal(proposal['id'])
+
+        # Reject proposal button
+        if st.button("Reject Proposal", key=f"reject_{proposal['id']}"):
+            reject_proposal(proposal['id'])
+
+def review_proposals_batch(proposals):
+    import pandas as pd
+
+    # One editable table inside a form: picking decisions neither reruns the script nor
+    # creates a widget per proposal
+    with st.form("batch_review"):
+        table = pd.DataFrame(proposals, columns=['id', *PROPOSAL_LIST_COLUMNS]).rename(columns=PROPOSAL_LIST_COLUMNS)
+        table.insert(0, "Decision", "Keep")
+        edited = st.data_editor(
+            table, key="batch_review_decisions", hide_index=True, use_container_width=True,
+            column_config={
+                "Decision": st.column_config.SelectboxColumn(options=["Keep", "Accept", "Reject"], required=True),
+                "id": None,
+            },
+            disabled=[column for column in table.columns if column != "Decision"],
+        )
+        submitted = st.form_submit_button("Apply Decisions")
+
+    if not submitted:
+        return
+    accept_ids = edited.loc[edited["Decision"] == "Accept", "id"].tolist()
+    reject_ids = edited.loc[edited["Decision"] == "Reject", "id"].tolist()
+    try:
+        result = proposal_review.review_proposals(st.session_state.client_id, accept_ids, reject_ids)
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return
+
+    st.session_state.accepted_proposals.update(proposal_id for _, proposal_id in result['accepted'])
+    st.success(f"{len(result['accepted'])} proposals accepted, {result['rejected']} rejected.")
+    if result['skipped']:
+        st.warning(f"{result['skipped']} accepts were skipped because the job was already closed "
+                   "or another proposal for it was accepted.")
+
+def recommend_freelancers(client_id, per_job=5, max_jobs=20):
+    # numpy and scipy load with the matching engine, on the first signed-in page rather than
+    # the login page
+    import matching
+
+    st.markdown('<div class="title">Recommended Freelancers</div>', unsafe_allow_html=True)
     connection = get_db_connection()
-    if connection:
+    if not connection:
+        return
+
+    try:
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Contracts WHERE status = 'In Progress'")
-        contracts = cursor.fetchall()
+        cursor.execute(
+            "SELECT id, title FROM Jobs WHERE client_id = %s AND status = 'Open' ORDER BY id DESC LIMIT %s",
+            (client_id, max_jobs)
+        )
+        jobs = cursor.fetchall()
+
+        engine = matching.get_engine()
+        recommendations = {job['id']: engine.recommend_freelancers(job['id'], per_job) for job in jobs}
+
+        # One lookup for every recommended freelancer across all jobs
+        freelancer_ids = sorted({fid for matches in recommendations.values() for fid, _ in matches})
+        freelancers = {}
+        if freelancer_ids:
+            placeholders = ", ".join(["%s"] * len(freelancer_ids))
+            cursor.execute(
+                f"SELECT freelancer_id, name, skills, rating FROM freelancer WHERE freelancer_id IN ({placeholders})",
+                tuple(freelancer_ids)
+            )
+            freelancers = {row['freelancer_id']: row for row in cursor.fetchall()}
+        cursor.close()
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return
+    finally:
         connection.close()
 
-        for contract in contracts:
-            st.subheader(f"Contract ID: {contract['id']} for Job ID: {contract['job_id']}")
-            if st.button("Complete Contract", key=f"complete_{contract['id']}"):
-                query = "UPDATE Contracts SET status = 'Completed' WHERE id = %s"
-                display_query_info(query, "This query marks the contract as completed.")
-                complete_contract(contract['id'])
+    if not jobs:
+        st.info("Post a job to get freelancer recommendations.")
+
+    for job in jobs:
+        with st.expander(f"{job['title']} (Job ID: {job['id']})"):
+            matches = [(freelancers[fid], score) for fid, score in recommendations[job['id']] if fid in freelancers]
+            if not matches:
+                st.write("No matching freelancers yet.")
+            for freelancer, score in matches:
+                st.write(f"**{freelancer['name']}** | Skills: {freelancer['skills']} | "
+                         f"Rating: {freelancer['rating']} | Match: {score:.0%}")
+
+def search_freelancers():
+    st.markdown('<div class="title">Find Freelancers</div>', unsafe_allow_html=True)
+    skills = st.text_input("Skills (comma-separated)", key="freelancer_search", placeholder="e.g. python, django")
+    if not skills.strip():
+        return
+
+    try:
+        freelancers = skill_index.search_freelancers(skills)
+    except mysql.connector.Error as err:
+        st.error(f"Error: {err}")
+        return
+
+    if not freelancers:
+        st.info("No available freelancers have these skills.")
+    for freelancer in freelancers:
+        st.write(f"**{freelancer['name']}** (ID: {freelancer['freelancer_id']}) | Skills: {freelancer['skills']} | "
+                 f"Rating: {freelancer['rating']} | Matched skills: {freelancer['matched_skills']}")
 
+def show_inbox(client_id):
+    with st.sidebar.expander("Notifications"):
+        try:
+            rows = notifications.inbox("client", client_id, limit=10)
+        except mysql.connector.Error as err:
+            st.error(f"Error: {err}")
+            return
+        if not rows:
+            st.write("No notifications yet.")
+        for row in rows:
+            st.write(f"**{row['title']}**: {row['message']}")
+
+@live_updates.fragment
+def review_contracts():
+    if 'contract_completed' in live_updates.poll("contracts_in_progress", "client", st.session_state.client_id):
+        st.toast("A freelancer completed one of your contracts.")
+    st.markdown('<div class="title">Review and Complete Contracts</div>', unsafe_allow_html=True)
+    contracts, next_cursor = fetch_page(
+        "contracts_in_progress",
+        lambda after_id: ClientWork.contracts(st.session_state.client_id, "In Progress", after_id=after_id)
+    )
+
+    virtual_list.render("contracts_in_progress", contracts, CONTRACT_LIST_COLUMNS, detail=review_contract)
+    page_controls("contracts_in_progress", next_cursor)
+
+CONTRACT_LIST_COLUMNS = {'id': "Contract ID", 'job_title': "Job", 'job_id': "Job ID", 'payment': "Payment"}
+
+def review_contract(contract):
+    st.subheader(f"Contract ID: {contract['id']} for {contract['job_title']} (Job ID: {contract['job_id']})")
+    if st.button("Complete Contract", key=f"complete_{contract['id']}"):
+        query = "UPDATE Contracts SET status = 'Completed' WHERE id = %s"
+        display_query_info(query, "This query marks the contract as completed.")
+        complete_contract(contract['id'])
+
+@live_updates.fragment
 def rate_completed_contracts():
+    live_updates.poll("contracts_unrated", "client", st.session_state.client_id)
     st.markdown('<div class="title">Rate Completed Contracts</div>', unsafe_allow_html=True)
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Contracts WHERE status = 'Completed'")
-        contracts = cursor.fetchall()
-        connection.close()
+    # Contracts that already have a rating are left out
+    contracts, next_cursor = fetch_page(
+        "contracts_unrated",
+        lambda after_id: ClientWork.contracts(st.session_state.client_id, "Completed", unrated_only=True, after_id=after_id)
+    )
+
+    virtual_list.render("contracts_unrated", contracts, CONTRACT_LIST_COLUMNS, detail=rate_contract)
+    page_controls("contracts_unrated", next_cursor)
 
-        for contract in contracts:
-            st.subheader(f"Rate Contract ID: {contract['id']}")
-            rating_score = st.slider("Rating Score", 1, 5, 3, key=f"rating_{contract['id']}")
-            review_text = st.text_area("Review Text", key=f"review_{contract['id']}")
-            if st.button("Submit Rating", key=f"submit_rating_{contract['id']}"):
-                query = "CALL AddRating(%s, %s, %s)"
-                display_query_info(query, "This query calls the stored procedure to add a rating and review for the completed contract.")
-                add_rating(contract['id'], rating_score, review_text)
-                show_notification("Attention Freelancer:", "Your work has been rated!")
+def rate_contract(contract):
+    st.subheader(f"Rate Contract ID: {contract['id']} for {contract['job_title']}")
+    rating_score = st.slider("Rating Score", 1, 5, 3, key=f"rating_{contract['id']}")
+    review_text = st.text_area("Review Text", key=f"review_{contract['id']}")
+    if st.button("Submit Rating", key=f"submit_rating_{contract['id']}"):
+        query = "CALL AddRating(%s, %s, %s)"
+        display_query_info(query, "This query calls the stored procedure to add a rating and review for the completed contract.")
+        add_rating(contract['id'], rating_score, review_text)
 
 
 
@@ -316,16 +478,24 @@ def rate_completed_contracts():
 
 
 
+restore_session()
 if not st.session_state.client_authenticated:
     if login():
         st.rerun()
 else:
     st.image("Client.png", use_column_width=True)  # Replace with your banner image path
+    if st.sidebar.button("Logout"):
+        logout()
+        st.rerun()
 
 
 
 
 
+    show_inbox(st.session_state.client_id)
     post_job_and_review_proposals()
+    recommend_freelancers(st.session_state.client_id)
+    search_freelancers()
     review_contracts()
     rate_completed_contracts()
+    shared_session.save(PERSISTED_STATE)
@@ -0,0 +1,104 @@
+import archive
+import read_cache
+from database import DatabaseManager
+
+# Explicit column lists; cover letters are truncated here and the full text is fetched on demand.
+PROPOSAL_COLUMNS = """
+    P.id, P.job_id, J.title AS job_title, P.freelancer_id, F.name AS freelancer_name,
+    P.proposed_rate, P.estimated_time, P.status,
+    LEFT(P.cover_letter, 500) AS cover_letter, CHAR_LENGTH(P.cover_letter) > 500 AS truncated
+"""
+
+CONTRACT_COLUMNS = """
+    C.id, C.job_id, J.title AS job_title, C.freelancer_id, C.payment, C.status
+"""
+
+
+class ClientWork:
+    """ Client-scoped, status-filtered, keyset-paginated proposal and contract queries.
+
+    Every query starts from the client's own jobs (idx_jobs_client_status) and reaches
+    proposals/contracts through (job_id, status) indexes, so cost follows the client's
+    own open work rather than the size of the platform's history. Archived history is only
+    read when a list asks for it.
+    """
+
+    @staticmethod
+    def _fetch_page(client_id, query, params, page_size, history=False):
+        """ Cached per client; writes touching any of the client's jobs invalidate read_cache.client(client_id). """
+        tags = [read_cache.client(client_id)]
+        paged = archive.with_history if history else archive.hot_only
+        query, params = paged(query, params, "id", page_size + 1)
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                cursor.close()
+            finally:
+                connection.close()
+
+            next_cursor = None
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                next_cursor = rows[-1]['id']
+            return rows, next_cursor
+
+        return read_cache.cached("client_work", (query, params, page_size), tags, load)
+
+    @staticmethod
+    def proposals(client_id, status="Pending", after_id=0, page_size=20, include_archive=False):
+        """ Proposals on the client's jobs; returns (rows, next_cursor).
+
+        Pending proposals only matter on jobs that are still open, which keeps the
+        default review list bounded by the client's open work. Decided proposals are
+        eventually archived; include_archive pages through those as well.
+        """
+        open_jobs = "AND J.status = 'Open'" if status == "Pending" else ""
+        query = f"""
+            SELECT {PROPOSAL_COLUMNS}
+            FROM jobs J
+            JOIN {{proposals}} P ON P.job_id = J.id
+            JOIN freelancer F ON F.freelancer_id = P.freelancer_id
+            WHERE J.client_id = %s
+            {open_jobs}
+            AND P.status = %s
+            AND P.id > %s
+        """
+        return ClientWork._fetch_page(client_id, query, (client_id, status, after_id or 0), page_size,
+                                      history=include_archive and status != "Pending")
+
+    @staticmethod
+    def contracts(client_id, status="In Progress", unrated_only=False, after_id=0, page_size=20):
+        """ The client's contracts in the given status; returns (rows, next_cursor). """
+        unrated = "AND NOT EXISTS (SELECT 1 FROM {ratings} R WHERE R.contract_id = C.id)" if unrated_only else ""
+        query = f"""
+            SELECT {CONTRACT_COLUMNS}
+            FROM jobs J
+            JOIN {{contracts}} C ON C.job_id = J.id
+            WHERE J.client_id = %s
+            AND C.status = %s
+            AND C.id > %s
+            {unrated}
+        """
+        return ClientWork._fetch_page(client_id, query, (client_id, status, after_id or 0), page_size)
+
+    @staticmethod
+    def cover_letter(proposal_id):
+        connection = DatabaseManager.get_read_connection()
+        try:
+            cursor = connection.cursor()
+            # The proposal may have been archived since its row was listed
+            cursor.execute("""
+                SELECT cover_letter FROM proposals WHERE id = %s
+                UNION ALL
+                SELECT cover_letter FROM proposals_archive WHERE id = %s
+                LIMIT 1
+            """, (proposal_id, proposal_id))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        return row[0] if row else None
@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from database import get_pool
+
+# Columnar snapshots of the marketplace tables for offline analysis (offline_analytics.py and
+# the admin dashboard's Offline Analytics tab). Each table is streamed through an unbuffered
+# cursor in bounded chunks, so memory stays flat however large the table is, and written as
+# hive-partitioned Parquet or Arrow IPC files under EXPORT_DIR/<snapshot>/<table>/.
+# All tables are read inside one consistent-snapshot transaction.
+
+# Money columns are exported as DOUBLE so the analytics side aggregates plain floats
+# rather than Python Decimal objects. Every table carries its job's category. Snapshots hold
+# the full history: archived proposals, contracts and ratings (archive.py) are included.
+EXPORT_TABLES = {
+    'jobs': {
+        'query': """
+            SELECT id, title, CAST(budget AS DOUBLE) AS budget, deadline, status,
+                   COALESCE(category, '') AS category, client_id
+            FROM jobs
+        """,
+        'partition_by': 'category',
+    },
+    'proposals': {
+        'query': """
+            SELECT P.id, P.job_id, P.freelancer_id, CAST(P.proposed_rate AS DOUBLE) AS proposed_rate,
+                   P.estimated_time, P.status, COALESCE(J.category, '') AS category
+            FROM proposals P JOIN jobs J ON J.id = P.job_id
+            UNION ALL
+            SELECT P.id, P.job_id, P.freelancer_id, CAST(P.proposed_rate AS DOUBLE) AS proposed_rate,
+                   P.estimated_time, P.status, COALESCE(J.category, '') AS category
+            FROM proposals_archive P JOIN jobs J ON J.id = P.job_id
+        """,
+        'partition_by': 'status',
+    },
+    'contracts': {
+        'query': """
+            SELECT C.id, C.job_id, C.freelancer_id, CAST(C.payment AS DOUBLE) AS payment, C.status,
+                   COALESCE(J.category, '') AS category
+            FROM contracts C JOIN jobs J ON J.id = C.job_id
+            UNION ALL
+            SELECT C.id, C.job_id, C.freelancer_id, CAST(C.payment AS DOUBLE) AS payment, C.status,
+                   COALESCE(J.category, '') AS category
+            FROM contracts_archive C JOIN jobs J ON J.id = C.job_id
+        """,
+        'partition_by': 'status',
+    },
+    'ratings': {
+        'query': """
+            SELECT R.rating_id, R.contract_id, C.freelancer_id, R.rating_score, R.rating_date,
+                   COALESCE(J.category, '') AS category, DATE_FORMAT(R.rating_date, '%Y-%m') AS rating_month
+            FROM ratings R
+            JOIN contracts C ON C.id = R.contract_id
+            JOIN jobs J ON J.id = C.job_id
+            UNION ALL
+            SELECT R.rating_id, R.contract_id, C.freelancer_id, R.rating_score, R.rating_date,
+                   COALESCE(J.category, '') AS category, DATE_FORMAT(R.rating_date, '%Y-%m') AS rating_month
+            FROM ratings_archive R
+            JOIN contracts_archive C ON C.id = R.contract_id
+            JOIN jobs J ON J.id = C.job_id
+        """,
+        'partition_by': 'rating_month',
+    },
+}
+
+FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+
+def export_dir():
+    return os.environ.get("EXPORT_DIR", "exports")
+
+
+def schemas():
+    import pyarrow as pa
+
+    return {
+        'jobs': pa.schema([
+            ('id', pa.int64()), ('title', pa.string()), ('budget', pa.float64()), ('deadline', pa.date32()),
+            ('status', pa.string()), ('category', pa.string()), ('client_id', pa.int64()),
+        ]),
+        'proposals': pa.schema([
+            ('id', pa.int64()), ('job_id', pa.int64()), ('freelancer_id', pa.int64()),
+            ('proposed_rate', pa.float64()), ('estimated_time', pa.int64()), ('status', pa.string()),
+            ('category', pa.string()),
+        ]),
+        'contracts': pa.schema([
+            ('id', pa.int64()), ('job_id', pa.int64()), ('freelancer_id', pa.int64()), ('payment', pa.float64()),
+            ('status', pa.string()), ('category', pa.string()),
+        ]),
+        'ratings': pa.schema([
+            ('rating_id', pa.int64()), ('contract_id', pa.int64()), ('freelancer_id', pa.int64()),
+            ('rating_score', pa.int64()), ('rating_date', pa.timestamp('s')), ('category', pa.string()),
+            ('rating_month', pa.string()),
+        ]),
+    }
+
+
+def to_table(rows, schema):
+    """ Build an Arrow table from a chunk of row tuples, column by column. """
+    import pyarrow as pa
+
+    columns = list(zip(*rows)) if rows else [()] * len(schema)
+    return pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                schema=schema)
+
+
+def write_chunk(table, directory, partition_by, chunk_number, file_format):
+    import pyarrow.dataset as ds
+
+    ds.write_dataset(
+        table, directory,
+        format="ipc" if file_format == "arrow" else "parquet",
+        partitioning=[partition_by], partitioning_flavor="hive",
+        basename_template=f"chunk-{chunk_number:05d}-{{i}}.{FORMATS[file_format]}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def export_table(cursor, name, directory, chunk_size, file_format, on_progress=None):
+    """ Stream one table into directory; returns the number of rows written. """
+    spec = EXPORT_TABLES[name]
+    schema = schemas()[name]
+    cursor.execute(spec['query'])
+    rows_written = 0
+    chunk_number = 0
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        write_chunk(to_table(rows, schema), directory, spec['partition_by'], chunk_number, file_format)
+        rows_written += len(rows)
+        chunk_number += 1
+        if on_progress:
+            on_progress(name, rows_written)
+    return rows_written
+
+
+def export_snapshot(tables=None, chunk_size=None, file_format=None, base_dir=None, on_progress=None):
+    """ Export the given tables (default: all) as a new snapshot; returns its manifest.
+
+    The snapshot is written to a temporary directory and renamed into place when complete,
+    and LATEST is only updated after that, so readers never see a partial export.
+    """
+    tables = list(tables or EXPORT_TABLES)
+    chunk_size = chunk_size or int(os.environ.get("EXPORT_CHUNK_SIZE", 50000))
+    file_format = file_format or os.environ.get("EXPORT_FORMAT", "parquet")
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown export format {file_format!r}; expected one of {sorted(FORMATS)}")
+    base_dir = base_dir or export_dir()
+
+    snapshot = datetime.now().strftime("%Y%m%dT%H%M%S")
+    staging = os.path.join(base_dir, f".{snapshot}.tmp")
+    os.makedirs(staging, exist_ok=True)
+
+    # A dedicated pool keeps a long export from holding the dashboards' connections; point
+    # EXPORT_DB_PREFIX at a replica's settings (e.g. REPLICA -> REPLICA_HOST, ...) to spare the primary.
+    connection = get_pool("export", os.environ.get("EXPORT_DB_PREFIX", "DB")).get_connection()
+    start = time.perf_counter()
+    counts = {}
+    try:
+        cursor = connection.cursor()
+        cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        for name in tables:
+            counts[name] = export_table(cursor, name, os.path.join(staging, name), chunk_size, file_format,
+                                        on_progress)
+        connection.commit()
+        cursor.close()
+    except BaseException:
+        connection.rollback()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    finally:
+        connection.close()
+
+    manifest = {
+        'snapshot': snapshot,
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+        'format': file_format,
+        'chunk_size': chunk_size,
+        'rows': counts,
+        'partitioning': {name: EXPORT_TABLES[name]['partition_by'] for name in tables},
+        'seconds': round(time.perf_counter() - start, 2),
+    }
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(staging, os.path.join(base_dir, snapshot))
+    with open(os.path.join(base_dir, "LATEST.tmp"), "w") as f:
+        f.write(snapshot)
+    os.replace(os.path.join(base_dir, "LATEST.tmp"), os.path.join(base_dir, "LATEST"))
+    return manifest
+
+
+def prune_snapshots(keep=3, base_dir=None):
+    """ Delete all but the newest `keep` snapshots; returns the removed snapshot names. """
+    base_dir = base_dir or export_dir()
+    if not os.path.isdir(base_dir):
+        return []
+    snapshots = sorted(entry for entry in os.listdir(base_dir)
+                       if os.path.isfile(os.path.join(base_dir, entry, "manifest.json")))
+    removed = snapshots[:-keep] if keep > 0 else snapshots
+    for snapshot in removed:
+        shutil.rmtree(os.path.join(base_dir, snapshot))
+    return removed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export marketplace tables to partitioned Parquet/Arrow files.")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), help="default: all tables")
+    parser.add_argument("--chunk-size", type=int, help="rows fetched and written per chunk (default EXPORT_CHUNK_SIZE)")
+    parser.add_argument("--format", choices=list(FORMATS), help="default EXPORT_FORMAT, i.e. parquet")
+    parser.add_argument("--output", help="export directory (default EXPORT_DIR)")
+    parser.add_argument("--keep", type=int, default=3, help="snapshots to keep after exporting")
+    args = parser.parse_args()
+
+    manifest = export_snapshot(args.tables, args.chunk_size, args.format, args.output,
+                               on_progress=lambda table, rows: print(f"{table}: {rows:,} rows", end="\r"))
+    print(f"\nexported snapshot {manifest['snapshot']} in {manifest['seconds']}s: {manifest['rows']}")
+    for snapshot in prune_snapshots(args.keep, args.output):
+        print(f"removed old snapshot {snapshot}")
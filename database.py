@@ -0,0 +1,449 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector import errorcode, errors
+
+import query_metrics
+import state_store
+
+
+def load_config(prefix="DB"):
+    """ Read connection and pool settings from the environment, e.g. DB_HOST, DB_POOL_SIZE. """
+    def env(key, default):
+        return os.environ.get(f"{prefix}_{key}", default)
+
+    return {
+        'connection': {
+            'host': env("HOST", "localhost"),
+            'port': int(env("PORT", 3306)),
+            'user': env("USER", "root"),
+            'password': env("PASSWORD", "root"),
+            'database': env("NAME", "dbmsproject"),
+        },
+        'size': int(env("POOL_SIZE", 10)),
+        'timeout': float(env("POOL_TIMEOUT", 5)),
+        'idle_timeout': float(env("POOL_IDLE_TIMEOUT", 300)),
+        'ping_interval': float(env("POOL_PING_INTERVAL", 30)),
+    }
+
+
+class PoolExhaustedError(errors.PoolError):
+    pass
+
+
+class PooledConnection:
+    """ Proxy around a pooled connection; close() hands it back to the pool instead of disconnecting. """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        if self.__dict__.get('_connection') is None:
+            raise errors.OperationalError("Connection has already been returned to the pool")
+        return getattr(self._connection, name)
+
+    def cursor(self, *args, **kwargs):
+        # Every dashboard query goes through here, so this is where statements get timed
+        return query_metrics.instrument(self.__getattr__("cursor")(*args, **kwargs))
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, name, connection_config, size=10, timeout=5.0, idle_timeout=300.0, ping_interval=30.0):
+        self.name = name
+        self._connection_config = connection_config
+        self._size = size
+        self._timeout = timeout
+        self._idle_timeout = idle_timeout
+        self._ping_interval = ping_interval
+
+        # Idle connections as (connection, last_used); checkout pops from the right so hot
+        # connections are reused and the cold ones on the left age out and get reaped.
+        self._idle = deque()
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._counters = {
+            'checkouts': 0,
+            'waits': 0,
+            'total_wait': 0.0,
+            'max_wait': 0.0,
+            'timeouts': 0,
+            'peak_in_use': 0,
+            'created': 0,
+            'reaped': 0,
+            'discarded': 0,
+        }
+
+    def _connect(self):
+        connection = mysql.connector.connect(**self._connection_config)
+        with self._cond:
+            self._counters['created'] += 1
+        return connection
+
+    def _reap_idle(self, now):
+        # Caller holds the lock; connections are closed by the caller outside of it.
+        expired = []
+        while self._idle and now - self._idle[0][1] > self._idle_timeout:
+            expired.append(self._idle.popleft()[0])
+        self._counters['reaped'] += len(expired)
+        return expired
+
+    @staticmethod
+    def _disconnect(connections):
+        for connection in connections:
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
+
+    def get_connection(self):
+        start = time.monotonic()
+        deadline = start + self._timeout
+        waited = timed_out = False
+        connection = last_used = None
+        expired = []
+
+        with self._cond:
+            while True:
+                expired.extend(self._reap_idle(time.monotonic()))
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._in_use < self._size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    timed_out = True
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+            if not timed_out:
+                self._in_use += 1
+                wait = time.monotonic() - start
+                self._counters['checkouts'] += 1
+                self._counters['total_wait'] += wait
+                self._counters['max_wait'] = max(self._counters['max_wait'], wait)
+                self._counters['waits'] += int(waited)
+                self._counters['peak_in_use'] = max(self._counters['peak_in_use'], self._in_use)
+
+        self._disconnect(expired)
+        if timed_out:
+            raise PoolExhaustedError(f"No connection available in pool '{self.name}' after {self._timeout:.1f}s")
+
+        try:
+            if connection is None:
+                connection = self._connect()
+            elif time.monotonic() - last_used > self._ping_interval:
+                # Health check only connections that sat idle long enough to have been dropped
+                # by the server's wait_timeout; recently used ones are trusted without a round trip.
+                try:
+                    connection.ping(reconnect=False)
+                except mysql.connector.Error:
+                    self._disconnect([connection])
+                    with self._cond:
+                        self._counters['discarded'] += 1
+                    connection = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        return PooledConnection(self, connection)
+
+    def release(self, connection):
+        healthy = True
+        try:
+            if connection.unread_result:
+                connection.consume_results()
+            # Always end the transaction so the next borrower does not inherit locks or
+            # a stale REPEATABLE READ snapshot from this one.
+            if connection.in_transaction:
+                connection.rollback()
+        except mysql.connector.Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            now = time.monotonic()
+            if healthy:
+                self._idle.append((connection, now))
+            else:
+                self._counters['discarded'] += 1
+            expired = self._reap_idle(now)
+            self._cond.notify()
+
+        if not healthy:
+            expired.append(connection)
+        self._disconnect(expired)
+
+    def stats(self):
+        with self._cond:
+            counters = dict(self._counters)
+            in_use = self._in_use
+            idle = len(self._idle)
+        checkouts = counters['checkouts']
+        return {
+            'pool': self.name,
+            'size': self._size,
+            'in_use': in_use,
+            'idle': idle,
+            'utilization': in_use / self._size if self._size else 0.0,
+            'avg_wait': counters['total_wait'] / checkouts if checkouts else 0.0,
+            **counters,
+        }
+
+    def close_all(self):
+        with self._cond:
+            idle = [connection for connection, _ in self._idle]
+            self._idle.clear()
+        self._disconnect(idle)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(name="primary", prefix="DB"):
+    """ Return the process-wide pool registered under name, creating it from the environment on first use. """
+    pool = _pools.get(name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(name)
+            if pool is None:
+                config = load_config(prefix)
+                pool = ConnectionPool(
+                    name,
+                    config['connection'],
+                    size=config['size'],
+                    timeout=config['timeout'],
+                    idle_timeout=config['idle_timeout'],
+                    ping_interval=config['ping_interval'],
+                )
+                _pools[name] = pool
+    return pool
+
+
+def pool_stats():
+    return [pool.stats() for pool in list(_pools.values())]
+
+
+# InnoDB rolls back a deadlock victim's whole transaction, so rerunning it from the start is safe.
+RETRYABLE_ERRORS = (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+_transaction_counters = {'retries': 0, 'gave_up': 0}
+_transaction_lock = threading.Lock()
+
+
+def run_in_transaction(work, attempts=5, base_delay=0.02, **cursor_options):
+    """ Run work(cursor) on a pooled connection and commit, retrying on deadlock or lock wait timeout.
+
+    work must do nothing but database work, since it can run more than once.
+    """
+    for attempt in range(1, attempts + 1):
+        connection = get_pool().get_connection()
+        try:
+            cursor = connection.cursor(**cursor_options)
+            result = work(cursor)
+            connection.commit()
+            cursor.close()
+            return result
+        except errors.Error as err:
+            if err.errno not in RETRYABLE_ERRORS:
+                raise
+            with _transaction_lock:
+                _transaction_counters['gave_up' if attempt == attempts else 'retries'] += 1
+            if attempt == attempts:
+                raise
+        finally:
+            connection.close()
+        # Full jitter, so transactions that deadlocked each other do not collide again
+        time.sleep(random.uniform(0, base_delay * 2 ** attempt))
+
+
+def transaction_stats():
+    with _transaction_lock:
+        return dict(_transaction_counters)
+
+
+# Read-only queries (feeds, listings, ratings, admin stats) can be served by replicas, which
+# keeps that load off the primary where proposals are accepted. DB_REPLICAS lists the
+# environment prefixes of the replicas, e.g. "REPLICA" for REPLICA_HOST, REPLICA_PORT, ...
+# A replica is used while its last measured lag is within DB_REPLICA_MAX_LAG seconds. Reads
+# tagged with an entity written in the last DB_READ_YOUR_WRITES_WINDOW seconds (see
+# read_cache tags) stay on the primary, so a user always sees their own writes. The write
+# times are kept in the state store, so with a shared STATE_STORE the next request sees them
+# whichever dashboard replica serves it. Lagging or unreachable replicas are skipped, and
+# reads fall back to the primary when none is usable.
+
+class Replica:
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.pool = get_pool(f"replica:{prefix}", prefix)
+        self.lag = None
+        self.checked_at = None
+        self._checking = False
+        self._lock = threading.Lock()
+
+    def _measure(self):
+        """ Seconds behind the source, or None if the replica is unreachable or not replicating. """
+        try:
+            connection = self.pool.get_connection()
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute("SHOW REPLICA STATUS")
+                status = cursor.fetchone()
+                cursor.close()
+            finally:
+                connection.close()
+        except errors.Error:
+            return None
+        if status is None:
+            # Not replicating from anything: a standalone copy, e.g. the primary itself in development
+            return 0.0
+        lag = status.get('Seconds_Behind_Source')
+        return None if lag is None else float(lag)
+
+    def usable(self, max_lag, check_interval):
+        """ True if the replica's lag is within max_lag, re-measuring it every check_interval seconds. """
+        with self._lock:
+            due = not self._checking and (self.checked_at is None
+                                          or time.monotonic() - self.checked_at >= check_interval)
+            if due:
+                self._checking = True
+        if due:
+            # One thread measures; the others use the previous measurement meanwhile
+            lag = self._measure()
+            with self._lock:
+                self.lag, self.checked_at, self._checking = lag, time.monotonic(), False
+        return self.lag is not None and self.lag <= max_lag
+
+    def mark_down(self):
+        with self._lock:
+            self.lag, self.checked_at = None, time.monotonic()
+
+
+class ReplicaRouter:
+    def __init__(self, prefixes, max_lag=5.0, check_interval=2.0, sticky_window=None):
+        self.replicas = [Replica(prefix) for prefix in prefixes]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # A write is visible on any usable replica once max_lag plus one check interval has passed
+        self.sticky_window = max_lag + check_interval if sticky_window is None else sticky_window
+        self._next = 0
+        self._lock = threading.Lock()
+        self._counters = {'replica_reads': 0, 'primary_reads': 0, 'sticky_reads': 0, 'fallback_reads': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def note_writes(self, tags):
+        if not self.replicas:
+            return
+        store, now = state_store.get_store(), time.time()
+        for tag in tags:
+            # The expiry only cleans up; stores round it to whole seconds, so the stored time decides
+            store.set(f"written:{tag}", now, ttl=self.sticky_window + 1)
+
+    def _recently_written(self, tags):
+        store, now = state_store.get_store(), time.time()
+        for tag in tags:
+            written_at = store.get(f"written:{tag}")
+            if written_at is not None and now - written_at < self.sticky_window:
+                return True
+        return False
+
+    def connection(self, tags=()):
+        if not self.replicas:
+            self._count('primary_reads')
+            return get_pool().get_connection()
+        if tags and self._recently_written(tags):
+            self._count('sticky_reads')
+            return get_pool().get_connection()
+
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.replicas)
+        for replica in self.replicas[start:] + self.replicas[:start]:
+            if not replica.usable(self.max_lag, self.check_interval):
+                continue
+            try:
+                connection = replica.pool.get_connection()
+            except errors.Error:
+                replica.mark_down()
+                continue
+            self._count('replica_reads')
+            return connection
+        self._count('fallback_reads')
+        return get_pool().get_connection()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            'replicas': [{'replica': replica.prefix, 'lag': replica.lag,
+                          'usable': replica.lag is not None and replica.lag <= self.max_lag}
+                         for replica in self.replicas],
+        }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                window = os.environ.get("DB_READ_YOUR_WRITES_WINDOW")
+                _router = ReplicaRouter(
+                    [prefix.strip() for prefix in os.environ.get("DB_REPLICAS", "").split(",") if prefix.strip()],
+                    max_lag=float(os.environ.get("DB_REPLICA_MAX_LAG", 5)),
+                    check_interval=float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 2)),
+                    sticky_window=float(window) if window else None,
+                )
+    return _router
+
+
+def note_writes(*tags):
+    """ Keep reads tagged with any of tags on the primary until replicas have caught up. """
+    get_router().note_writes(tags)
+
+
+class DatabaseManager:
+    @staticmethod
+    def get_connection():
+        return get_pool().get_connection()
+
+    @staticmethod
+    def get_read_connection(tags=()):
+        """ Connection for read-only queries: a replica when one is configured and current enough. """
+        return get_router().connection(tags)
+
+    @staticmethod
+    def pool_stats():
+        return pool_stats()
+
+    @staticmethod
+    def read_routing_stats():
+        return get_router().stats()
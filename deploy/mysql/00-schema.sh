@@ -0,0 +1,5 @@
+#!/bin/bash
+# Load the schema on first start without writing it to the binary log. The primary and the
+# replica both run this, so replication starts from identical tables and an empty GTID history.
+set -e
+mysql -uroot -p"$MYSQL_ROOT_PASSWORD" "$MYSQL_DATABASE" -e "SET SESSION sql_log_bin = 0; source /schema/something.sql"
@@ -0,0 +1,9 @@
+-- Replicate everything the primary writes from now on, positioned by GTID
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'mysql',
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'root',
+    SOURCE_AUTO_POSITION = 1,
+    SOURCE_CONNECT_RETRY = 5,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;
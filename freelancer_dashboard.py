@@ -1,20 +1,23 @@
 import streamlit as st
 import mysql.connector
-from plyer import notification
-import plotly.express as px
-import pandas as pd
-
-class DatabaseManager:
-    @staticmethod
-    def get_connection():
-        return mysql.connector.connect(
-            host="localhost",
-            user="root",
-            password="root",
-            database="dbmsproject"
-        )
+from database import DatabaseManager
+from job_feed import JOB_CATEGORIES, JobFeed
+import archive
+import chart_data
+import notifications
+import query_metrics
+import read_cache
+import skill_index
+import virtual_list
+import auth
+import live_updates
+import shared_session
+import page_style
 
 class SessionManager:
+    # Kept in the shared state store as well when the dashboard runs as several replicas
+    PERSISTED_STATE = ('proposal_submitted', 'completed_jobs', 'job_to_complete')
+
     @staticmethod
     def initialize_states():
         default_states = {
@@ -22,7 +25,10 @@ class SessionManager:
             'completed_jobs': set(),
             'job_to_complete': None,
             'freelancer_authenticated': False,
-            'freelancer_id': None
+            'freelancer_id': None,
+            'session_token': None,
+            'job_feed_filters': None,
+            'job_feed_cursors': [None]
         }
         for key, value in default_states.items():
             if key not in st.session_state:
@@ -30,42 +36,124 @@ class SessionManager:
 
 class AuthenticationService:
     @staticmethod
-    def authenticate_freelancer(email, phone):
-        connection = DatabaseManager.get_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM freelancer WHERE email = %s AND phone = %s", (email, phone))
-        freelancer = cursor.fetchone()
-        connection.close()
-        return freelancer
-
-class NotificationService:
+    def restore_session():
+        """ Re-check the session token on every rerun; answered by the session store, not MySQL. """
+        session = shared_session.restore("freelancer", SessionManager.PERSISTED_STATE)
+        st.session_state.freelancer_authenticated = session is not None
+        if session is not None:
+            st.session_state.freelancer_id = session['user_id']
+            st.session_state.name = session['name']
+
     @staticmethod
-    def show_notification(title, message):
-        notification.notify(
-            title=title,
-            message=message,
-            app_name="Freelancer App",
-            timeout=10
-        )
+    def logout():
+        shared_session.end()
+        st.session_state.freelancer_authenticated = False
+        st.session_state.freelancer_id = None
 
 class JobService:
     @staticmethod
-    def browse_jobs():
+    def browse_jobs(page_size=20):
         st.markdown('<div class="title">Browse Available Jobs</div>', unsafe_allow_html=True)
-        connection = DatabaseManager.get_connection()
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM Jobs WHERE status='Open'")
-        jobs = cursor.fetchall()
-        connection.close()
 
-        for job in jobs:
-            st.subheader(job['title'])
-            st.write(f"**Budget:** {job['budget']} | **Deadline:** {job['deadline']}")
-            st.write(job['description'])
+        search_text = st.text_input("Search jobs", placeholder="e.g. react dashboard")
+        if search_text.strip():
+            JobService.search_jobs(search_text)
+            return
+
+        JobService.recommended_jobs()
+
+        col1, col2, col3, col4 = st.columns(4)
+        category = col1.selectbox("Category", ["All"] + JOB_CATEGORIES)
+        min_budget = col2.number_input("Min Budget", min_value=0.0, value=0.0)
+        max_budget = col3.number_input("Max Budget", min_value=0.0, value=0.0, help="0 means no limit")
+        skills = col4.text_input("Skills (comma-separated)")
+
+        filters = {
+            'category': None if category == "All" else category,
+            'min_budget': min_budget or None,
+            'max_budget': max_budget or None,
+            'skills': skill_index.normalize_skills(skills),
+        }
+        # Changing any filter restarts the feed from the first page
+        if st.session_state.job_feed_filters != filters:
+            st.session_state.job_feed_filters = filters
+            st.session_state.job_feed_cursors = [None]
+        JobService.open_jobs(filters, page_size)
+
+    @staticmethod
+    @live_updates.fragment
+    def open_jobs(filters, page_size):
+        # Reruns on its own; jobs posted or closed meanwhile invalidate the cached feed pages
+        live_updates.poll("open_jobs", "freelancer", st.session_state.freelancer_id)
+        cursors = st.session_state.job_feed_cursors
+
+        try:
+            jobs, next_cursor = JobFeed.fetch_page(after=cursors[-1], page_size=page_size, **filters)
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return
+
+        if not jobs:
+            st.info("No open jobs match your filters.")
+
+        JobService.render_jobs(jobs)
 
-            if st.button("Apply", key=f"apply_{job['id']}"):
-                st.session_state.selected_job_id = job['id']
-                st.session_state.proposal_submitted = False
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        if len(cursors) > 1 and prev_col.button("Previous"):
+            cursors.pop()
+            st.rerun()
+        page_col.write(f"Page {len(cursors)}")
+        if next_cursor is not None and next_col.button("Next"):
+            cursors.append(next_cursor)
+            st.rerun()
+
+    @staticmethod
+    def recommended_jobs(count=5):
+        import matching
+
+        try:
+            recommendations = matching.get_engine().recommend_jobs(st.session_state.freelancer_id, count)
+            jobs = JobFeed.fetch_jobs([job_id for job_id, _ in recommendations])
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return
+
+        if jobs:
+            with st.expander("Recommended for You", expanded=True):
+                JobService.render_jobs(jobs, key_prefix="recommended_")
+
+    @staticmethod
+    def search_jobs(search_text):
+        try:
+            jobs = skill_index.search_jobs(search_text)
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return
+
+        if jobs:
+            JobService.render_jobs(jobs)
+        else:
+            st.info("No open jobs match your search.")
+
+    @staticmethod
+    def render_jobs(jobs, key_prefix=""):
+        columns = {'title': "Title", 'budget': "Budget", 'deadline': "Deadline", 'category': "Category",
+                   'summary': "Description"}
+        virtual_list.render(f"{key_prefix}jobs", jobs, columns,
+                            detail=lambda job: JobService.show_job(job, key_prefix))
+
+    @staticmethod
+    def show_job(job, key_prefix=""):
+        st.subheader(job['title'])
+        st.write(f"**Budget:** {job['budget']} | **Deadline:** {job['deadline']} | **Category:** {job['category']}")
+        # The feed only carries a summary; the full description is fetched for the selected job
+        st.write(JobFeed.fetch_description(job['id']) if job['truncated'] else job['summary'])
+
+        if st.button("Apply", key=f"{key_prefix}apply_{job['id']}"):
+            st.session_state.selected_job_id = job['id']
+            st.session_state.proposal_submitted = False
+            # The proposal form is drawn below the feed, outside its fragment
+            st.rerun()
 
     @staticmethod
     def submit_proposal(job_id):
@@ -79,54 +167,75 @@ class JobService:
             if not st.session_state.proposal_submitted:
                 try:
                     connection = DatabaseManager.get_connection()
-                    cursor = connection.cursor()
-                    query = """
-                        INSERT INTO Proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """
-                    cursor.execute(query, (job_id, cover_letter, proposed_rate, estimated_time, 
-                                         st.session_state.freelancer_id, 'Pending'))
-                    connection.commit()
+                    try:
+                        cursor = connection.cursor()
+                        query = """
+                            INSERT INTO Proposals (job_id, cover_letter, proposed_rate, estimated_time, freelancer_id, status)
+                            VALUES (%s, %s, %s, %s, %s, %s)
+                        """
+                        cursor.execute(query, (job_id, cover_letter, proposed_rate, estimated_time, 
+                                             st.session_state.freelancer_id, 'Pending'))
+                        notifications.notify_job_client(cursor, job_id, "New Proposal",
+                                                        f"{st.session_state.name} submitted a proposal for job {job_id}")
+                        changed = read_cache.job_tags(cursor, job_id) + [read_cache.freelancer(st.session_state.freelancer_id)]
+                        connection.commit()
+                        cursor.close()
+                    finally:
+                        connection.close()
+                    read_cache.invalidate(*changed)
                     st.session_state.proposal_submitted = True
                     st.success("Proposal submitted successfully!")
-                    NotificationService.show_notification("Proposal Submitted", "Your proposal has been submitted successfully")
                     
                 except mysql.connector.Error as err:
                     st.error(f"Database error: {err}")
-                finally:
-                    cursor.close()
-                    connection.close()
             else:
                 st.info("Proposal has already been submitted.")
 
 class ContractService:
     @staticmethod
+    def fetch_contracts(freelancer_id, include_archive=False):
+        """ Contracts of one freelancer, cached until a proposal or contract of theirs changes.
+
+        Contracts completed long ago are archived and only included with include_archive.
+        """
+        # Completing a contract tags the freelancer, so their own updates are read from the primary
+        tags = [read_cache.freelancer(freelancer_id)]
+        paged = archive.with_history if include_archive else archive.hot_only
+        query, params = paged("""
+            SELECT C.id, C.job_id, C.freelancer_id, C.payment, C.status, J.title AS job_title
+            FROM {contracts} C
+            JOIN jobs J ON C.job_id = J.id
+            WHERE C.freelancer_id = %s
+        """, (freelancer_id,), "id")
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params)
+                contracts = cursor.fetchall()
+                cursor.close()
+            finally:
+                connection.close()
+            return contracts
+
+        return read_cache.cached("freelancer_contracts", (freelancer_id, include_archive), tags, load)
+
+    @staticmethod
+    @live_updates.fragment
     def view_all_contracts():
+        changes = live_updates.poll("contracts", "freelancer", st.session_state.freelancer_id)
+        if 'proposal_accepted' in changes:
+            st.toast("A client accepted your proposal.")
         st.markdown('<div class="title">View All Contracts</div>', unsafe_allow_html=True)
+        history = st.toggle("Include archived contracts", help="Contracts completed long ago are archived")
         
         try:
-            connection = DatabaseManager.get_connection()
-            cursor = connection.cursor(dictionary=True)
-            cursor.execute("""
-                SELECT C.*, J.title as job_title 
-                FROM Contracts C 
-                JOIN Jobs J ON C.job_id = J.id 
-                WHERE C.freelancer_id = %s
-            """, (st.session_state.freelancer_id,))
-            contracts = cursor.fetchall()
-            cursor.close()
-            connection.close()
+            contracts = ContractService.fetch_contracts(st.session_state.freelancer_id, history)
 
             if contracts:
-                for contract in contracts:
-                    st.subheader(f"Job: {contract['job_title']}")
-                    st.write(f"**Agreed Payment:** ${contract['payment']} | **Status:** {contract['status']}")
-
-                    if contract['status'] != 'Completed':
-                        if st.button("Complete Job", key=f"complete_{contract['id']}"):
-                            st.session_state.job_to_complete = contract['id']
-                    else:
-                        st.success("Job completed!")
+                columns = {'job_title': "Job", 'payment': "Agreed Payment", 'status': "Status"}
+                virtual_list.render("contracts", contracts, columns, detail=ContractService.show_contract)
             else:
                 st.info("No contracts found.")
                 
@@ -138,16 +247,31 @@ class ContractService:
         if st.session_state.job_to_complete:
             ContractService.complete_contract(st.session_state.job_to_complete)
 
+    @staticmethod
+    def show_contract(contract):
+        st.subheader(f"Job: {contract['job_title']}")
+        st.write(f"**Agreed Payment:** ${contract['payment']} | **Status:** {contract['status']}")
+
+        if contract['status'] != 'Completed':
+            if st.button("Complete Job", key=f"complete_{contract['id']}"):
+                st.session_state.job_to_complete = contract['id']
+        else:
+            st.success("Job completed!")
+
     @staticmethod
     def complete_contract(contract_id):
         try:
             connection = DatabaseManager.get_connection()
-            cursor = connection.cursor()
-            query = "UPDATE Contracts SET status = 'Completed' WHERE id = %s"
-            cursor.execute(query, (contract_id,))
-            connection.commit()
-            cursor.close()
-            connection.close()
+            try:
+                cursor = connection.cursor()
+                query = "UPDATE Contracts SET status = 'Completed' WHERE id = %s"
+                cursor.execute(query, (contract_id,))
+                changed = read_cache.contract_tags(cursor, contract_id)
+                connection.commit()
+                cursor.close()
+            finally:
+                connection.close()
+            read_cache.invalidate(*changed)
             
             st.success(f"Job ID {contract_id} marked as completed!")
             st.session_state.job_to_complete = None
@@ -158,215 +282,184 @@ class ContractService:
 
 class RatingService:
     @staticmethod
+    def fetch_ratings(freelancer_id, include_archive=False):
+        """ (average rating, rating rows), cached until a contract of this freelancer changes.
+
+        Rows carry the first 100 characters of each review; fetch_review() loads the rest. The
+        average covers every rating, the rows only unarchived ones unless include_archive.
+        """
+        tags = [read_cache.freelancer(freelancer_id)]
+        paged = archive.with_history if include_archive else archive.hot_only
+        query, params = paged("""
+            SELECT R.rating_id, R.rating_score, R.rating_date, J.title AS job_title,
+                   LEFT(R.review_text, 100) AS review_summary, CHAR_LENGTH(R.review_text) > 100 AS truncated
+            FROM {ratings} R
+            JOIN {contracts} C ON R.contract_id = C.id
+            JOIN jobs J ON C.job_id = J.id
+            WHERE C.freelancer_id = %s
+        """, (freelancer_id,), "rating_date DESC")
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute("SELECT calculate_freelancer_rating(%s) as avg_rating", (freelancer_id,))
+                avg_rating = cursor.fetchone()['avg_rating']
+                cursor.execute(query, params)
+                ratings = cursor.fetchall()
+                cursor.close()
+            finally:
+                connection.close()
+            return avg_rating, ratings
+
+        return read_cache.cached("freelancer_ratings", (freelancer_id, include_archive), tags, load)
+
+    @staticmethod
+    def fetch_review(rating_id):
+        connection = DatabaseManager.get_read_connection()
+        try:
+            cursor = connection.cursor()
+            # The rating may have been archived since its row was listed
+            cursor.execute("""
+                SELECT review_text FROM ratings WHERE rating_id = %s
+                UNION ALL
+                SELECT review_text FROM ratings_archive WHERE rating_id = %s
+                LIMIT 1
+            """, (rating_id, rating_id))
+            row = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    @staticmethod
+    def show_rating(rating):
+        st.subheader(f"Job: {rating['job_title']}")
+        rating_stars = "⭐" * rating['rating_score']
+        st.write(f"**Rating:** {rating_stars} ({rating['rating_score']}/5)")
+        review_text = RatingService.fetch_review(rating['rating_id']) if rating['truncated'] else rating['review_summary']
+        st.write(f"**Review:** {review_text}")
+        st.write(f"**Date:** {rating['rating_date']}")
+
+    @staticmethod
+    @live_updates.fragment
     def view_ratings():
+        if 'rating_added' in live_updates.poll("ratings", "freelancer", st.session_state.freelancer_id):
+            st.toast("You received a new rating.")
         st.markdown('<div class="title">View All Ratings</div>', unsafe_allow_html=True)
+        history = st.toggle("Include archived ratings", help="Ratings of contracts completed long ago are archived")
         
         try:
-            connection = DatabaseManager.get_connection()
-            cursor = connection.cursor(dictionary=True)
-            
-            cursor.execute(f"SELECT calculate_freelancer_rating({st.session_state.freelancer_id}) as avg_rating")
-            avg_rating = cursor.fetchone()['avg_rating']
-            
-            st.subheader("Your Overall Rating")
-            rating_stars = "⭐" * int(avg_rating)
-            st.write(f"**Average Rating:** {rating_stars} ({avg_rating:.2f}/5)")
-            
-            cursor.execute("""
-                SELECT R.rating_score, R.review_text, R.rating_date, J.title AS job_title
-                FROM ratings R
-                JOIN contracts C ON R.contract_id = C.id
-                JOIN jobs J ON C.job_id = J.id
-                WHERE C.freelancer_id = %s
-                ORDER BY R.rating_date DESC
-            """, (st.session_state.freelancer_id,))
-            ratings = cursor.fetchall()
-
-            if ratings:
-                df_ratings = pd.DataFrame(ratings)
-
-                rating_counts = df_ratings['rating_score'].value_counts().sort_index()
-                fig = px.bar(rating_counts, x=rating_counts.index, y=rating_counts.values, 
-                            labels={'x': 'Rating Score', 'y': 'Count'},
-                            title="Your Rating Distribution", 
-                            color=rating_counts.index,
-                            color_continuous_scale="Viridis")
-                st.plotly_chart(fig)
-
-                for rating in ratings:
-                    st.subheader(f"Job: {rating['job_title']}")
-                    rating_stars = "⭐" * rating['rating_score']
-                    st.write(f"**Rating:** {rating_stars} ({rating['rating_score']}/5)")
-                    st.write(f"**Review:** {rating['review_text']}")
-                    st.write(f"**Date:** {rating['rating_date']}")
-                    st.write("---")
-            else:
-                st.info("No ratings available yet.")
-        
+            avg_rating, ratings = RatingService.fetch_ratings(st.session_state.freelancer_id, history)
+            # Counted by MySQL rather than from the rating rows
+            distribution = chart_data.rating_distribution(st.session_state.freelancer_id, history)
         except mysql.connector.Error as err:
             st.error(f"Database error: {err}")
-        finally:
-            if connection:
-                connection.close()
+            return
+
+        st.subheader("Your Overall Rating")
+        rating_stars = "⭐" * int(avg_rating)
+        st.write(f"**Average Rating:** {rating_stars} ({avg_rating:.2f}/5)")
+
+        if ratings:
+            # plotly loads with the first ratings view instead of with the login page
+            import plotly.graph_objs as go
+
+            fig = go.Figure(data=[go.Bar(x=distribution['scores'], y=distribution['counts'],
+                                         marker=dict(color=distribution['scores'], colorscale="Viridis"))])
+            fig.update_layout(title_text="Your Rating Distribution", xaxis_title='Rating Score', yaxis_title='Count')
+            st.plotly_chart(fig)
+
+            columns = {'job_title': "Job", 'rating_score': "Rating", 'review_summary': "Review", 'rating_date': "Date"}
+            virtual_list.render("ratings", ratings, columns, detail=RatingService.show_rating, row_id='rating_id',
+                                column_config={'rating_score': st.column_config.NumberColumn(format="%d ⭐")})
+        else:
+            st.info("No ratings available yet.")
+
+class InboxService:
+    @staticmethod
+    def view_notifications():
+        st.markdown('<div class="title">Notifications</div>', unsafe_allow_html=True)
+        try:
+            rows = notifications.inbox("freelancer", st.session_state.freelancer_id)
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return
+
+        if not rows:
+            st.info("No notifications yet.")
+        for row in rows:
+            st.write(f"**{row['title']}** ({row['created_at']})")
+            st.write(row['message'])
+            st.write("---")
 
 def login():
     st.markdown('<div class="title">Freelancer Login</div>', unsafe_allow_html=True)
     
     email = st.text_input("Email")
-    phone = st.text_input("Phone", type="password")
+    password = st.text_input("Password", type="password")
 
     if st.button("Login"):
-        freelancer = AuthenticationService.authenticate_freelancer(email, phone)
-        if freelancer:
-            st.session_state.freelancer_authenticated = True
-            st.session_state.freelancer_id = freelancer['freelancer_id']
-            st.session_state.name = freelancer['name']
-            st.success(f"Welcome {freelancer['name']}!")
+        try:
+            result = auth.login("freelancer", email, password)
+        except auth.RateLimitedError as err:
+            st.error(str(err))
+            return False
+        except mysql.connector.Error as err:
+            st.error(f"Database error: {err}")
+            return False
+        if result:
+            token, session = result
+            shared_session.start(token)
+            AuthenticationService.restore_session()
+            st.success(f"Welcome {session['name']}!")
             return True
         else:
-            st.error("Invalid email or phone number. Please try again.")
+            st.error("Invalid email or password. Please try again.")
+
+    # New and imported accounts, and resets issued by an admin, come with a one-time code
+    with st.expander("Set a password"):
+        with st.form("set_password_form"):
+            reset_email = st.text_input("Email", key="reset_email")
+            code = st.text_input("Reset code")
+            new_password = st.text_input("New password", type="password")
+            if st.form_submit_button("Set password"):
+                if len(new_password) < 8:
+                    st.error("Choose a password of at least 8 characters.")
+                else:
+                    try:
+                        if auth.reset_password("freelancer", reset_email, code, new_password):
+                            st.success("Password set. You can log in now.")
+                        else:
+                            st.error("That code is not valid for this email, or it has expired.")
+                    except auth.RateLimitedError as err:
+                        st.error(str(err))
+                    except mysql.connector.Error as err:
+                        st.error(f"Database error: {err}")
     return False
 
 def main():
     SessionManager.initialize_states()
+    notifications.ensure_dispatcher()
+    query_metrics.ensure_metrics_server()
 
     # Apply the same Streamlit CSS styling as in the original code
     # Futuristic CSS styles
-    st.markdown("""
-        <style>
-            /* Futuristic Cyberpunk-Inspired Design */
-            @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@400;500;700&family=Roboto:wght@300;400;700&display=swap');
-
-            :root {
-                --primary-color: #00ffff;  /* Bright cyan */
-                --secondary-color: #ff00ff;  /* Vibrant magenta */
-                --background-dark: #0a0a1a;
-                --background-medium: #1a1a2e;
-                --text-light: #e0e0ff;
-                --accent-glow: rgba(0, 255, 255, 0.3);
-            }
-
-            body {
-                background-color: var(--background-dark);
-                color: var(--text-light);
-                font-family: 'Roboto', sans-serif;
-                line-height: 1.6;
-                overflow-x: hidden;
-            }
-
-            .stApp {
-                background: linear-gradient(135deg, var(--background-dark) 0%, var(--background-medium) 100%);
-            }
-
-            .title {
-                font-family: 'Orbitron', sans-serif;
-                font-size: 2.5em;
-                font-weight: bold;
-                color: var(--primary-color);
-                text-align: center;
-                margin-bottom: 1em;
-                text-shadow: 0 0 15px var(--accent-glow);
-                letter-spacing: 2px;
-                background: linear-gradient(45deg, var(--primary-color), var(--secondary-color));
-                -webkit-background-clip: text;
-                -webkit-text-fill-color: transparent;
-            }
-
-            .header {
-                font-family: 'Orbitron', sans-serif;
-                font-size: 1.75em;
-                font-weight: 500;
-                color: var(--primary-color);
-                margin-top: 1em;
-                margin-bottom: 0.5em;
-                border-bottom: 2px solid var(--primary-color);
-                padding-bottom: 0.3em;
-            }
-
-            .stButton button {
-                background: linear-gradient(45deg, var(--primary-color), var(--secondary-color));
-                color: var(--background-dark);
-                font-family: 'Orbitron', sans-serif;
-                font-size: 1em;
-                padding: 0.6em 1.2em;
-                border: none;
-                border-radius: 20px;
-                transition: all 0.3s ease;
-                box-shadow: 0 0 15px var(--accent-glow);
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }
-
-            .stButton button:hover {
-                transform: scale(1.05);
-                box-shadow: 0 0 25px var(--primary-color);
-            }
-
-            .css-1d391kg {
-                background: linear-gradient(135deg, var(--background-medium) 0%, var(--background-dark) 100%);
-                border-right: 2px solid var(--primary-color);
-            }
-
-            .stTextInput input, .stNumberInput input {
-                background-color: rgba(26, 26, 46, 0.7);
-                border: 2px solid var(--primary-color);
-                color: var(--text-light);
-                border-radius: 10px;
-                transition: all 0.3s ease;
-            }
-
-            .stTextInput input:focus, .stNumberInput input:focus {
-                border-color: var(--secondary-color);
-                box-shadow: 0 0 15px var(--accent-glow);
-            }
-
-            .expander {
-                background: linear-gradient(145deg, rgba(26, 26, 46, 0.8) 0%, rgba(10, 10, 26, 0.8) 100%);
-                border: 2px solid var(--primary-color);
-                color: var(--text-light);
-                border-radius: 15px;
-                padding: 1em;
-                box-shadow: 0 0 20px rgba(0, 255, 255, 0.2);
-            }
-
-            ::-webkit-scrollbar {
-                width: 10px;
-            }
-
-            ::-webkit-scrollbar-track {
-                background: var(--background-medium);
-            }
-
-            ::-webkit-scrollbar-thumb {
-                background: var(--primary-color);
-                border-radius: 10px;
-            }
-
-            ::-webkit-scrollbar-thumb:hover {
-                background: var(--secondary-color);
-            }
-
-            @media (max-width: 600px) {
-                .title {
-                    font-size: 2em;
-                }
-                
-                .header {
-                    font-size: 1.5em;
-                }
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    page_style.apply("freelancer")
 
+    AuthenticationService.restore_session()
     if not st.session_state.freelancer_authenticated:
         if login():
             st.rerun()
     else:
         st.image("Freelancer.png", use_column_width=True)
+        if st.sidebar.button("Logout"):
+            AuthenticationService.logout()
+            st.rerun()
 
         menu = st.sidebar.selectbox(
             "Select Section", 
-            ["Browse Jobs", "View All Contracts", "View Ratings"]
+            ["Browse Jobs", "View All Contracts", "View Ratings", "Notifications"]
         )
 
         if menu == "Browse Jobs":
@@ -377,6 +470,9 @@ def main():
             ContractService.view_all_contracts()
         elif menu == "View Ratings":
             RatingService.view_ratings()
+        elif menu == "Notifications":
+            InboxService.view_notifications()
+        shared_session.save(SessionManager.PERSISTED_STATE)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
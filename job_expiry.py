@@ -0,0 +1,195 @@
+import argparse
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import notifications
+import platform_stats
+import read_cache
+from database import run_in_transaction
+
+logger = logging.getLogger(__name__)
+
+# accept_proposal is the only thing that closes a job, so jobs whose deadline passed without
+# a hire would stay Open forever, at the front of every feed scan ordered by deadline and in
+# the open_jobs count. The scheduler closes them and rejects their pending proposals,
+# batch_size jobs per transaction, walking idx_jobs_status_deadline in (deadline, id) order.
+# Closed jobs leave that index range, so each batch starts at the front without an offset. A
+# batch locks only its own job rows and their proposals, and SKIP LOCKED passes over a job
+# whose proposal a client is accepting at that moment; the next run picks it up.
+
+EXPIRED_JOBS_QUERY = """
+    SELECT id, client_id
+    FROM jobs
+    WHERE status = 'Open' AND deadline < CURDATE()
+    ORDER BY deadline, id
+    LIMIT %s
+    FOR UPDATE SKIP LOCKED
+"""
+
+
+def expire_batch(batch_size=500, notify=True):
+    """ Close up to batch_size expired jobs in one transaction; returns (jobs closed, proposals rejected). """
+    def work(cursor):
+        cursor.execute(EXPIRED_JOBS_QUERY, (batch_size,))
+        jobs = cursor.fetchall()
+        if not jobs:
+            return [], 0
+        job_ids = tuple(job_id for job_id, _ in jobs)
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        if notify:
+            notifications.enqueue_select(cursor, "freelancer", "Proposal Expired",
+                                         "A job you sent a proposal to passed its deadline and was closed.", f"""
+                SELECT DISTINCT freelancer_id AS recipient_id
+                FROM proposals
+                WHERE job_id IN ({placeholders}) AND status = 'Pending'
+            """, job_ids)
+            notifications.enqueue_select(cursor, "client", "Job Expired",
+                                         "A job of yours passed its deadline and was closed; "
+                                         "its pending proposals were declined.", f"""
+                SELECT DISTINCT client_id AS recipient_id FROM jobs WHERE id IN ({placeholders})
+            """, job_ids)
+        cursor.execute(f"UPDATE proposals SET status = 'Rejected' WHERE job_id IN ({placeholders}) AND status = 'Pending'",
+                       job_ids)
+        rejected = cursor.rowcount
+        cursor.execute(f"UPDATE jobs SET status = 'Closed' WHERE id IN ({placeholders})", job_ids)
+        return jobs, rejected
+
+    jobs, rejected = run_in_transaction(work)
+    if jobs:
+        read_cache.invalidate(read_cache.OPEN_JOBS,
+                              *{read_cache.job(job_id) for job_id, _ in jobs},
+                              *{read_cache.client(client_id) for _, client_id in jobs})
+    return len(jobs), rejected
+
+
+_totals = {'runs': 0, 'batches': 0, 'jobs_closed': 0, 'proposals_rejected': 0, 'failed_runs': 0}
+_recent_runs = deque(maxlen=20)
+_stats_lock = threading.Lock()
+
+
+def run_pending(batch_size=500, max_batches=None, pause=0.05, notify=True):
+    """ Expire batches until none are left (or max_batches ran); returns this run's metrics.
+
+    pause seconds between batches leave room for the transactions queued behind each batch.
+    """
+    run = {'started_at': datetime.now(), 'batches': 0, 'jobs_closed': 0, 'proposals_rejected': 0,
+           'seconds': 0.0, 'max_batch_seconds': 0.0}
+    start = time.perf_counter()
+    try:
+        while max_batches is None or run['batches'] < max_batches:
+            batch_start = time.perf_counter()
+            closed, rejected = expire_batch(batch_size, notify)
+            if not closed:
+                break
+            run['batches'] += 1
+            run['jobs_closed'] += closed
+            run['proposals_rejected'] += rejected
+            run['max_batch_seconds'] = max(run['max_batch_seconds'], time.perf_counter() - batch_start)
+            if closed < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+    finally:
+        run['seconds'] = time.perf_counter() - start
+        run['jobs_per_second'] = run['jobs_closed'] / run['seconds'] if run['seconds'] else 0.0
+        if run['jobs_closed']:
+            platform_stats.invalidate()
+        with _stats_lock:
+            _totals['runs'] += 1
+            _totals['batches'] += run['batches']
+            _totals['jobs_closed'] += run['jobs_closed']
+            _totals['proposals_rejected'] += run['proposals_rejected']
+            _recent_runs.append(run)
+    return run
+
+
+def stats():
+    """ Totals since the process started and the most recent runs, newest first. """
+    with _stats_lock:
+        return dict(_totals), list(reversed(_recent_runs))
+
+
+class ExpiryScheduler:
+    """ Background worker that closes expired jobs every interval seconds. """
+
+    def __init__(self, batch_size=500, interval=300.0, pause=0.05, notify=True):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.pause = pause
+        self.notify = notify
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                run_pending(self.batch_size, pause=self.pause, notify=self.notify)
+            except Exception:
+                # Every batch commits on its own, so a failure only leaves the rest for the next run
+                logger.exception("Job expiry run failed")
+                with _stats_lock:
+                    _totals['failed_runs'] += 1
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="job-expiry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def notify_enabled():
+    return os.environ.get("JOB_EXPIRY_NOTIFY", "on").lower() not in ("off", "0", "false")
+
+
+def ensure_scheduler():
+    """ Start the process-wide expiry thread once if JOB_EXPIRY=thread; safe to call on every rerun.
+
+    Off by default: jobs are expired by one `python job_expiry.py` for the deployment.
+    """
+    global _scheduler
+    if os.environ.get("JOB_EXPIRY", "none").lower() != "thread":
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ExpiryScheduler(
+                batch_size=int(os.environ.get("JOB_EXPIRY_BATCH_SIZE", 500)),
+                interval=float(os.environ.get("JOB_EXPIRY_INTERVAL", 300)),
+                pause=float(os.environ.get("JOB_EXPIRY_PAUSE", 0.05)),
+                notify=notify_enabled(),
+            )
+            _scheduler.start()
+    return _scheduler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Close jobs past their deadline and reject their pending proposals.")
+    parser.add_argument("--batch-size", type=int, default=int(os.environ.get("JOB_EXPIRY_BATCH_SIZE", 500)))
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("JOB_EXPIRY_INTERVAL", 300)))
+    parser.add_argument("--pause", type=float, default=float(os.environ.get("JOB_EXPIRY_PAUSE", 0.05)))
+    parser.add_argument("--no-notify", action="store_true", help="do not notify clients and freelancers")
+    parser.add_argument("--once", action="store_true", help="expire everything pending and exit")
+    args = parser.parse_args()
+
+    notify = notify_enabled() and not args.no_notify
+    if args.once:
+        run = run_pending(args.batch_size, pause=args.pause, notify=notify)
+        print(f"closed {run['jobs_closed']} jobs and rejected {run['proposals_rejected']} proposals "
+              f"in {run['batches']} batches ({run['seconds']:.1f}s, longest batch {run['max_batch_seconds']:.3f}s)")
+    else:
+        scheduler = ExpiryScheduler(args.batch_size, args.interval, args.pause, notify)
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,117 @@
+import read_cache
+from database import DatabaseManager
+
+JOB_CATEGORIES = ["Web Development", "Graphic Design", "Writing"]
+
+# Only the columns the feed renders; descriptions are truncated so a page never ships full TEXT blobs.
+FEED_COLUMNS = """
+    id, title, budget, deadline, category, required_skills, client_id,
+    LEFT(description, 300) AS summary, CHAR_LENGTH(description) > 300 AS truncated
+"""
+
+
+class JobFeed:
+    """ Keyset pagination over open jobs ordered by (deadline, id).
+
+    Served by idx_jobs_status_deadline / idx_jobs_status_category_deadline, so fetching
+    any page reads page_size rows from the index regardless of how many jobs are open.
+    """
+
+    @staticmethod
+    def build_query(category=None, min_budget=None, max_budget=None, skills=None, after=None, page_size=20):
+        conditions = ["status = 'Open'"]
+        params = []
+
+        if category:
+            conditions.append("category = %s")
+            params.append(category)
+        if min_budget is not None:
+            conditions.append("budget >= %s")
+            params.append(min_budget)
+        if max_budget is not None:
+            conditions.append("budget <= %s")
+            params.append(max_budget)
+        for skill in skills or []:
+            # Exact tag match through idx_job_skills_tag instead of a LIKE scan over required_skills
+            conditions.append("""EXISTS (
+                SELECT 1 FROM job_skills JS JOIN skill_tags T ON T.id = JS.tag_id
+                WHERE JS.job_id = jobs.id AND T.name = %s
+            )""")
+            params.append(skill)
+        if after is not None:
+            deadline, job_id = after
+            conditions.append("(deadline > %s OR (deadline = %s AND id > %s))")
+            params.extend([deadline, deadline, job_id])
+
+        query = f"""
+            SELECT {FEED_COLUMNS}
+            FROM jobs
+            WHERE {' AND '.join(conditions)}
+            ORDER BY deadline, id
+            LIMIT %s
+        """
+        # One extra row tells us whether a next page exists without a COUNT(*).
+        params.append(page_size + 1)
+        return query, tuple(params)
+
+    @staticmethod
+    def fetch_page(category=None, min_budget=None, max_budget=None, skills=None, after=None, page_size=20):
+        """ Return (jobs, next_cursor); next_cursor is None on the last page. """
+        query, params = JobFeed.build_query(category, min_budget, max_budget, skills, after, page_size)
+        tags = [read_cache.OPEN_JOBS]
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(query, params)
+                jobs = cursor.fetchall()
+                cursor.close()
+            finally:
+                connection.close()
+
+            next_cursor = None
+            if len(jobs) > page_size:
+                jobs = jobs[:page_size]
+                next_cursor = (jobs[-1]['deadline'], jobs[-1]['id'])
+            return jobs, next_cursor
+
+        return read_cache.cached("job_feed", (query, params), tags, load)
+
+    @staticmethod
+    def fetch_jobs(job_ids):
+        """ Feed rows for the given ids, returned in the order of job_ids. """
+        if not job_ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(job_ids))
+        tags = [read_cache.OPEN_JOBS]
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor(dictionary=True)
+                cursor.execute(f"SELECT {FEED_COLUMNS} FROM jobs WHERE id IN ({placeholders})", tuple(job_ids))
+                jobs = {job['id']: job for job in cursor.fetchall()}
+                cursor.close()
+            finally:
+                connection.close()
+            return [jobs[job_id] for job_id in job_ids if job_id in jobs]
+
+        return read_cache.cached("job_feed_ids", tuple(job_ids), tags, load)
+
+    @staticmethod
+    def fetch_description(job_id):
+        tags = [read_cache.job(job_id)]
+
+        def load():
+            connection = DatabaseManager.get_read_connection(tags)
+            try:
+                cursor = connection.cursor()
+                cursor.execute("SELECT description FROM jobs WHERE id = %s", (job_id,))
+                row = cursor.fetchone()
+                cursor.close()
+            finally:
+                connection.close()
+            return row[0] if row else None
+
+        return read_cache.cached("job_description", job_id, tags, load)
@@ -0,0 +1,168 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+import mysql.connector
+import streamlit as st
+
+import read_cache
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# A client only learned about a new proposal, and a freelancer about an accepted one or a new
+# job, by rerunning the whole script, which repeats every query on the page. The triggers in
+# "function and procedure" append a change_events row for each such change instead. Panels
+# wrapped in fragment() rerun on their own every CHANGE_FEED_POLL_INTERVAL seconds and call
+# poll() first: the feed's head (MAX(id), looked up at most once per HEAD_TTL for all sessions
+# of the process) is compared with the session's cursor, and only when it moved does the
+# session read its own rows past the cursor. Their tags are invalidated in the read cache, so
+# the panel redraws from cache when nothing changed and reloads only what did.
+#
+# Ids are allocated at insert time, so an event whose transaction commits after a later one
+# was polled can be passed over; the read cache's TTL bounds how stale that leaves a panel.
+
+HEAD_TTL = 1.0
+
+# Events addressed to every user of a type change the open-job feed; the others change views
+# of their recipient
+BROADCAST_TAGS = {'job_posted': read_cache.OPEN_JOBS, 'job_closed': read_cache.OPEN_JOBS}
+RECIPIENT_TAGS = {'client': read_cache.client, 'freelancer': read_cache.freelancer}
+
+EVENTS_QUERY = """
+    SELECT kind, MAX(id) AS last_id
+    FROM (
+        SELECT kind, id FROM change_events
+        WHERE recipient_type = %s AND recipient_id = %s AND id > %s
+        UNION ALL
+        SELECT kind, id FROM change_events
+        WHERE recipient_type = %s AND recipient_id IS NULL AND id > %s
+    ) E
+    GROUP BY kind
+"""
+
+_head = {'id': None, 'checked_at': 0.0}
+_head_lock = threading.Lock()
+# Highest event id whose tags this process already invalidated, so a broadcast seen by many
+# sessions invalidates the open-job feed once
+_applied = {}
+_applied_lock = threading.Lock()
+
+
+def poll_interval():
+    return float(os.environ.get("CHANGE_FEED_POLL_INTERVAL", 5))
+
+
+def fragment(func):
+    """ Make func a Streamlit fragment rerun every poll interval; a plain function when live updates are off. """
+    interval = poll_interval()
+    if not interval:
+        return func
+    return st.fragment(run_every=interval)(func)
+
+
+def head():
+    """ Id of the newest change event, shared by every session of this process for HEAD_TTL seconds. """
+    with _head_lock:
+        now = time.monotonic()
+        if _head['id'] is None or now - _head['checked_at'] >= min(HEAD_TTL, poll_interval() or HEAD_TTL):
+            connection = DatabaseManager.get_connection()
+            try:
+                cursor = connection.cursor()
+                # Answered from the end of the primary key without reading rows
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM change_events")
+                _head['id'] = cursor.fetchone()[0]
+                cursor.close()
+            finally:
+                connection.close()
+            _head['checked_at'] = now
+        return _head['id']
+
+
+def fetch_events(recipient_type, recipient_id, after_id):
+    """ {kind: newest event id} of the events for this user past after_id. """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(EVENTS_QUERY, (recipient_type, recipient_id, after_id, recipient_type, after_id))
+        events = dict(cursor.fetchall())
+        cursor.close()
+    finally:
+        connection.close()
+    return events
+
+
+def apply(recipient_type, recipient_id, events):
+    """ Invalidate the cached reads the events changed, once per process. """
+    tags = {}
+    for kind, last_id in events.items():
+        tag = BROADCAST_TAGS.get(kind) or RECIPIENT_TAGS[recipient_type](recipient_id)
+        tags[tag] = max(tags.get(tag, 0), last_id)
+    with _applied_lock:
+        stale = [tag for tag, last_id in tags.items() if last_id > _applied.get(tag, 0)]
+        for tag in stale:
+            _applied[tag] = tags[tag]
+    if stale:
+        read_cache.invalidate_local(*stale)
+
+
+def poll(key, recipient_type, recipient_id):
+    """ Kinds of changes for this user since the session last polled under key (a panel name).
+
+    The first poll only sets the cursor: whatever happened before is on the page already.
+    """
+    state = st.session_state.get(f"_change_feed_{key}")
+    try:
+        latest = head()
+        if state is None or state['recipient'] != [recipient_type, recipient_id]:
+            st.session_state[f"_change_feed_{key}"] = {'recipient': [recipient_type, recipient_id],
+                                                       'cursor': latest, 'head': latest}
+            return set()
+        if latest <= state['head']:
+            return set()
+        events = fetch_events(recipient_type, recipient_id, state['cursor'])
+    except mysql.connector.Error:
+        # The panel still renders, it just is not live until the feed can be read again
+        logger.warning("Change feed poll failed", exc_info=True)
+        return set()
+
+    state['head'] = latest
+    if events:
+        state['cursor'] = max(state['cursor'], *events.values())
+        apply(recipient_type, recipient_id, events)
+    return set(events)
+
+
+def prune(retention_hours=24, batch_size=10000):
+    """ Delete events older than retention_hours in batches; returns the number deleted. """
+    deleted = 0
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        while True:
+            # Ids grow with created_at, so each batch reads from the front of the primary key
+            cursor.execute("""
+                DELETE FROM change_events
+                WHERE created_at < NOW() - INTERVAL %s HOUR
+                ORDER BY id
+                LIMIT %s
+            """, (retention_hours, batch_size))
+            connection.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        cursor.close()
+    finally:
+        connection.close()
+    return deleted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete change feed events the dashboards no longer need.")
+    parser.add_argument("--retention", type=float,
+                        default=float(os.environ.get("CHANGE_FEED_RETENTION", 24)), help="hours to keep")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+    print(f"deleted {prune(args.retention, args.batch_size)} change events older than {args.retention:g}h")
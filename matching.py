@@ -0,0 +1,292 @@
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEIGHTS = {'skill': 0.6, 'rating': 0.25, 'budget': 0.15}
+
+
+class MatchingEngine:
+    """ Scores every (job, freelancer) pair with batched sparse/dense NumPy operations.
+
+    score = w_skill * share of the job's skill tags the freelancer has
+          + w_rating * average rating / 5
+          + w_budget * min(1, job budget / freelancer's average proposed rate)
+    multiplied by unavailable_penalty for freelancers who are not currently available.
+    Scores are computed a block of rows at a time so memory stays bounded at
+    block_size x candidates floats no matter how large both sides are.
+    """
+
+    def __init__(self, freelancer_ids, freelancer_tags, ratings, available, avg_rates,
+                 job_ids, job_tags, budgets, weights=None, unavailable_penalty=0.3,
+                 unrated_rating=3.0, block_size=256):
+        self.freelancer_ids = np.asarray(freelancer_ids)
+        self.job_ids = np.asarray(job_ids)
+        self._freelancer_index = {fid: i for i, fid in enumerate(self.freelancer_ids.tolist())}
+        self._job_index = {jid: i for i, jid in enumerate(self.job_ids.tolist())}
+
+        # Binary CSR matrices: rows are freelancers/jobs, columns are skill tags
+        self.freelancer_tags = sparse.csr_matrix(freelancer_tags, dtype=np.float32)
+        self.job_tags = sparse.csr_matrix(job_tags, dtype=np.float32)
+        self._freelancer_tags_t = self.freelancer_tags.T.tocsc()
+        job_tag_counts = np.asarray(self.job_tags.sum(axis=1)).ravel()
+        self._job_tag_counts = np.maximum(job_tag_counts, 1).astype(np.float32)
+
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.block_size = block_size
+        w = self.weights
+
+        ratings = np.asarray(ratings, dtype=np.float32)
+        ratings = np.where(np.isnan(ratings), unrated_rating, ratings)
+        self._availability = np.where(np.asarray(available, dtype=bool), 1.0, unavailable_penalty).astype(np.float32)
+
+        # Freelancers without proposal history get 1/rate = 0, so their budget fit is 0 plus a
+        # neutral 0.5 folded into the per-freelancer base score alongside the rating term.
+        avg_rates = np.asarray(avg_rates, dtype=np.float32)
+        has_rate = ~np.isnan(avg_rates) & (avg_rates > 0)
+        self._inv_rates = np.divide(1.0, avg_rates, out=np.zeros_like(avg_rates), where=has_rate)
+        self._base = (w['rating'] * np.clip(ratings / 5.0, 0, 1) + w['budget'] * np.where(has_rate, 0.0, 0.5)).astype(np.float32)
+        self._budgets = np.asarray(budgets, dtype=np.float32)
+        self._skill_weight = (w['skill'] / self._job_tag_counts).astype(np.float32)
+
+    def score(self, job_rows, freelancer_rows=None):
+        """ Dense (len(job_rows), n_candidates) score matrix for the given job row indices. """
+        freelancer_tags_t = self._freelancer_tags_t
+        base, availability, inv_rates = self._base, self._availability, self._inv_rates
+        if freelancer_rows is not None:
+            freelancer_tags_t = freelancer_tags_t[:, freelancer_rows]
+            base, availability, inv_rates = base[freelancer_rows], availability[freelancer_rows], inv_rates[freelancer_rows]
+
+        # Work in place on the two block-sized float32 buffers to avoid further temporaries
+        scores = (self.job_tags[job_rows] @ freelancer_tags_t).toarray()
+        scores *= self._skill_weight[job_rows, None]
+
+        budget_fit = np.multiply(self._budgets[job_rows, None], inv_rates[None, :])
+        np.minimum(budget_fit, 1.0, out=budget_fit)
+        budget_fit *= self.weights['budget']
+
+        scores += budget_fit
+        scores += base[None, :]
+        scores *= availability[None, :]
+        return scores
+
+    @staticmethod
+    def _top_k(scores, k):
+        k = min(k, scores.shape[1])
+        if k == 0:
+            return np.empty((scores.shape[0], 0), dtype=np.int64), np.empty((scores.shape[0], 0), dtype=np.float32)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def top_freelancers_for_jobs(self, job_rows=None, k=10):
+        """ (indices, scores) arrays of shape (len(job_rows), k), best freelancer first. """
+        job_rows = np.arange(len(self.job_ids)) if job_rows is None else np.asarray(job_rows)
+        indices, scores = [], []
+        for start in range(0, len(job_rows), self.block_size):
+            block_indices, block_scores = self._top_k(self.score(job_rows[start:start + self.block_size]), k)
+            indices.append(block_indices)
+            scores.append(block_scores)
+        if not indices:
+            return np.empty((0, 0), dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.vstack(indices), np.vstack(scores)
+
+    def top_jobs_for_freelancers(self, freelancer_rows=None, k=10):
+        """ (indices, scores) arrays of shape (len(freelancer_rows), k), best job first. """
+        if freelancer_rows is None:
+            freelancer_rows = np.arange(len(self.freelancer_ids))
+        freelancer_rows = np.asarray(freelancer_rows)
+        all_jobs = np.arange(len(self.job_ids))
+        indices, scores = [], []
+        for start in range(0, len(freelancer_rows), self.block_size):
+            block = self.score(all_jobs, freelancer_rows[start:start + self.block_size]).T
+            block_indices, block_scores = self._top_k(block, k)
+            indices.append(block_indices)
+            scores.append(block_scores)
+        if not indices:
+            return np.empty((0, 0), dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+        return np.vstack(indices), np.vstack(scores)
+
+    def recommend_jobs(self, freelancer_id, k=5):
+        """ [(job_id, score)] for one freelancer. """
+        row = self._freelancer_index.get(freelancer_id)
+        if row is None or not len(self.job_ids):
+            return []
+        indices, scores = self.top_jobs_for_freelancers([row], k)
+        return [(int(self.job_ids[i]), float(s)) for i, s in zip(indices[0], scores[0])]
+
+    def recommend_freelancers(self, job_id, k=5):
+        """ [(freelancer_id, score)] for one job. """
+        row = self._job_index.get(job_id)
+        if row is None or not len(self.freelancer_ids):
+            return []
+        indices, scores = self.top_freelancers_for_jobs([row], k)
+        return [(int(self.freelancer_ids[i]), float(s)) for i, s in zip(indices[0], scores[0])]
+
+    @classmethod
+    def load(cls, **kwargs):
+        """ Build an engine over all freelancers and all open jobs in a handful of bulk queries. """
+        connection = DatabaseManager.get_read_connection()
+        try:
+            cursor = connection.cursor()
+            # Materialized average maintained by the rating triggers (calculate_freelancer_rating reads the same)
+            cursor.execute("""
+                SELECT freelancer_id, is_available, rating_total / NULLIF(rating_count, 0)
+                FROM freelancer
+                ORDER BY freelancer_id
+            """)
+            freelancers = cursor.fetchall()
+            cursor.execute("SELECT id, budget FROM jobs WHERE status = 'Open' ORDER BY id")
+            jobs = cursor.fetchall()
+            cursor.execute("SELECT freelancer_id, tag_id FROM freelancer_skills")
+            freelancer_skills = cursor.fetchall()
+            cursor.execute("""
+                SELECT JS.job_id, JS.tag_id
+                FROM job_skills JS
+                JOIN jobs J ON J.id = JS.job_id
+                WHERE J.status = 'Open'
+            """)
+            job_skills = cursor.fetchall()
+            cursor.execute("SELECT freelancer_id, AVG(proposed_rate) FROM proposals GROUP BY freelancer_id")
+            rates = dict(cursor.fetchall())
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM skill_tags")
+            n_tags = cursor.fetchone()[0] + 1
+            cursor.close()
+        finally:
+            connection.close()
+
+        freelancer_ids = np.array([row[0] for row in freelancers], dtype=np.int64)
+        job_ids = np.array([row[0] for row in jobs], dtype=np.int64)
+
+        return cls(
+            freelancer_ids=freelancer_ids,
+            freelancer_tags=_tag_matrix(freelancer_ids, freelancer_skills, n_tags),
+            ratings=[float(row[2]) if row[2] is not None else np.nan for row in freelancers],
+            available=[bool(row[1]) for row in freelancers],
+            avg_rates=[float(rates[fid]) if rates.get(fid) is not None else np.nan for fid in freelancer_ids.tolist()],
+            job_ids=job_ids,
+            job_tags=_tag_matrix(job_ids, job_skills, n_tags),
+            budgets=[float(row[1]) for row in jobs],
+            **kwargs
+        )
+
+
+def _tag_matrix(owner_ids, pairs, n_tags):
+    index = {owner_id: i for i, owner_id in enumerate(owner_ids.tolist())}
+    rows, cols = [], []
+    for owner_id, tag_id in pairs:
+        row = index.get(owner_id)
+        if row is not None:
+            rows.append(row)
+            cols.append(tag_id)
+    data = np.ones(len(rows), dtype=np.float32)
+    return sparse.csr_matrix((data, (rows, cols)), shape=(len(owner_ids), n_tags))
+
+
+# 'version' counts invalidations, so a rebuild that started before the latest one is known to be
+# stale. 'failures' and 'failed_at' hold builds off after a failed load, so a database outage
+# does not turn every rerun into another set of full-table queries.
+_engine = {'engine': None, 'built_at': 0.0, 'version': 0, 'built_version': 0, 'rebuilding': False,
+           'failures': 0, 'failed_at': 0.0, 'error': None}
+_engine_lock = threading.Lock()
+# Held while a caller builds the engine itself (none exists yet), so only one of them loads
+_build_lock = threading.Lock()
+
+
+def _backing_off(now):
+    """ True while the last failed build is too recent to try again; caller holds _engine_lock. """
+    if not _engine['failures']:
+        return False
+    base = float(os.environ.get("MATCHING_RETRY_BACKOFF", 5))
+    delay = min(base * 2 ** (_engine['failures'] - 1), float(os.environ.get("MATCHING_CACHE_TTL", 300)))
+    return now - _engine['failed_at'] < delay
+
+
+def _install(engine, version):
+    # Caller holds _engine_lock; a build overtaken by a newer one is dropped
+    if version >= _engine['built_version']:
+        _engine['engine'] = engine
+        _engine['built_at'] = time.monotonic()
+        _engine['built_version'] = version
+    _engine['failures'], _engine['error'] = 0, None
+
+
+def _failed(error):
+    # Caller holds _engine_lock
+    _engine['failures'] += 1
+    _engine['failed_at'] = time.monotonic()
+    _engine['error'] = error
+
+
+def get_engine(force_rebuild=False):
+    """ Process-wide engine, rebuilt from MySQL at most every MATCHING_CACHE_TTL seconds.
+
+    Only the first call (or force_rebuild) builds the engine in the caller, without blocking
+    callers that already have an engine to use. Once one exists, an expired or invalidated
+    engine keeps being served while a background thread builds its replacement, so no request
+    waits for the bulk queries. After a failed build the next attempt waits MATCHING_RETRY_BACKOFF
+    seconds, doubling with each further failure up to MATCHING_CACHE_TTL; until then a caller
+    with no engine to fall back on gets the last error again.
+    """
+    ttl = float(os.environ.get("MATCHING_CACHE_TTL", 300))
+    with _engine_lock:
+        engine = _engine['engine']
+        if engine is not None and not force_rebuild:
+            now = time.monotonic()
+            stale = _engine['built_version'] != _engine['version'] or now - _engine['built_at'] >= ttl
+            if stale and not _backing_off(now):
+                _start_rebuild()
+            return engine
+
+    with _build_lock:
+        with _engine_lock:
+            if _engine['engine'] is not None and not force_rebuild:
+                # Another caller finished the first build while this one waited
+                return _engine['engine']
+            if _backing_off(time.monotonic()) and not force_rebuild:
+                raise _engine['error']
+            version = _engine['version']
+        try:
+            engine = MatchingEngine.load()
+        except Exception as e:
+            with _engine_lock:
+                _failed(e)
+            raise
+        with _engine_lock:
+            _install(engine, version)
+            return _engine['engine']
+
+
+def _start_rebuild():
+    # Called with _engine_lock held; at most one rebuild runs at a time
+    if not _engine['rebuilding']:
+        _engine['rebuilding'] = True
+        threading.Thread(target=_rebuild, args=(_engine['version'],), name="matching-rebuild", daemon=True).start()
+
+
+def _rebuild(version):
+    try:
+        engine = MatchingEngine.load()
+    except Exception as e:
+        logger.exception("Matching engine rebuild failed; serving the previous engine")
+        with _engine_lock:
+            _engine['rebuilding'] = False
+            _failed(e)
+        return
+    with _engine_lock:
+        _engine['rebuilding'] = False
+        _install(engine, version)
+
+
+def invalidate():
+    """ Mark the engine out of date; the next get_engine serves it once more and rebuilds it in the background. """
+    with _engine_lock:
+        _engine['version'] += 1
@@ -0,0 +1,339 @@
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Write paths call these inside their own transaction (transactional outbox): the notification
+# row commits or rolls back together with the change it announces, and delivery happens later
+# on the dispatcher thread instead of blocking the Streamlit request. Procedures that commit
+# on their own (accept_proposal, review_proposals) queue theirs from a trigger instead
+# (OutboxAfterUpdateProposal in "function and procedure").
+
+def enqueue(cursor, recipient_type, recipient_id, title, message):
+    cursor.execute(
+        "INSERT INTO notification_outbox (recipient_type, recipient_id, title, message) VALUES (%s, %s, %s, %s)",
+        (recipient_type, recipient_id, title, message)
+    )
+
+
+def enqueue_select(cursor, recipient_type, title, message, recipient_query, params):
+    """ Fan out one notification per recipient id returned by recipient_query, in a single INSERT ... SELECT. """
+    cursor.execute(
+        f"""
+            INSERT INTO notification_outbox (recipient_type, recipient_id, title, message)
+            SELECT %s, recipients.recipient_id, %s, %s
+            FROM ({recipient_query}) recipients
+        """,
+        (recipient_type, title, message, *params)
+    )
+    return cursor.rowcount
+
+
+def notify_matching_freelancers(cursor, job_id, title, message):
+    """ Available freelancers sharing at least one skill tag with the job. """
+    return enqueue_select(cursor, "freelancer", title, message, """
+        SELECT DISTINCT FS.freelancer_id AS recipient_id
+        FROM job_skills JS
+        JOIN freelancer_skills FS ON FS.tag_id = JS.tag_id
+        JOIN freelancer F ON F.freelancer_id = FS.freelancer_id
+        WHERE JS.job_id = %s
+        AND F.is_available = 1
+    """, (job_id,))
+
+
+def notify_contract_freelancer(cursor, contract_id, title, message):
+    return enqueue_select(cursor, "freelancer", title, message,
+                          "SELECT freelancer_id AS recipient_id FROM contracts WHERE id = %s", (contract_id,))
+
+
+def notify_job_client(cursor, job_id, title, message):
+    return enqueue_select(cursor, "client", title, message,
+                          "SELECT client_id AS recipient_id FROM jobs WHERE id = %s", (job_id,))
+
+
+def inbox(recipient_type, recipient_id, limit=20):
+    """ Latest notifications for one user, newest first (idx_outbox_recipient). """
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, title, message, status, created_at
+            FROM notification_outbox
+            WHERE recipient_type = %s AND recipient_id = %s
+            ORDER BY id DESC
+            LIMIT %s
+        """, (recipient_type, recipient_id, limit))
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return rows
+
+
+# Delivery channels take a batch of outbox rows and return {id: error} for the ones that failed.
+
+def inbox_channel(batch):
+    # Nothing external to deliver to: the outbox row is the recipient's in-app inbox entry.
+    return {}
+
+
+def desktop_channel(batch):
+    from plyer import notification
+
+    failures = {}
+    for row in batch:
+        try:
+            notification.notify(title=row['title'], message=row['message'], app_name="Freelancer App", timeout=10)
+        except Exception as e:
+            failures[row['id']] = str(e)
+    return failures
+
+
+class WebhookChannel:
+    """ POSTs each recipient's notifications as one JSON document, recipients delivered concurrently. """
+
+    def __init__(self, url, workers=8, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="notify-webhook")
+
+    def _post(self, recipient, rows):
+        recipient_type, recipient_id = recipient
+        body = json.dumps({
+            'recipient_type': recipient_type,
+            'recipient_id': recipient_id,
+            'notifications': [{'id': row['id'], 'title': row['title'], 'message': row['message']} for row in rows],
+        }).encode()
+        request = urllib.request.Request(self.url, data=body, headers={'Content-Type': 'application/json'})
+        try:
+            urllib.request.urlopen(request, timeout=self.timeout).close()
+            return {}
+        except Exception as e:
+            return {row['id']: str(e) for row in rows}
+
+    def __call__(self, batch):
+        by_recipient = defaultdict(list)
+        for row in batch:
+            by_recipient[(row['recipient_type'], row['recipient_id'])].append(row)
+
+        failures = {}
+        for result in self._executor.map(lambda item: self._post(*item), by_recipient.items()):
+            failures.update(result)
+        return failures
+
+
+def channel_from_env():
+    channel = os.environ.get("NOTIFICATION_CHANNEL", "inbox").lower()
+    if channel == "desktop":
+        return desktop_channel
+    if channel == "webhook":
+        return WebhookChannel(os.environ["NOTIFICATION_WEBHOOK_URL"])
+    return inbox_channel
+
+
+class NotificationDispatcher:
+    """ Background worker draining notification_outbox in batches with exponential backoff on failure.
+
+    Rows are claimed in a short transaction (status Sending, next_attempt_at pushed out by the
+    lease), delivered with no transaction or pooled connection held, and then marked Sent, or
+    Pending/Failed for a retry. A dispatcher that dies mid-delivery leaves its rows Sending
+    until the lease runs out; any dispatcher then claims them again, unless they have used up
+    max_attempts, in which case they are marked Failed.
+    """
+
+    def __init__(self, channel, batch_size=100, poll_interval=1.0, max_attempts=5, base_backoff=2.0, lease=120):
+        self.channel = channel
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.lease = lease
+        self._stop = threading.Event()
+        self._thread = None
+
+    def claim(self):
+        """ Lease up to batch_size due rows to this dispatcher; returns them with attempts counted.
+
+        Rows whose lease ran out on their last attempt are marked Failed instead of being claimed.
+        """
+        connection = DatabaseManager.get_connection()
+        try:
+            cursor = connection.cursor(dictionary=True)
+            # SKIP LOCKED lets several dispatchers (one per app process) claim rows concurrently
+            # without claiming the same row twice or queueing behind each other.
+            cursor.execute("""
+                SELECT id, recipient_type, recipient_id, title, message, attempts
+                FROM notification_outbox
+                WHERE status IN ('Pending', 'Sending') AND next_attempt_at <= NOW()
+                ORDER BY next_attempt_at, id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (self.batch_size,))
+            batch = cursor.fetchall()
+            exhausted = [row['id'] for row in batch if row['attempts'] >= self.max_attempts]
+            if exhausted:
+                placeholders = ", ".join(["%s"] * len(exhausted))
+                cursor.execute(
+                    f"UPDATE notification_outbox SET status = 'Failed', "
+                    f"last_error = 'Lease expired on the last attempt' WHERE id IN ({placeholders})",
+                    tuple(exhausted)
+                )
+                batch = [row for row in batch if row['attempts'] < self.max_attempts]
+            if batch:
+                placeholders = ", ".join(["%s"] * len(batch))
+                cursor.execute(
+                    f"UPDATE notification_outbox SET status = 'Sending', attempts = attempts + 1, "
+                    f"next_attempt_at = NOW() + INTERVAL %s SECOND WHERE id IN ({placeholders})",
+                    (self.lease, *(row['id'] for row in batch))
+                )
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+        for row in batch:
+            row['attempts'] += 1
+        return batch
+
+    def finish(self, batch, failures):
+        """ Record the outcome of a claimed batch; rows whose lease was taken over are left alone. """
+        # attempts identifies the claim: a row claimed again after its lease ran out has moved on
+        sent = [(row['id'], row['attempts']) for row in batch if row['id'] not in failures]
+        retries = []
+        for row in batch:
+            if row['id'] not in failures:
+                continue
+            status = 'Failed' if row['attempts'] >= self.max_attempts else 'Pending'
+            # Full jitter so a recovering endpoint is not hit by every retry at once
+            delay = int(random.uniform(0, self.base_backoff * 2 ** row['attempts'])) + 1
+            retries.append((status, delay, failures[row['id']][:255], row['id'], row['attempts']))
+
+        connection = DatabaseManager.get_connection()
+        try:
+            cursor = connection.cursor()
+            if sent:
+                placeholders = ", ".join(["(%s, %s)"] * len(sent))
+                cursor.execute(
+                    f"UPDATE notification_outbox SET status = 'Sent', sent_at = NOW() "
+                    f"WHERE status = 'Sending' AND (id, attempts) IN ({placeholders})",
+                    tuple(value for claimed in sent for value in claimed)
+                )
+            if retries:
+                cursor.executemany("""
+                    UPDATE notification_outbox
+                    SET status = %s, next_attempt_at = NOW() + INTERVAL %s SECOND, last_error = %s
+                    WHERE id = %s AND status = 'Sending' AND attempts = %s
+                """, retries)
+            connection.commit()
+            cursor.close()
+        finally:
+            connection.close()
+
+    def run_once(self):
+        """ Deliver one batch; returns the number of rows processed. """
+        batch = self.claim()
+        if not batch:
+            return 0
+        try:
+            failures = self.channel(batch)
+        except Exception as e:
+            failures = {row['id']: str(e) for row in batch}
+        self.finish(batch, failures)
+        return len(batch)
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                processed = self.run_once()
+            except Exception:
+                # Never let one bad batch kill the thread; its rows are claimed again once due
+                logger.exception("Notification dispatch failed")
+                processed = 0
+            # Keep draining while full batches come back; otherwise wait for new rows
+            if processed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="notification-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def prune(retention_days=30, batch_size=10000):
+    """ Delete Sent and Failed rows older than retention_days in batches; returns the number deleted. """
+    deleted = 0
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        while True:
+            # Ids grow with created_at, so each batch reads from the front of the primary key
+            cursor.execute("""
+                DELETE FROM notification_outbox
+                WHERE status IN ('Sent', 'Failed') AND created_at < NOW() - INTERVAL %s DAY
+                ORDER BY id
+                LIMIT %s
+            """, (retention_days, batch_size))
+            connection.commit()
+            deleted += cursor.rowcount
+            if cursor.rowcount < batch_size:
+                break
+        cursor.close()
+    finally:
+        connection.close()
+    return deleted
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def ensure_dispatcher():
+    """ Start the process-wide dispatcher thread once; safe to call on every Streamlit rerun. """
+    global _dispatcher
+    if os.environ.get("NOTIFICATION_DISPATCHER", "thread").lower() != "thread":
+        return None
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = NotificationDispatcher(
+                channel_from_env(),
+                batch_size=int(os.environ.get("NOTIFICATION_BATCH_SIZE", 100)),
+                poll_interval=float(os.environ.get("NOTIFICATION_POLL_INTERVAL", 1)),
+                lease=int(os.environ.get("NOTIFICATION_LEASE", 120)),
+            )
+            _dispatcher.start()
+    return _dispatcher
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the notification outbox dispatcher as a standalone worker.")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--lease", type=int, default=int(os.environ.get("NOTIFICATION_LEASE", 120)),
+                        help="seconds a claimed batch has to be delivered before other dispatchers may claim it")
+    parser.add_argument("--prune", action="store_true",
+                        help="delete Sent and Failed rows older than --retention days and exit")
+    parser.add_argument("--retention", type=float,
+                        default=float(os.environ.get("NOTIFICATION_RETENTION_DAYS", 30)), help="days to keep")
+    args = parser.parse_args()
+
+    if args.prune:
+        print(f"deleted {prune(args.retention)} notifications older than {args.retention:g} days")
+    else:
+        dispatcher = NotificationDispatcher(channel_from_env(), batch_size=args.batch_size,
+                                            poll_interval=args.poll_interval, lease=args.lease)
+        try:
+            dispatcher.run_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,125 @@
+import json
+import os
+
+import data_export
+import read_cache
+
+# Aggregations over the columnar snapshots written by data_export.py. Nothing here connects
+# to MySQL: files are opened through a memory-mapped filesystem, only the needed columns are
+# read, partition filters skip whole directories, and the group-bys run in Arrow before the
+# (small) results are handed to pandas.
+
+
+def latest_snapshot(base_dir=None):
+    """ Manifest of the newest complete snapshot, or None if nothing was exported yet. """
+    base_dir = base_dir or data_export.export_dir()
+    try:
+        with open(os.path.join(base_dir, "LATEST")) as f:
+            snapshot = f.read().strip()
+        with open(os.path.join(base_dir, snapshot, "manifest.json")) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    manifest['path'] = os.path.join(base_dir, snapshot)
+    return manifest
+
+
+def dataset(manifest, table):
+    import pyarrow.dataset as ds
+    from pyarrow import fs
+
+    path = os.path.join(manifest['path'], table)
+    if not os.path.isdir(path):
+        # Table was empty or left out of this snapshot
+        return ds.dataset(data_export.to_table([], data_export.schemas()[table]))
+    return ds.dataset(
+        path,
+        schema=data_export.schemas()[table],
+        format="ipc" if manifest['format'] == "arrow" else "parquet",
+        partitioning="hive",
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+    )
+
+
+def scan(manifest, table, columns, where=None):
+    """ Arrow table with just `columns`, filtered by a pyarrow.dataset expression. """
+    return dataset(manifest, table).to_table(columns=columns, filter=where)
+
+
+def _cached(name, manifest, compute):
+    # Snapshots never change once written, so results are cached until evicted
+    return read_cache.cached(f"offline_analytics.{name}", (manifest['snapshot'],), (), compute)
+
+
+def revenue_by_category(manifest):
+    import pyarrow.dataset as ds
+
+    def compute():
+        contracts = scan(manifest, 'contracts', ['category', 'payment'], ds.field('status') == 'Completed')
+        result = contracts.group_by('category').aggregate([('payment', 'sum'), ('payment', 'count'),
+                                                           ('payment', 'mean')])
+        return result.rename_columns(['category', 'revenue', 'contracts', 'avg_payment']).to_pandas() \
+            .sort_values('revenue', ascending=False, ignore_index=True)
+    return _cached("revenue_by_category", manifest, compute)
+
+
+def acceptance_by_category(manifest):
+    def compute():
+        proposals = scan(manifest, 'proposals', ['category', 'status'])
+        counts = proposals.group_by(['category', 'status']).aggregate([('status', 'count')]).to_pandas()
+        table = counts.pivot_table(index='category', columns='status', values='status_count',
+                                    aggfunc='sum', fill_value=0)
+        table = table.reindex(columns=['Pending', 'Accepted', 'Rejected'], fill_value=0)
+        table['proposals'] = table.sum(axis=1)
+        table['acceptance_rate'] = table['Accepted'] / table['proposals']
+        return table.reset_index().rename_axis(columns=None)
+    return _cached("acceptance_by_category", manifest, compute)
+
+
+def budget_vs_rate(manifest):
+    """ Average job budget against the average proposed rate, per category. """
+    def compute():
+        budgets = scan(manifest, 'jobs', ['category', 'budget']).group_by('category') \
+            .aggregate([('budget', 'mean'), ('budget', 'count')]).to_pandas()
+        rates = scan(manifest, 'proposals', ['category', 'proposed_rate']).group_by('category') \
+            .aggregate([('proposed_rate', 'mean')]).to_pandas()
+        result = budgets.merge(rates, on='category', how='left')
+        return result.rename(columns={'budget_mean': 'avg_budget', 'budget_count': 'jobs',
+                                      'proposed_rate_mean': 'avg_proposed_rate'})
+    return _cached("budget_vs_rate", manifest, compute)
+
+
+def ratings_by_month(manifest):
+    def compute():
+        ratings = scan(manifest, 'ratings', ['rating_month', 'category', 'rating_score'])
+        result = ratings.group_by(['rating_month', 'category']).aggregate([('rating_score', 'mean'),
+                                                                           ('rating_score', 'count')])
+        return result.rename_columns(['rating_month', 'category', 'avg_rating', 'ratings']).to_pandas() \
+            .sort_values(['rating_month', 'category'], ignore_index=True)
+    return _cached("ratings_by_month", manifest, compute)
+
+
+def rating_distribution(manifest):
+    def compute():
+        ratings = scan(manifest, 'ratings', ['rating_score'])
+        result = ratings.group_by('rating_score').aggregate([('rating_score', 'count')])
+        return result.rename_columns(['rating_score', 'ratings']).to_pandas() \
+            .sort_values('rating_score', ignore_index=True)
+    return _cached("rating_distribution", manifest, compute)
+
+
+def top_freelancers(manifest, limit=20):
+    """ Freelancers by completed contract revenue, with their average rating in the snapshot. """
+    import pyarrow.dataset as ds
+
+    def compute():
+        earnings = scan(manifest, 'contracts', ['freelancer_id', 'payment'], ds.field('status') == 'Completed') \
+            .group_by('freelancer_id').aggregate([('payment', 'sum'), ('payment', 'count')]).to_pandas()
+        earnings = earnings.nlargest(limit, 'payment_sum')
+        ratings = scan(manifest, 'ratings', ['freelancer_id', 'rating_score'],
+                       ds.field('freelancer_id').isin(earnings['freelancer_id'].tolist())) \
+            .group_by('freelancer_id').aggregate([('rating_score', 'mean')]).to_pandas()
+        result = earnings.merge(ratings, on='freelancer_id', how='left')
+        return result.rename(columns={'payment_sum': 'revenue', 'payment_count': 'contracts',
+                                      'rating_score_mean': 'avg_rating'}).reset_index(drop=True)
+    return _cached(f"top_freelancers.{limit}", manifest, compute)
@@ -0,0 +1,26 @@
+import functools
+import os
+import re
+
+import streamlit as st
+
+# Each dashboard used to carry its CSS as a string literal inside the script, rebuilt and sent
+# in full (comments and indentation included) on every rerun. The stylesheets live in styles/
+# now; they are read and minified once per process and the same short string is emitted on
+# each run.
+
+STYLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles")
+
+
+@functools.lru_cache(maxsize=None)
+def load(name):
+    """ styles/<name>.css without comments and redundant whitespace. """
+    with open(os.path.join(STYLE_DIR, f"{name}.css"), encoding="utf-8") as handle:
+        css = handle.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    return re.sub(r"\s*([{};,>])\s*", r"\1", css).strip()
+
+
+def apply(name):
+    st.markdown(f"<style>{load(name)}</style>", unsafe_allow_html=True)
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+
+from database import DatabaseManager, note_writes
+
+# All headline metrics in one round trip. Each scalar subquery is answered from an index
+# (status columns are indexed in something.sql) rather than issuing seven separate statements.
+LIVE_STATS_QUERY = """
+    SELECT
+        (SELECT COUNT(*) FROM client) AS total_clients,
+        (SELECT COUNT(*) FROM freelancer) AS total_freelancers,
+        (SELECT COUNT(*) FROM jobs) AS total_jobs,
+        (SELECT COUNT(*) FROM jobs WHERE status = 'Open') AS open_jobs,
+        c.completed_contracts,
+        c.total_payment,
+        (SELECT AVG(rating) FROM freelancer WHERE rating IS NOT NULL) AS avg_freelancer_rating
+    FROM (
+        -- Archived contracts (archive.py) are all completed and still count
+        SELECT CAST(SUM(n) AS SIGNED) AS completed_contracts, SUM(total) AS total_payment
+        FROM (
+            SELECT COUNT(*) AS n, COALESCE(SUM(payment), 0) AS total FROM contracts WHERE status = 'Completed'
+            UNION ALL
+            SELECT COUNT(*), COALESCE(SUM(payment), 0) FROM contracts_archive WHERE status = 'Completed'
+        ) h
+    ) c
+"""
+
+# Slot rows kept current by the triggers in "function and procedure"; each holds the changes
+# made through some of the connections, so the totals are their sum.
+SUMMARY_STATS_QUERY = """
+    SELECT
+        CAST(SUM(total_clients) AS SIGNED) AS total_clients,
+        CAST(SUM(total_freelancers) AS SIGNED) AS total_freelancers,
+        CAST(SUM(total_jobs) AS SIGNED) AS total_jobs,
+        CAST(SUM(open_jobs) AS SIGNED) AS open_jobs,
+        CAST(SUM(completed_contracts) AS SIGNED) AS completed_contracts,
+        SUM(total_payment) AS total_payment,
+        SUM(rating_sum) / NULLIF(SUM(rated_freelancers), 0) AS avg_freelancer_rating
+    FROM platform_stats
+    HAVING COUNT(*) > 0
+"""
+
+_cache = {'stats': None, 'fetched_at': 0.0}
+_cache_lock = threading.Lock()
+
+# Stats are read from a replica when one is configured, except right after invalidate()
+STATS_TAG = ("platform_stats",)
+
+
+def cache_ttl():
+    return float(os.environ.get("STATS_CACHE_TTL", 30))
+
+
+def use_summary_table():
+    return os.environ.get("STATS_SOURCE", "live").lower() == "summary"
+
+
+def fetch_stats(summary=None):
+    """ Fetch all platform metrics from MySQL in a single query, bypassing the cache. """
+    if summary is None:
+        summary = use_summary_table()
+
+    db = DatabaseManager.get_read_connection([STATS_TAG])
+    try:
+        cursor = db.cursor(dictionary=True)
+        cursor.execute(SUMMARY_STATS_QUERY if summary else LIVE_STATS_QUERY)
+        stats = cursor.fetchone()
+        cursor.close()
+    finally:
+        db.close()
+
+    if stats is None:
+        # Summary rows missing (table created without its seed rows): fall back to live counts.
+        return fetch_stats(summary=False)
+    stats['total_payment'] = stats['total_payment'] or 0
+    return stats
+
+
+def get_stats(force_refresh=False):
+    """ Return platform metrics, served from a process-wide cache shared by every admin session. """
+    ttl = cache_ttl()
+    with _cache_lock:
+        if not force_refresh and _cache['stats'] is not None and time.monotonic() - _cache['fetched_at'] < ttl:
+            return dict(_cache['stats'])
+
+        # Fetch under the lock so concurrent sessions hitting an expired entry share one query.
+        stats = fetch_stats()
+        _cache['stats'] = stats
+        _cache['fetched_at'] = time.monotonic()
+        return dict(stats)
+
+
+def invalidate():
+    with _cache_lock:
+        _cache['stats'] = None
+    note_writes(STATS_TAG)
+
+
+def refresh_summary_table():
+    """ Recompute platform_stats from the base tables (e.g. after cascading deletes, which skip triggers). """
+    db = DatabaseManager.get_connection()
+    try:
+        cursor = db.cursor()
+        cursor.callproc("refresh_platform_stats")
+        db.commit()
+        cursor.close()
+    finally:
+        db.close()
+    invalidate()
@@ -0,0 +1,44 @@
+import json
+
+from database import run_in_transaction
+import read_cache
+
+
+def accept_proposal(proposal_id):
+    """ Accept one proposal through the accept_proposal procedure; returns (accepted, status message).
+
+    The procedure locks the job row, so concurrent accepts for one job create exactly one contract.
+    It commits on its own; the freelancer's notification is queued by OutboxAfterUpdateProposal in
+    the same transaction. Nothing touches MySQL after the commit, so an error means nothing was accepted.
+    """
+    # A proposal's job, freelancer and client never change, so they can be looked up beforehand
+    tags = run_in_transaction(lambda cursor: read_cache.proposal_tags(cursor, proposal_id))
+    message = run_in_transaction(lambda cursor: cursor.callproc("accept_proposal", (proposal_id, None))[1])
+    if 'success' not in message.lower():
+        return False, message
+
+    # The job left the open feed and its client and freelancer gained a contract
+    read_cache.invalidate(read_cache.OPEN_JOBS, *tags)
+    return True, message
+
+
+def review_proposals(client_id, accept_ids=(), reject_ids=()):
+    """ Accept and reject many of a client's proposals in one transaction (review_proposals procedure).
+
+    Returns {'accepted': [(job_id, proposal_id)], 'rejected': n, 'skipped': n}. An accept is skipped
+    when its job is already closed, or when another proposal for the same job was accepted in the batch.
+    The accepted freelancers' notifications commit with the batch (OutboxAfterUpdateProposal).
+    """
+    def review(cursor):
+        result = cursor.callproc("review_proposals", (
+            client_id, json.dumps([int(i) for i in accept_ids]), json.dumps([int(i) for i in reject_ids]), 0, 0, 0
+        ))
+        return result, [tuple(row) for results in cursor.stored_results() for row in results.fetchall()]
+
+    result, accepted = run_in_transaction(review)
+
+    changed = [read_cache.client(client_id)]
+    if accepted:
+        changed += [read_cache.OPEN_JOBS, *(read_cache.job(job_id) for job_id, _ in accepted)]
+    read_cache.invalidate(*changed)
+    return {'accepted': accepted, 'rejected': result[4], 'skipped': result[5]}
@@ -0,0 +1,386 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import urllib.request
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Prometheus histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_SHAPES = 500
+SAMPLES_PER_SHAPE = 256
+
+_LITERALS = [
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), "?"),
+    (re.compile(r'"(?:[^"\\]|\\.)*"'), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\?(?:\s*,\s*\?)+"), "?, ..."),
+    (re.compile(r"(\((?:\?, \.\.\.|\?)\))(?:\s*,\s*\1)+"), r"\1, ..."),
+]
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+`?(\w+)", re.IGNORECASE)
+
+
+def enabled():
+    return os.environ.get("QUERY_METRICS", "on").lower() not in ("off", "0", "false")
+
+
+def normalize(statement):
+    """ Query shape: literals and placeholders become ?, and IN lists / multi-row VALUES collapse to one entry. """
+    shape = statement.strip()
+    for pattern, replacement in _LITERALS:
+        shape = pattern.sub(replacement, shape)
+    return shape.strip()
+
+
+def operation(shape):
+    """ Low-cardinality label for a shape, e.g. "SELECT jobs" or "CALL accept_proposal". """
+    words = shape.split(None, 2)
+    if not words:
+        return "unknown"
+    verb = words[0].upper()
+    if verb == "CALL" and len(words) > 1:
+        return f"CALL {words[1].split('(')[0]}"
+    table = _TABLE.search(shape)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+def calling_function():
+    """ module.qualname of the nearest frame outside the database layer, e.g. freelancer_dashboard.ContractService.view_all_contracts. """
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module not in ("database", __name__) and not module.startswith("mysql."):
+            if module == "__main__":
+                # Streamlit runs each dashboard as __main__; name it after its file instead
+                module = os.path.splitext(os.path.basename(frame.f_globals.get("__file__", "")))[0] or module
+            code = frame.f_code
+            return f"{module}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return "unknown"
+
+
+# Parameter values can be personal data (emails, phone numbers, cover letters) or secrets
+# (password hashes), and shapes are served over HTTP at /queries, so only their types are kept.
+# EXPLAIN runs the slowest statement with a stand-in value of each type.
+_STAND_INS = {'int': 0, 'float': 0.0, 'Decimal': 0, 'bool': False, 'str': "", 'bytes': b"",
+              'date': "1970-01-01", 'datetime': "1970-01-01 00:00:00", 'NoneType': None}
+
+
+def param_types(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {name: type(value).__name__ for name, value in params.items()}
+    return [type(value).__name__ for value in params]
+
+
+def stand_in_params(types):
+    """ Parameters of the recorded types to EXPLAIN a statement with. """
+    if types is None:
+        return None
+    if isinstance(types, dict):
+        return {name: _STAND_INS.get(kind, "") for name, kind in types.items()}
+    return tuple(_STAND_INS.get(kind, "") for kind in types)
+
+
+class _Shape:
+    __slots__ = ("shape", "operation", "count", "total", "max", "rows", "samples", "callers", "example",
+                 "param_types")
+
+    def __init__(self, shape):
+        self.shape = shape
+        self.operation = operation(shape)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.samples = deque(maxlen=SAMPLES_PER_SHAPE)
+        self.callers = Counter()
+        self.example = None
+        self.param_types = None
+
+
+class QueryRecorder:
+    """ Process-wide per-shape statistics, plus Prometheus histograms per (operation, caller). """
+
+    def __init__(self, max_shapes=MAX_SHAPES):
+        self.max_shapes = max_shapes
+        self._shapes = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, params, elapsed, rows, caller):
+        shape = normalize(statement)
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    # Bound memory if something builds SQL with inlined values
+                    shape = "(other)"
+                    entry = self._shapes.get(shape)
+                if entry is None:
+                    entry = self._shapes[shape] = _Shape(shape)
+            entry.count += 1
+            entry.total += elapsed
+            entry.rows += rows
+            entry.samples.append(elapsed)
+            entry.callers[caller] += 1
+            if elapsed >= entry.max:
+                # Keep the slowest execution so EXPLAIN shows the worst case
+                entry.max = elapsed
+                entry.example, entry.param_types = statement, param_types(params)
+
+            hist = self._histograms.get((entry.operation, caller))
+            if hist is None:
+                hist = self._histograms[(entry.operation, caller)] = {
+                    'buckets': [0] * len(BUCKETS), 'count': 0, 'sum': 0.0, 'rows': 0,
+                }
+            hist['count'] += 1
+            hist['sum'] += elapsed
+            hist['rows'] += rows
+            for i, bound in enumerate(BUCKETS):
+                if elapsed <= bound:
+                    hist['buckets'][i] += 1
+                    break
+
+    def shapes(self):
+        """ One dict per shape with latencies in milliseconds, highest total time first. """
+        with self._lock:
+            entries = [
+                (e.shape, e.operation, e.count, e.total, e.max, e.rows, sorted(e.samples),
+                 e.callers.most_common(3), e.example, e.param_types)
+                for e in self._shapes.values()
+            ]
+        result = []
+        for shape, op, count, total, worst, rows, samples, callers, example, types in entries:
+            result.append({
+                'shape': shape,
+                'operation': op,
+                'calls': count,
+                'total_ms': total * 1000,
+                'mean_ms': total / count * 1000,
+                'p95_ms': samples[int(0.95 * (len(samples) - 1))] * 1000,
+                'max_ms': worst * 1000,
+                'rows_per_call': rows / count,
+                'callers': ", ".join(caller for caller, _ in callers),
+                'example': example,
+                'param_types': types,
+            })
+        result.sort(key=lambda row: row['total_ms'], reverse=True)
+        return result
+
+    def histograms(self):
+        with self._lock:
+            return {key: dict(hist, buckets=list(hist['buckets'])) for key, hist in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+            self._histograms.clear()
+
+
+recorder = QueryRecorder()
+
+
+class InstrumentedCursor:
+    """ Cursor proxy timing each statement from execute until its last fetch (or until execute returns
+    when there is no result set), attributed to the calling function. """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._pending = None
+        self._rows = 0
+        self._fetched_at = None
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        for row in self.cursor:
+            self._rows += 1
+            self._fetched_at = time.perf_counter()
+            yield row
+
+    def _flush(self):
+        if self._pending is None:
+            return
+        statement, params, start, caller, rows = self._pending
+        self._pending = None
+        end = self._fetched_at or time.perf_counter()
+        recorder.record(statement, params, end - start, self._rows if rows is None else rows, caller)
+
+    def _run(self, statement, params, call, *args):
+        self._flush()
+        self._rows, self._fetched_at = 0, None
+        caller = calling_function()
+        start = time.perf_counter()
+        result = call(*args)
+        if getattr(self.cursor, "with_rows", False):
+            # Rows are counted as they are fetched
+            self._pending = (statement, params, start, caller, None)
+        else:
+            self._pending = (statement, params, start, caller, max(self.cursor.rowcount or 0, 0))
+            self._flush()
+        return result
+
+    def execute(self, operation, params=None, *args, **kwargs):
+        return self._run(operation, params, lambda: self.cursor.execute(operation, params, *args, **kwargs))
+
+    def executemany(self, operation, seq_params):
+        return self._run(operation, None, self.cursor.executemany, operation, seq_params)
+
+    def callproc(self, procname, args=()):
+        statement = f"CALL {procname}({', '.join(['%s'] * len(args))})"
+        return self._run(statement, tuple(args), self.cursor.callproc, procname, args)
+
+    def _fetched(self, result):
+        self._fetched_at = time.perf_counter()
+        if isinstance(result, list):
+            self._rows += len(result)
+        elif result is not None:
+            self._rows += 1
+        return result
+
+    def fetchone(self):
+        return self._fetched(self.cursor.fetchone())
+
+    def fetchmany(self, *args, **kwargs):
+        return self._fetched(self.cursor.fetchmany(*args, **kwargs))
+
+    def fetchall(self):
+        result = self._fetched(self.cursor.fetchall())
+        self._flush()
+        return result
+
+    def close(self):
+        self._flush()
+        return self.cursor.close()
+
+    def __del__(self):
+        try:
+            self._flush()
+        except Exception:
+            pass
+
+
+def instrument(cursor):
+    return InstrumentedCursor(cursor) if enabled() else cursor
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def prometheus_text():
+    """ Query histograms and pool gauges in the Prometheus text exposition format. """
+    from database import pool_stats
+
+    lines = [
+        "# HELP db_query_duration_seconds Statement latency from execute until results are fetched.",
+        "# TYPE db_query_duration_seconds histogram",
+    ]
+    rows = []
+    for (op, caller), hist in sorted(recorder.histograms().items()):
+        labels = f'operation="{_label(op)}",caller="{_label(caller)}"'
+        cumulative = 0
+        for bound, count in zip(BUCKETS, hist['buckets']):
+            cumulative += count
+            lines.append(f'db_query_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'db_query_duration_seconds_bucket{{{labels},le="+Inf"}} {hist["count"]}')
+        lines.append(f"db_query_duration_seconds_sum{{{labels}}} {hist['sum']:.6f}")
+        lines.append(f"db_query_duration_seconds_count{{{labels}}} {hist['count']}")
+        rows.append(f"db_query_rows_total{{{labels}}} {hist['rows']}")
+
+    lines += ["# HELP db_query_rows_total Rows returned or affected.", "# TYPE db_query_rows_total counter", *rows]
+
+    gauges = {
+        'in_use': "gauge", 'idle': "gauge", 'checkouts': "counter", 'waits': "counter",
+        'timeouts': "counter", 'created': "counter", 'discarded': "counter",
+    }
+    pools = pool_stats()
+    for key, kind in gauges.items():
+        name = f"db_pool_{key}" + ("_total" if kind == "counter" else "")
+        lines.append(f"# TYPE {name} {kind}")
+        lines += [f'{name}{{pool="{_label(stats["pool"])}"}} {stats[key]}' for stats in pools]
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, content_type = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path == "/queries":
+            body, content_type = json.dumps(recorder.shapes(), default=str).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def ensure_metrics_server():
+    """ Serve /metrics (Prometheus) and /queries (JSON) once per process when QUERY_METRICS_PORT is set. """
+    global _server
+    port = int(os.environ.get("QUERY_METRICS_PORT", 0))
+    if not port or not enabled():
+        return None
+    with _server_lock:
+        if _server is None:
+            host = os.environ.get("QUERY_METRICS_HOST", "127.0.0.1")
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                logger.exception("Could not start the query metrics endpoint on %s:%s", host, port)
+                return None
+            threading.Thread(target=_server.serve_forever, name="query-metrics", daemon=True).start()
+    return _server
+
+
+def peer_shapes(timeout=2):
+    """ Shapes recorded by the other dashboard processes listed in QUERY_METRICS_PEERS (comma-separated base URLs). """
+    results = {}
+    for url in filter(None, (u.strip() for u in os.environ.get("QUERY_METRICS_PEERS", "").split(","))):
+        try:
+            with urllib.request.urlopen(f"{url.rstrip('/')}/queries", timeout=timeout) as response:
+                results[url] = json.load(response)
+        except Exception as e:
+            results[url] = e
+    return results
+
+
+def explain(statement, types=None):
+    """ EXPLAIN rows for a recorded statement, with stand-in values for parameters of the recorded types.
+
+    Runs on an uninstrumented cursor so it is not recorded itself.
+    """
+    from database import DatabaseManager
+
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        if isinstance(cursor, InstrumentedCursor):
+            cursor = cursor.cursor
+        cursor.execute(f"EXPLAIN {statement}", stand_in_params(types))
+        plan = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return plan
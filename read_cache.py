@@ -0,0 +1,248 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import database
+import state_store
+
+# Every widget interaction reruns the whole Streamlit script, so the read paths below are
+# served from a process-wide LRU shared by all sessions. Entries are tagged with the entities
+# they were read from, e.g. ("client", 7) or ("open_jobs",), and write paths invalidate those
+# tags after they commit. Writes made by other processes are picked up after READ_CACHE_TTL,
+# except that replicas sharing a STATE_STORE also publish their invalidations there and apply
+# each other's within READ_CACHE_SYNC_INTERVAL seconds.
+
+OPEN_JOBS = ("open_jobs",)
+
+
+def job(job_id):
+    return ("job", job_id)
+
+
+def client(client_id):
+    return ("client", client_id)
+
+
+def freelancer(freelancer_id):
+    return ("freelancer", freelancer_id)
+
+
+def _sizeof(value):
+    """ Approximate deep size of rows made of lists, tuples, dicts and scalars. """
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_sizeof(k) + _sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set)):
+        size += sum(_sizeof(item) for item in value)
+    return size
+
+
+class ReadCache:
+    """ LRU bounded by entry count and approximate bytes, with tag-based invalidation.
+
+    Each tag has a generation counter that invalidate() bumps. A load records the generations
+    of its tags before querying and its result is dropped if any changed meanwhile, so a read
+    racing a write can never put the pre-write rows back into the cache.
+    """
+
+    def __init__(self, max_entries=2000, max_bytes=64 * 1024 * 1024, ttl=60.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, tags, stored_at)
+        self._tagged = {}              # tag -> set of keys
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def _remove(self, key):
+        # Caller holds the lock
+        _, size, tags, _ = self._entries.pop(key)
+        self._bytes -= size
+        for tag in tags:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[3] > self.ttl:
+                if entry is not None:
+                    self._remove(key)
+                self._counters['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return True, entry[0]
+
+    def get_or_load(self, key, tags, loader):
+        """ Return the cached value for key, or call loader() and cache its result under tags. """
+        found, value = self.get(key)
+        if found:
+            return value
+
+        with self._lock:
+            generations = [self._generations.get(tag, 0) for tag in tags]
+        value = loader()
+        size = _sizeof(value)
+
+        with self._lock:
+            if [self._generations.get(tag, 0) for tag in tags] != generations or size > self.max_bytes:
+                return value
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, tuple(tags), time.monotonic())
+            self._bytes += size
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counters['evictions'] += 1
+        return value
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in list(self._tagged.get(tag, ())):
+                    self._remove(key)
+                    self._counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            for tag in list(self._tagged):
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._entries.clear()
+            self._tagged.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, **self._counters}
+
+
+def enabled():
+    return os.environ.get("READ_CACHE", "on").lower() not in ("off", "0", "false")
+
+
+cache = ReadCache(
+    max_entries=int(os.environ.get("READ_CACHE_MAX_ENTRIES", 2000)),
+    max_bytes=int(float(os.environ.get("READ_CACHE_MAX_MB", 64)) * 1024 * 1024),
+    ttl=float(os.environ.get("READ_CACHE_TTL", 60)),
+)
+
+
+# Invalidations shared between replicas: a counter holds the latest sequence number and each
+# invalidation is stored under its number for INVALIDATION_LOG_TTL seconds. A replica that
+# finds a number missing from the log has fallen too far behind and clears its whole cache.
+INVALIDATION_LOG_TTL = 600
+_sync = {'seen': None, 'checked_at': 0.0, 'published': set()}
+_sync_lock = threading.Lock()
+
+
+def _sync_interval():
+    return float(os.environ.get("READ_CACHE_SYNC_INTERVAL", 0.5))
+
+
+def _publish(tags):
+    store = state_store.get_store()
+    if not store.shared or not tags:
+        return
+    sequence = store.incr("read_cache:invalidations")
+    store.set(f"read_cache:invalidation:{sequence}", [list(tag) for tag in tags], ttl=INVALIDATION_LOG_TTL)
+    with _sync_lock:
+        _sync['published'].add(sequence)
+
+
+def _pull():
+    """ Apply invalidations published by other replicas, at most once per sync interval. """
+    store = state_store.get_store()
+    if not store.shared:
+        return
+    with _sync_lock:
+        now = time.monotonic()
+        if now - _sync['checked_at'] < _sync_interval():
+            return
+        _sync['checked_at'] = now
+        latest = store.get("read_cache:invalidations") or 0
+        if _sync['seen'] is None:
+            # Nothing was cached before the first check, so there is nothing to catch up on
+            _sync['seen'] = latest
+            _sync['published'].clear()
+            return
+        for sequence in range(_sync['seen'] + 1, latest + 1):
+            if sequence in _sync['published']:
+                _sync['published'].discard(sequence)
+                continue
+            tags = store.get(f"read_cache:invalidation:{sequence}")
+            if tags is None:
+                cache.clear()
+                break
+            invalidate_local(*[tuple(tag) for tag in tags])
+        _sync['seen'] = max(_sync['seen'], latest)
+
+
+def cached(name, params, tags, loader):
+    """ Cache loader()'s result under (name, params); cached rows are shared, so callers must not mutate them. """
+    if not enabled():
+        return loader()
+    _pull()
+    return cache.get_or_load((name, params), tags, loader)
+
+
+def invalidate(*tags):
+    """ Called by write paths after they commit; also keeps reads of tags on the primary for a while. """
+    cache.invalidate(*tags)
+    database.note_writes(*tags)
+    _publish(tags)
+
+
+def invalidate_local(*tags):
+    """ Apply a write another process made and announced (invalidation log, change feed). """
+    cache.invalidate(*tags)
+    database.note_writes(*tags)
+
+
+# Write paths resolve the entities a row belongs to inside their own transaction, so they
+# can invalidate exactly the cached views that changed once it commits.
+
+def proposal_tags(cursor, proposal_id):
+    cursor.execute("""
+        SELECT P.job_id, P.freelancer_id, J.client_id
+        FROM proposals P JOIN jobs J ON J.id = P.job_id
+        WHERE P.id = %s
+    """, (proposal_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return []
+    if isinstance(row, dict):
+        row = (row['job_id'], row['freelancer_id'], row['client_id'])
+    return [job(row[0]), freelancer(row[1]), client(row[2])]
+
+
+def contract_tags(cursor, contract_id):
+    cursor.execute("""
+        SELECT C.job_id, C.freelancer_id, J.client_id
+        FROM contracts C JOIN jobs J ON J.id = C.job_id
+        WHERE C.id = %s
+    """, (contract_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return []
+    if isinstance(row, dict):
+        row = (row['job_id'], row['freelancer_id'], row['client_id'])
+    return [job(row[0]), freelancer(row[1]), client(row[2])]
+
+
+def job_tags(cursor, job_id):
+    cursor.execute("SELECT client_id FROM jobs WHERE id = %s", (job_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return [job(job_id)]
+    return [job(job_id), client(row['client_id'] if isinstance(row, dict) else row[0])]
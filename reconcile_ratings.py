@@ -0,0 +1,34 @@
+import argparse
+
+from database import DatabaseManager
+
+
+def reconcile(batch_size=1000):
+    """ Recompute materialized freelancer ratings from the ratings table, one id range per transaction.
+
+    Returns the number of freelancers whose running totals or average had drifted and were corrected.
+    """
+    connection = DatabaseManager.get_connection()
+    drifted = 0
+    try:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COALESCE(MAX(freelancer_id), 0) FROM freelancer")
+        max_id = cursor.fetchone()[0]
+
+        for start in range(1, max_id + 1, batch_size):
+            end = start + batch_size - 1
+            result = cursor.callproc("reconcile_freelancer_ratings", (start, end, 0))
+            drifted += result[2] or 0
+            print(f"freelancers {start}-{end}: {result[2] or 0} corrected")
+        cursor.close()
+    finally:
+        connection.close()
+    return drifted
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile materialized freelancer ratings.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{reconcile(args.batch_size)} freelancers corrected")
@@ -0,0 +1,100 @@
+import json
+import time
+
+import streamlit as st
+
+import auth
+import state_store
+
+# st.session_state lives in the memory of the replica serving the browser's websocket. When
+# that connection drops (network blip, replica restart, scale-down) the browser reconnects to
+# a fresh Streamlit session, possibly on another replica behind the load balancer. With a
+# shared STATE_STORE the page URL carries a one-time resume code (auth.issue_resume_code) that
+# any replica exchanges for the session token, and the dashboard state listed in `keys` is
+# saved to the store after each run, so whichever replica picks the browser up restores the
+# login and that state. The token itself never appears in the URL. With the default
+# in-process store nothing leaves st.session_state.
+
+
+def _scale_out():
+    return state_store.get_store().shared
+
+
+def _encode(value):
+    return sorted(value) if isinstance(value, set) else value
+
+
+def _decode(value):
+    # Sets are the only containers these dashboards keep in state
+    return set(value) if isinstance(value, list) else value
+
+
+def restore(user_type, keys):
+    """ The session behind this browser's token, or None.
+
+    On a fresh Streamlit session the token is redeemed from the resume code in the URL and the
+    saved state for `keys` is copied back into st.session_state.
+    """
+    token = st.session_state.get('session_token')
+    if token is None and _scale_out() and st.query_params.get('resume'):
+        token = auth.redeem_resume_code(st.query_params['resume'])
+        if token is not None:
+            st.session_state.session_token = token
+            saved = auth.load_state(token)
+            for key in keys:
+                if key in saved:
+                    st.session_state[key] = _decode(saved[key])
+            st.session_state._saved_state = json.dumps(saved, sort_keys=True)
+
+    session = auth.validate(token, user_type)
+    if session is None:
+        if token is not None:
+            st.session_state.session_token = None
+        _drop_resume_code()
+    elif _scale_out():
+        _refresh_resume_code(token)
+    return session
+
+
+def _refresh_resume_code(token):
+    """ Put a fresh resume code in the URL when there is none yet for this session or it is half expired. """
+    issued_at = st.session_state.get('_resume_issued_at')
+    if issued_at is not None and time.time() - issued_at < auth.resume_ttl() / 2:
+        return
+    auth.revoke_resume_code(st.session_state.get('_resume_code'))
+    code = auth.issue_resume_code(token)
+    st.session_state._resume_code = code
+    st.session_state._resume_issued_at = time.time()
+    st.query_params['resume'] = code
+
+
+def _drop_resume_code():
+    auth.revoke_resume_code(st.session_state.pop('_resume_code', None))
+    st.session_state.pop('_resume_issued_at', None)
+    st.query_params.pop('resume', None)
+
+
+def start(token):
+    st.session_state.session_token = token
+    if _scale_out():
+        st.session_state.pop('_resume_issued_at', None)
+        _refresh_resume_code(token)
+
+
+def end():
+    auth.logout(st.session_state.get('session_token'))
+    st.session_state.session_token = None
+    st.session_state.pop('_saved_state', None)
+    _drop_resume_code()
+
+
+def save(keys):
+    """ Save `keys` for the signed-in session; called at the end of each run, writes only on change. """
+    token = st.session_state.get('session_token')
+    if token is None or not _scale_out():
+        return
+    values = {key: _encode(st.session_state[key]) for key in keys if key in st.session_state}
+    snapshot = json.dumps(values, sort_keys=True)
+    if snapshot != st.session_state.get('_saved_state'):
+        auth.save_state(token, values)
+        st.session_state._saved_state = snapshot
@@ -0,0 +1,167 @@
+import argparse
+import re
+
+from database import DatabaseManager
+
+
+def normalize_skills(text):
+    """ Split a comma-separated skills string into unique, lowercased tag names (order preserved). """
+    tags = []
+    for skill in (text or "").split(","):
+        tag = " ".join(skill.split()).lower()[:100]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def ensure_tags(cursor, names):
+    """ Return {name: tag_id}, creating any tags that do not exist yet. """
+    if not names:
+        return {}
+    placeholders = ", ".join(["(%s)"] * len(names))
+    cursor.execute(f"INSERT IGNORE INTO skill_tags (name) VALUES {placeholders}", tuple(names))
+    placeholders = ", ".join(["%s"] * len(names))
+    cursor.execute(f"SELECT id, name FROM skill_tags WHERE name IN ({placeholders})", tuple(names))
+    return {name: tag_id for tag_id, name in cursor.fetchall()}
+
+
+def _index(cursor, table, owner_column, rows):
+    """ Replace the tag rows of every (owner_id, skills_text) in rows with one DELETE and one multi-row INSERT. """
+    if not rows:
+        return
+    parsed = [(owner_id, normalize_skills(skills_text)) for owner_id, skills_text in rows]
+    tags = ensure_tags(cursor, sorted({name for _, names in parsed for name in names}))
+
+    placeholders = ", ".join(["%s"] * len(parsed))
+    cursor.execute(f"DELETE FROM {table} WHERE {owner_column} IN ({placeholders})",
+                   tuple(owner_id for owner_id, _ in parsed))
+    pairs = [(owner_id, tags[name]) for owner_id, names in parsed for name in names if name in tags]
+    if pairs:
+        cursor.executemany(f"INSERT INTO {table} ({owner_column}, tag_id) VALUES (%s, %s)", pairs)
+
+
+def index_job_skills(cursor, job_id, skills_text):
+    """ Rebuild job_skills for one job; runs inside the caller's transaction. """
+    _index(cursor, "job_skills", "job_id", [(job_id, skills_text)])
+
+
+def index_freelancer_skills(cursor, freelancer_id, skills_text):
+    """ Rebuild freelancer_skills for one freelancer; runs inside the caller's transaction. """
+    _index(cursor, "freelancer_skills", "freelancer_id", [(freelancer_id, skills_text)])
+
+
+def index_job_skills_bulk(cursor, rows):
+    """ Rebuild job_skills for many (job_id, skills_text) rows at once. """
+    _index(cursor, "job_skills", "job_id", rows)
+
+
+def index_freelancer_skills_bulk(cursor, rows):
+    """ Rebuild freelancer_skills for many (freelancer_id, skills_text) rows at once. """
+    _index(cursor, "freelancer_skills", "freelancer_id", rows)
+
+
+def fulltext_query(text):
+    # Boolean mode with every word required and prefix-matched ("pyth" finds "python").
+    # Words under InnoDB's default innodb_ft_min_token_size (3) are never indexed, so drop them.
+    words = [word for word in re.findall(r"\w+", text or "") if len(word) >= 3]
+    return " ".join(f"+{word}*" for word in words)
+
+
+def search_jobs(text, limit=20):
+    """ Open jobs whose title/description match text, best matches first (served by ft_jobs_title_description). """
+    query = fulltext_query(text)
+    if not query:
+        return []
+
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("""
+            SELECT id, title, budget, deadline, category, required_skills,
+                   LEFT(description, 300) AS summary, CHAR_LENGTH(description) > 300 AS truncated,
+                   MATCH(title, description) AGAINST (%s IN BOOLEAN MODE) AS relevance
+            FROM jobs
+            WHERE MATCH(title, description) AGAINST (%s IN BOOLEAN MODE)
+            AND status = 'Open'
+            ORDER BY relevance DESC
+            LIMIT %s
+        """, (query, query, limit))
+        jobs = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return jobs
+
+
+def search_freelancers(skills_text, limit=20, available_only=True):
+    """ Freelancers ranked by how many of the given skills they have, then by rating. """
+    tags = normalize_skills(skills_text)
+    if not tags:
+        return []
+
+    placeholders = ", ".join(["%s"] * len(tags))
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f"""
+            SELECT F.freelancer_id, F.name, F.skills, F.rating, F.is_available, M.matched_skills
+            FROM (
+                SELECT FS.freelancer_id, COUNT(*) AS matched_skills
+                FROM skill_tags T
+                JOIN freelancer_skills FS ON FS.tag_id = T.id
+                WHERE T.name IN ({placeholders})
+                GROUP BY FS.freelancer_id
+            ) M
+            JOIN freelancer F ON F.freelancer_id = M.freelancer_id
+            {"WHERE F.is_available = 1" if available_only else ""}
+            ORDER BY M.matched_skills DESC, F.rating DESC
+            LIMIT %s
+        """, (*tags, limit))
+        freelancers = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
+    return freelancers
+
+
+def backfill(batch_size=1000):
+    """ Index skills for existing freelancer and jobs rows, one short transaction per id batch. """
+    sources = [
+        ("freelancer", "freelancer_id", "skills", index_freelancer_skills_bulk),
+        ("jobs", "id", "required_skills", index_job_skills_bulk),
+    ]
+    totals = {}
+    connection = DatabaseManager.get_connection()
+    try:
+        cursor = connection.cursor()
+        for table, id_column, skills_column, index_rows in sources:
+            last_id, indexed = 0, 0
+            while True:
+                cursor.execute(
+                    f"SELECT {id_column}, {skills_column} FROM {table} WHERE {id_column} > %s "
+                    f"ORDER BY {id_column} LIMIT %s",
+                    (last_id, batch_size)
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                index_rows(cursor, rows)
+                connection.commit()
+                last_id = rows[-1][0]
+                indexed += len(rows)
+                print(f"{table}: indexed {indexed} rows (last id {last_id})")
+            totals[table] = indexed
+        cursor.close()
+    finally:
+        connection.close()
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the normalized skill tag index.")
+    parser.add_argument("command", choices=["backfill"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.command == "backfill":
+        print(backfill(args.batch_size))
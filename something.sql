@@ -5,6 +5,8 @@ CREATE TABLE client (
     phone VARCHAR(15),
     company_name VARCHAR(255),
     posted_jobs INT DEFAULT 0,
+    -- Salted scrypt hash (auth.py); NULL until the account first signs in with its phone number
+    password_hash VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (client_id)
 );
@@ -16,9 +18,13 @@ CREATE TABLE freelancer (
     phone VARCHAR(15),
     skills TEXT,
     rating DECIMAL(3,2),
+    rating_total INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
     is_available TINYINT(1) DEFAULT 1,
+    password_hash VARCHAR(255),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (freelancer_id)
+    PRIMARY KEY (freelancer_id),
+    INDEX idx_freelancer_rating (rating)
 );
 
 CREATE TABLE jobs (
@@ -32,6 +38,11 @@ CREATE TABLE jobs (
     required_skills TEXT,
     client_id INT NOT NULL,
     PRIMARY KEY (id),
+    INDEX idx_jobs_status_deadline (status, deadline, id),
+    INDEX idx_jobs_status_category_deadline (status, category, deadline, id),
+    INDEX idx_jobs_status_budget (status, budget),
+    INDEX idx_jobs_client_status (client_id, status),
+    FULLTEXT INDEX ft_jobs_title_description (title, description),
     FOREIGN KEY (client_id) REFERENCES client(client_id) ON DELETE CASCADE
 );
 
@@ -43,7 +54,11 @@ CREATE TABLE proposals (
     estimated_time INT,
     freelancer_id INT NOT NULL,
     status ENUM('Pending', 'Accepted', 'Rejected') DEFAULT 'Pending',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     PRIMARY KEY (id),
+    INDEX idx_proposals_job_status (job_id, status),
+    -- Finds proposals decided long ago for the archiver (archive.py)
+    INDEX idx_proposals_status_updated (status, updated_at),
     FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
     FOREIGN KEY (freelancer_id) REFERENCES freelancer(freelancer_id) ON DELETE CASCADE
 );
@@ -54,7 +69,13 @@ CREATE TABLE contracts (
     freelancer_id INT NOT NULL,
     payment DECIMAL(10,2),
     status ENUM('In Progress', 'Completed') DEFAULT 'In Progress',
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     PRIMARY KEY (id),
+    INDEX idx_contracts_status_payment (status, payment),
+    INDEX idx_contracts_status_updated (status, updated_at),
+    INDEX idx_contracts_job_status (job_id, status),
+    -- A job has at most one contract; backs up the job row lock taken by accept_proposal
+    UNIQUE KEY uq_contracts_job (job_id),
     FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
     FOREIGN KEY (freelancer_id) REFERENCES freelancer(freelancer_id) ON DELETE SET NULL
 );
@@ -69,6 +90,187 @@ CREATE TABLE ratings (
     FOREIGN KEY (contract_id) REFERENCES contracts(id) ON DELETE CASCADE
 );
 
+-- Normalized skill tags. freelancer.skills and jobs.required_skills keep the text the user typed;
+-- these tables index the same skills (lowercased, trimmed) for exact tag lookups.
+CREATE TABLE skill_tags (
+    id INT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE freelancer_skills (
+    freelancer_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    PRIMARY KEY (freelancer_id, tag_id),
+    INDEX idx_freelancer_skills_tag (tag_id, freelancer_id),
+    FOREIGN KEY (freelancer_id) REFERENCES freelancer(freelancer_id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES skill_tags(id) ON DELETE CASCADE
+);
+
+CREATE TABLE job_skills (
+    job_id INT NOT NULL,
+    tag_id INT NOT NULL,
+    PRIMARY KEY (job_id, tag_id),
+    INDEX idx_job_skills_tag (tag_id, job_id),
+    FOREIGN KEY (job_id) REFERENCES jobs(id) ON DELETE CASCADE,
+    FOREIGN KEY (tag_id) REFERENCES skill_tags(id) ON DELETE CASCADE
+);
+
+-- Transactional outbox: write paths insert notifications in their own transaction and a
+-- background dispatcher (notifications.py) delivers them. Rows double as each user's inbox.
+CREATE TABLE notification_outbox (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    recipient_type ENUM('freelancer', 'client') NOT NULL,
+    recipient_id INT NOT NULL,
+    title VARCHAR(255) NOT NULL,
+    message TEXT,
+    status ENUM('Pending', 'Sending', 'Sent', 'Failed') NOT NULL DEFAULT 'Pending',
+    attempts INT NOT NULL DEFAULT 0,
+    -- When a Pending row is due; for a Sending row, when its dispatcher's lease runs out
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_error VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    sent_at TIMESTAMP NULL,
+    PRIMARY KEY (id),
+    INDEX idx_outbox_status_next (status, next_attempt_at, id),
+    INDEX idx_outbox_recipient (recipient_type, recipient_id, id)
+);
+
+-- Summary of the admin dashboard headline metrics, kept current by the triggers below so
+-- Platform Insights does not scan the base tables. The counts are spread over 16 slot rows
+-- (ids 0-15) that writers update by connection id; readers add them up.
+CREATE TABLE platform_stats (
+    id TINYINT NOT NULL,
+    total_clients INT NOT NULL DEFAULT 0,
+    total_freelancers INT NOT NULL DEFAULT 0,
+    total_jobs INT NOT NULL DEFAULT 0,
+    open_jobs INT NOT NULL DEFAULT 0,
+    completed_contracts INT NOT NULL DEFAULT 0,
+    total_payment DECIMAL(14,2) NOT NULL DEFAULT 0,
+    rated_freelancers INT NOT NULL DEFAULT 0,
+    rating_sum DECIMAL(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (id)
+);
+
+INSERT INTO platform_stats (id) VALUES (0), (1), (2), (3), (4), (5), (6), (7), (8), (9), (10), (11), (12), (13), (14), (15);
+
+-- Append-only activity log written by the triggers in "function and procedure". The rollup
+-- processor (activity_rollups.py) folds rows past its watermark into activity_rollups;
+-- `activity_rollups.py --prune` deletes rolled-up rows once they are old enough.
+CREATE TABLE activity_events (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    event ENUM('job_posted', 'proposal_submitted', 'proposal_accepted', 'contract_completed', 'rating_added') NOT NULL,
+    category VARCHAR(100),
+    amount DECIMAL(10,2),
+    occurred_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id)
+);
+
+-- Hourly and daily activity per job category; the admin charts read a time window of these
+-- by primary key instead of scanning the base tables.
+CREATE TABLE activity_rollups (
+    bucket ENUM('hour', 'day') NOT NULL,
+    bucket_start DATETIME NOT NULL,
+    category VARCHAR(100) NOT NULL DEFAULT '',
+    jobs_posted INT NOT NULL DEFAULT 0,
+    proposals INT NOT NULL DEFAULT 0,
+    acceptances INT NOT NULL DEFAULT 0,
+    completed_contracts INT NOT NULL DEFAULT 0,
+    revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+    rating_sum INT NOT NULL DEFAULT 0,
+    rating_count INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, bucket_start, category)
+);
+
+-- Last activity_events id folded into the rollups, one row per processor
+CREATE TABLE rollup_watermarks (
+    name VARCHAR(50) NOT NULL,
+    last_event_id BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NULL,
+    PRIMARY KEY (name)
+);
+
+INSERT INTO rollup_watermarks (name) VALUES ('activity');
+
+-- Change feed for the dashboards' live panels (live_updates.py), written by the triggers in
+-- "function and procedure". recipient_id NULL addresses every user of recipient_type.
+CREATE TABLE change_events (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    recipient_type ENUM('client', 'freelancer') NOT NULL,
+    recipient_id INT,
+    kind ENUM('job_posted', 'job_closed', 'proposal_submitted', 'proposal_accepted', 'proposal_rejected',
+              'contract_completed', 'rating_added') NOT NULL,
+    entity_id INT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    INDEX idx_change_events_recipient (recipient_type, recipient_id, id)
+);
+
+-- Closed history moved out of the hot tables by archive.py: proposals rejected, and contracts
+-- completed (with their accepted proposal and ratings), more than ARCHIVE_AFTER_DAYS ago. Rows
+-- keep their ids and are range-partitioned by the year they were closed, which archive.py
+-- extends ahead of time. Partitioned tables cannot have foreign keys; rows are only ever
+-- inserted here together with the delete from the hot table.
+CREATE TABLE proposals_archive (
+    id INT NOT NULL,
+    job_id INT NOT NULL,
+    cover_letter TEXT,
+    proposed_rate DECIMAL(10,2),
+    estimated_time INT,
+    freelancer_id INT NOT NULL,
+    status ENUM('Pending', 'Accepted', 'Rejected'),
+    updated_at TIMESTAMP NOT NULL,
+    closed_on DATE NOT NULL,
+    PRIMARY KEY (id, closed_on),
+    INDEX idx_proposals_archive_job_status (job_id, status),
+    INDEX idx_proposals_archive_freelancer (freelancer_id)
+)
+PARTITION BY RANGE COLUMNS (closed_on) (
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE contracts_archive (
+    id INT NOT NULL,
+    job_id INT NOT NULL,
+    freelancer_id INT,
+    payment DECIMAL(10,2),
+    status ENUM('In Progress', 'Completed'),
+    updated_at TIMESTAMP NOT NULL,
+    closed_on DATE NOT NULL,
+    PRIMARY KEY (id, closed_on),
+    INDEX idx_contracts_archive_job_status (job_id, status),
+    INDEX idx_contracts_archive_freelancer (freelancer_id)
+)
+PARTITION BY RANGE COLUMNS (closed_on) (
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
+CREATE TABLE ratings_archive (
+    rating_id INT NOT NULL,
+    contract_id INT NOT NULL,
+    rating_score INT,
+    review_text TEXT,
+    rating_date TIMESTAMP NULL,
+    closed_on DATE NOT NULL,
+    PRIMARY KEY (rating_id, closed_on),
+    INDEX idx_ratings_archive_contract (contract_id)
+)
+PARTITION BY RANGE COLUMNS (closed_on) (
+    PARTITION p2024 VALUES LESS THAN ('2025-01-01'),
+    PARTITION p2025 VALUES LESS THAN ('2026-01-01'),
+    PARTITION p2026 VALUES LESS THAN ('2027-01-01'),
+    PARTITION p2027 VALUES LESS THAN ('2028-01-01'),
+    PARTITION pmax VALUES LESS THAN (MAXVALUE)
+);
+
 
 
 DELIMITER //
@@ -81,47 +283,65 @@ BEGIN
     DECLARE v_job_id INT;
     DECLARE v_freelancer_id INT;
     DECLARE v_proposed_rate DECIMAL(10,2);
+    DECLARE v_proposal_status VARCHAR(10);
     DECLARE v_job_status VARCHAR(10);
-    
+
+    -- Re-raise after rolling back so callers get the real error (and can retry deadlocks)
     DECLARE EXIT HANDLER FOR SQLEXCEPTION
     BEGIN
         ROLLBACK;
-        SET status_message = 'Error occurred. Operation rolled back.';
+        RESIGNAL;
     END;
-    
+
     START TRANSACTION;
-    
-    SELECT job_id, freelancer_id, proposed_rate 
-    INTO v_job_id, v_freelancer_id, v_proposed_rate
-    FROM proposals 
+
+    SELECT job_id INTO v_job_id
+    FROM proposals
     WHERE id = proposal_id_param;
-    
-    SELECT status INTO v_job_status 
-    FROM jobs 
-    WHERE id = v_job_id;
-    
-    IF v_job_status = 'Closed' THEN
-        SET status_message = 'Job is already closed';
+
+    IF v_job_id IS NULL THEN
+        SET status_message = 'Proposal not found';
         ROLLBACK;
     ELSE
-        UPDATE proposals 
-        SET status = 'Accepted' 
-        WHERE id = proposal_id_param;
-        
-        UPDATE proposals 
-        SET status = 'Rejected' 
-        WHERE job_id = v_job_id 
-        AND id != proposal_id_param;
-        
-        INSERT INTO contracts (job_id, freelancer_id, payment, status)
-        VALUES (v_job_id, v_freelancer_id, v_proposed_rate, 'In Progress');
-        
-        UPDATE jobs 
-        SET status = 'Closed' 
-        WHERE id = v_job_id;
-        
-        COMMIT;
-        SET status_message = 'Proposal accepted and contract created successfully';
+        -- Lock the job row before checking it: concurrent accepts for the same job queue up
+        -- here, and each one after the first sees the job already closed.
+        SELECT status INTO v_job_status
+        FROM jobs
+        WHERE id = v_job_id
+        FOR UPDATE;
+
+        SELECT freelancer_id, proposed_rate, status
+        INTO v_freelancer_id, v_proposed_rate, v_proposal_status
+        FROM proposals
+        WHERE id = proposal_id_param
+        FOR UPDATE;
+
+        IF v_job_status = 'Closed' THEN
+            SET status_message = 'Job is already closed';
+            ROLLBACK;
+        ELSEIF v_proposal_status <> 'Pending' THEN
+            SET status_message = CONCAT('Proposal is already ', LOWER(v_proposal_status));
+            ROLLBACK;
+        ELSE
+            UPDATE proposals
+            SET status = 'Accepted'
+            WHERE id = proposal_id_param;
+
+            UPDATE proposals
+            SET status = 'Rejected'
+            WHERE job_id = v_job_id
+            AND id != proposal_id_param;
+
+            INSERT INTO contracts (job_id, freelancer_id, payment, status)
+            VALUES (v_job_id, v_freelancer_id, v_proposed_rate, 'In Progress');
+
+            UPDATE jobs
+            SET status = 'Closed'
+            WHERE id = v_job_id;
+
+            COMMIT;
+            SET status_message = 'Proposal accepted and contract created successfully';
+        END IF;
     END IF;
 END //
 
@@ -131,13 +351,12 @@ READS SQL DATA
 BEGIN
     DECLARE avg_rating DECIMAL(3,2);
     
-    SELECT COALESCE(AVG(r.rating_score), 0.00) INTO avg_rating
-    FROM ratings r
-    JOIN contracts c ON r.contract_id = c.id
-    WHERE c.freelancer_id = freelancer_id_param
-    AND c.status = 'Completed';
+    -- O(1) primary-key read of the running totals kept by AfterInsertRating/AfterDeleteRating
+    SELECT COALESCE(rating_total / NULLIF(rating_count, 0), 0.00) INTO avg_rating
+    FROM freelancer
+    WHERE freelancer_id = freelancer_id_param;
     
-    RETURN avg_rating;
+    RETURN COALESCE(avg_rating, 0.00);
 END //
 
 DELIMITER ;
@@ -164,3 +383,617 @@ END //
 DELIMITER ;
 
 
+-- Incremental maintenance of platform_stats. The counts are spread over 16 slot rows, picked
+-- by connection id, and summed on read: concurrent writers update different rows instead of
+-- all queueing for one row lock until they commit, and every trigger of one transaction hits
+-- the same slot, so two transactions never lock slots in opposite orders. Cascading
+-- foreign-key deletes do not fire triggers, so refresh_platform_stats() recomputes the totals
+-- from the base tables when needed.
+-- archive.py sets @archiving_history while it moves rows to the archive tables: they still
+-- count, so the delete triggers leave the totals alone.
+
+DELIMITER //
+
+CREATE TRIGGER AfterInsertClient
+AFTER INSERT ON client
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats SET total_clients = total_clients + 1 WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterDeleteClient
+AFTER DELETE ON client
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats SET total_clients = total_clients - 1 WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterInsertFreelancer
+AFTER INSERT ON freelancer
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats
+    SET total_freelancers = total_freelancers + 1,
+        rated_freelancers = rated_freelancers + (NEW.rating IS NOT NULL),
+        rating_sum = rating_sum + COALESCE(NEW.rating, 0)
+    WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterUpdateFreelancer
+AFTER UPDATE ON freelancer
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.rating <=> NEW.rating) THEN
+        UPDATE platform_stats
+        SET rated_freelancers = rated_freelancers + (NEW.rating IS NOT NULL) - (OLD.rating IS NOT NULL),
+            rating_sum = rating_sum + COALESCE(NEW.rating, 0) - COALESCE(OLD.rating, 0)
+        WHERE id = CONNECTION_ID() MOD 16;
+    END IF;
+END //
+
+CREATE TRIGGER AfterDeleteFreelancer
+AFTER DELETE ON freelancer
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats
+    SET total_freelancers = total_freelancers - 1,
+        rated_freelancers = rated_freelancers - (OLD.rating IS NOT NULL),
+        rating_sum = rating_sum - COALESCE(OLD.rating, 0)
+    WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterInsertJob
+AFTER INSERT ON jobs
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats
+    SET total_jobs = total_jobs + 1,
+        open_jobs = open_jobs + (NEW.status = 'Open')
+    WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterUpdateJob
+AFTER UPDATE ON jobs
+FOR EACH ROW
+BEGIN
+    IF NOT (OLD.status <=> NEW.status) THEN
+        UPDATE platform_stats
+        SET open_jobs = open_jobs + (NEW.status = 'Open') - (OLD.status = 'Open')
+        WHERE id = CONNECTION_ID() MOD 16;
+    END IF;
+END //
+
+CREATE TRIGGER AfterDeleteJob
+AFTER DELETE ON jobs
+FOR EACH ROW
+BEGIN
+    UPDATE platform_stats
+    SET total_jobs = total_jobs - 1,
+        open_jobs = open_jobs - (OLD.status = 'Open')
+    WHERE id = CONNECTION_ID() MOD 16;
+END //
+
+CREATE TRIGGER AfterInsertContract
+AFTER INSERT ON contracts
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Completed' THEN
+        UPDATE platform_stats
+        SET completed_contracts = completed_contracts + 1,
+            total_payment = total_payment + COALESCE(NEW.payment, 0)
+        WHERE id = CONNECTION_ID() MOD 16;
+    END IF;
+END //
+
+CREATE TRIGGER AfterUpdateContract
+AFTER UPDATE ON contracts
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'Completed' OR NEW.status = 'Completed' THEN
+        UPDATE platform_stats
+        SET completed_contracts = completed_contracts + (NEW.status = 'Completed') - (OLD.status = 'Completed'),
+            total_payment = total_payment
+                + IF(NEW.status = 'Completed', COALESCE(NEW.payment, 0), 0)
+                - IF(OLD.status = 'Completed', COALESCE(OLD.payment, 0), 0)
+        WHERE id = CONNECTION_ID() MOD 16;
+    END IF;
+END //
+
+CREATE TRIGGER AfterDeleteContract
+AFTER DELETE ON contracts
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'Completed' AND @archiving_history IS NULL THEN
+        UPDATE platform_stats
+        SET completed_contracts = completed_contracts - 1,
+            total_payment = total_payment - COALESCE(OLD.payment, 0)
+        WHERE id = CONNECTION_ID() MOD 16;
+    END IF;
+END //
+
+CREATE PROCEDURE refresh_platform_stats()
+BEGIN
+    -- The totals go to slot 0 and the other slots start again from zero
+    UPDATE platform_stats
+    SET total_clients = 0, total_freelancers = 0, total_jobs = 0, open_jobs = 0,
+        completed_contracts = 0, total_payment = 0, rated_freelancers = 0, rating_sum = 0
+    WHERE id > 0;
+
+    INSERT INTO platform_stats (
+        id, total_clients, total_freelancers, total_jobs, open_jobs,
+        completed_contracts, total_payment, rated_freelancers, rating_sum
+    )
+    SELECT
+        0,
+        (SELECT COUNT(*) FROM client),
+        (SELECT COUNT(*) FROM freelancer),
+        (SELECT COUNT(*) FROM jobs),
+        (SELECT COUNT(*) FROM jobs WHERE status = 'Open'),
+        (SELECT COUNT(*) FROM contracts WHERE status = 'Completed')
+            + (SELECT COUNT(*) FROM contracts_archive WHERE status = 'Completed'),
+        (SELECT COALESCE(SUM(payment), 0) FROM contracts WHERE status = 'Completed')
+            + (SELECT COALESCE(SUM(payment), 0) FROM contracts_archive WHERE status = 'Completed'),
+        (SELECT COUNT(rating) FROM freelancer),
+        (SELECT COALESCE(SUM(rating), 0) FROM freelancer)
+    ON DUPLICATE KEY UPDATE
+        total_clients = VALUES(total_clients),
+        total_freelancers = VALUES(total_freelancers),
+        total_jobs = VALUES(total_jobs),
+        open_jobs = VALUES(open_jobs),
+        completed_contracts = VALUES(completed_contracts),
+        total_payment = VALUES(total_payment),
+        rated_freelancers = VALUES(rated_freelancers),
+        rating_sum = VALUES(rating_sum);
+END //
+
+DELIMITER ;
+
+
+-- Materialized freelancer ratings: freelancer.rating_total/rating_count are updated in the
+-- same transaction as every rating insert/delete, and freelancer.rating holds their average.
+-- reconcile_freelancer_ratings() recomputes them from the ratings table for an id range.
+-- Archived ratings keep counting: the delete trigger skips rows archive.py moves, and the
+-- reconciliation includes ratings_archive.
+
+DELIMITER //
+
+CREATE PROCEDURE AddRating(
+    IN contract_id_param INT,
+    IN rating_score_param INT,
+    IN review_text_param TEXT
+)
+BEGIN
+    -- BeforeInsertRating rejects incomplete contracts; AfterInsertRating updates the freelancer.
+    INSERT INTO ratings (contract_id, rating_score, review_text)
+    VALUES (contract_id_param, rating_score_param, review_text_param);
+END //
+
+CREATE TRIGGER AfterInsertRating
+AFTER INSERT ON ratings
+FOR EACH ROW
+BEGIN
+    DECLARE rated_freelancer_id INT;
+
+    IF NEW.rating_score IS NOT NULL THEN
+        SELECT freelancer_id INTO rated_freelancer_id FROM contracts WHERE id = NEW.contract_id;
+        -- A single-table UPDATE assigns left to right (a multi-table one may not), and rating
+        -- is computed from the totals before this rating is added, so the order never matters
+        UPDATE freelancer
+        SET rating = ROUND((rating_total + NEW.rating_score) / (rating_count + 1), 2),
+            rating_total = rating_total + NEW.rating_score,
+            rating_count = rating_count + 1
+        WHERE freelancer_id = rated_freelancer_id;
+    END IF;
+END //
+
+CREATE TRIGGER AfterDeleteRating
+AFTER DELETE ON ratings
+FOR EACH ROW
+BEGIN
+    DECLARE rated_freelancer_id INT;
+
+    IF OLD.rating_score IS NOT NULL AND @archiving_history IS NULL THEN
+        SELECT freelancer_id INTO rated_freelancer_id FROM contracts WHERE id = OLD.contract_id;
+        -- As in AfterInsertRating. The last rating removed leaves the freelancer unrated (NULL):
+        -- the registration rating was replaced by the first rating and is not restored.
+        UPDATE freelancer
+        SET rating = ROUND((rating_total - OLD.rating_score) / NULLIF(rating_count - 1, 0), 2),
+            rating_total = rating_total - OLD.rating_score,
+            rating_count = rating_count - 1
+        WHERE freelancer_id = rated_freelancer_id;
+    END IF;
+END //
+
+CREATE PROCEDURE reconcile_freelancer_ratings(
+    IN from_id_param INT,
+    IN to_id_param INT,
+    OUT drifted_count INT
+)
+BEGIN
+    START TRANSACTION;
+
+    UPDATE freelancer F
+    LEFT JOIN (
+        SELECT freelancer_id, SUM(total) AS total, SUM(cnt) AS cnt
+        FROM (
+            SELECT C.freelancer_id, SUM(R.rating_score) AS total, COUNT(R.rating_score) AS cnt
+            FROM ratings R
+            JOIN contracts C ON R.contract_id = C.id
+            WHERE C.freelancer_id BETWEEN from_id_param AND to_id_param
+            AND C.status = 'Completed'
+            GROUP BY C.freelancer_id
+            UNION ALL
+            SELECT C.freelancer_id, SUM(R.rating_score), COUNT(R.rating_score)
+            FROM ratings_archive R
+            JOIN contracts_archive C ON R.contract_id = C.id
+            WHERE C.freelancer_id BETWEEN from_id_param AND to_id_param
+            AND C.status = 'Completed'
+            GROUP BY C.freelancer_id
+        ) H
+        GROUP BY freelancer_id
+    ) A ON A.freelancer_id = F.freelancer_id
+    -- Every assignment reads A only, so their order does not matter. Only drifted rows change:
+    -- a freelancer never rated keeps the rating given at registration, and one whose ratings
+    -- are all gone ends up unrated (NULL), as AfterDeleteRating leaves them.
+    SET F.rating_total = COALESCE(A.total, 0),
+        F.rating_count = COALESCE(A.cnt, 0),
+        F.rating = IF(COALESCE(A.cnt, 0) > 0, ROUND(A.total / A.cnt, 2), NULL)
+    WHERE F.freelancer_id BETWEEN from_id_param AND to_id_param
+    AND (F.rating_total <> COALESCE(A.total, 0) OR F.rating_count <> COALESCE(A.cnt, 0)
+         OR (COALESCE(A.cnt, 0) > 0 AND NOT (F.rating <=> ROUND(A.total / A.cnt, 2))));
+
+    SET drifted_count = ROW_COUNT();
+    COMMIT;
+END //
+
+DELIMITER ;
+
+
+-- Batch proposal review: accepts and rejects many of one client's proposals in a single
+-- transaction. Ids are passed as JSON arrays, e.g. '[12, 15, 40]'.
+DELIMITER //
+
+CREATE PROCEDURE review_proposals(
+    IN client_id_param INT,
+    IN accept_ids_param JSON,
+    IN reject_ids_param JSON,
+    OUT accepted_count INT,
+    OUT rejected_count INT,
+    OUT skipped_count INT
+)
+BEGIN
+    DECLARE requested_accepts INT;
+
+    -- Opening the cursor runs the locking read without returning a result set to the caller
+    DECLARE batch_job_locks CURSOR FOR
+        SELECT id FROM jobs
+        WHERE id IN (SELECT job_id FROM batch_jobs) AND client_id = client_id_param
+        ORDER BY id
+        FOR UPDATE;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        DROP TEMPORARY TABLE IF EXISTS batch_jobs;
+        DROP TEMPORARY TABLE IF EXISTS batch_accepts;
+        RESIGNAL;
+    END;
+
+    SET requested_accepts = COALESCE(JSON_LENGTH(accept_ids_param), 0);
+
+    START TRANSACTION;
+
+    -- Lock the jobs touched by this batch, in id order, before reading any proposal state,
+    -- so concurrent batches and single accepts on the same jobs queue up behind each other.
+    DROP TEMPORARY TABLE IF EXISTS batch_jobs;
+    CREATE TEMPORARY TABLE batch_jobs (
+        job_id INT NOT NULL PRIMARY KEY
+    );
+    INSERT IGNORE INTO batch_jobs (job_id)
+    SELECT P.job_id
+    FROM proposals P
+    JOIN JSON_TABLE(accept_ids_param, '$[*]' COLUMNS (id INT PATH '$')) A ON A.id = P.id;
+
+    OPEN batch_job_locks;
+    CLOSE batch_job_locks;
+
+    -- One winner per job (the lowest proposal id if several were picked), read after the
+    -- locks so jobs closed by a concurrent accept are skipped.
+    DROP TEMPORARY TABLE IF EXISTS batch_accepts;
+    CREATE TEMPORARY TABLE batch_accepts (
+        job_id INT NOT NULL PRIMARY KEY,
+        proposal_id INT NOT NULL
+    );
+    INSERT INTO batch_accepts (job_id, proposal_id)
+    SELECT P.job_id, MIN(P.id)
+    FROM proposals P
+    JOIN jobs J ON J.id = P.job_id
+    JOIN JSON_TABLE(accept_ids_param, '$[*]' COLUMNS (id INT PATH '$')) A ON A.id = P.id
+    WHERE J.client_id = client_id_param AND J.status = 'Open' AND P.status = 'Pending'
+    GROUP BY P.job_id;
+    SET accepted_count = ROW_COUNT();
+
+    -- Same effect as accept_proposal: the winner is accepted, every other proposal on the job rejected
+    UPDATE proposals P
+    JOIN batch_accepts B ON B.job_id = P.job_id
+    SET P.status = IF(P.id = B.proposal_id, 'Accepted', 'Rejected');
+
+    INSERT INTO contracts (job_id, freelancer_id, payment, status)
+    SELECT P.job_id, P.freelancer_id, P.proposed_rate, 'In Progress'
+    FROM batch_accepts B
+    JOIN proposals P ON P.id = B.proposal_id;
+
+    UPDATE jobs J
+    JOIN batch_accepts B ON B.job_id = J.id
+    SET J.status = 'Closed';
+
+    UPDATE proposals P
+    JOIN jobs J ON J.id = P.job_id
+    JOIN JSON_TABLE(reject_ids_param, '$[*]' COLUMNS (id INT PATH '$')) R ON R.id = P.id
+    SET P.status = 'Rejected'
+    WHERE J.client_id = client_id_param AND P.status = 'Pending';
+    SET rejected_count = ROW_COUNT();
+
+    SET skipped_count = requested_accepts - accepted_count;
+    COMMIT;
+
+    -- Accepted proposals as a result set, for notifications and cache invalidation
+    SELECT job_id, proposal_id FROM batch_accepts ORDER BY job_id;
+    DROP TEMPORARY TABLE batch_accepts;
+    DROP TEMPORARY TABLE batch_jobs;
+END //
+
+DELIMITER ;
+
+
+-- Activity log for the admin time-series charts. Each trigger appends one row per event with
+-- the job category; rollup_activity() aggregates new rows past the watermark in batches.
+DELIMITER //
+
+CREATE TRIGGER ActivityAfterInsertJob
+AFTER INSERT ON jobs
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_events (event, category, amount)
+    VALUES ('job_posted', NEW.category, NEW.budget);
+END //
+
+CREATE TRIGGER ActivityAfterInsertProposal
+AFTER INSERT ON proposals
+FOR EACH ROW
+BEGIN
+    INSERT INTO activity_events (event, category, amount)
+    SELECT 'proposal_submitted', category, NEW.proposed_rate FROM jobs WHERE id = NEW.job_id;
+    IF NEW.status = 'Accepted' THEN
+        INSERT INTO activity_events (event, category, amount)
+        SELECT 'proposal_accepted', category, NEW.proposed_rate FROM jobs WHERE id = NEW.job_id;
+    END IF;
+END //
+
+CREATE TRIGGER ActivityAfterUpdateProposal
+AFTER UPDATE ON proposals
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Accepted' AND NOT (OLD.status <=> 'Accepted') THEN
+        INSERT INTO activity_events (event, category, amount)
+        SELECT 'proposal_accepted', category, NEW.proposed_rate FROM jobs WHERE id = NEW.job_id;
+    END IF;
+END //
+
+CREATE TRIGGER ActivityAfterInsertContract
+AFTER INSERT ON contracts
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Completed' THEN
+        INSERT INTO activity_events (event, category, amount)
+        SELECT 'contract_completed', category, NEW.payment FROM jobs WHERE id = NEW.job_id;
+    END IF;
+END //
+
+CREATE TRIGGER ActivityAfterUpdateContract
+AFTER UPDATE ON contracts
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Completed' AND NOT (OLD.status <=> 'Completed') THEN
+        INSERT INTO activity_events (event, category, amount)
+        SELECT 'contract_completed', category, NEW.payment FROM jobs WHERE id = NEW.job_id;
+    END IF;
+END //
+
+CREATE TRIGGER ActivityAfterInsertRating
+AFTER INSERT ON ratings
+FOR EACH ROW
+BEGIN
+    IF NEW.rating_score IS NOT NULL THEN
+        INSERT INTO activity_events (event, category, amount)
+        SELECT 'rating_added', J.category, NEW.rating_score
+        FROM contracts C JOIN jobs J ON J.id = C.job_id
+        WHERE C.id = NEW.contract_id;
+    END IF;
+END //
+
+-- Folds up to batch_size_param events past the 'activity' watermark into the hourly and daily
+-- buckets and advances the watermark in the same transaction, so every event is counted once.
+-- Events younger than settle_seconds_param are left for the next run: ids are allocated at
+-- insert time, and a transaction that commits late must not end up behind the watermark.
+CREATE PROCEDURE rollup_activity(
+    IN batch_size_param INT,
+    IN settle_seconds_param INT,
+    OUT processed_count INT
+)
+BEGIN
+    DECLARE v_from_id BIGINT;
+    DECLARE v_to_id BIGINT;
+
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+
+    -- The watermark row lock serializes processors running in several app processes
+    SELECT last_event_id INTO v_from_id
+    FROM rollup_watermarks
+    WHERE name = 'activity'
+    FOR UPDATE;
+
+    SELECT COUNT(*), MAX(id) INTO processed_count, v_to_id
+    FROM (
+        SELECT id
+        FROM activity_events
+        WHERE id > v_from_id
+        AND occurred_at <= NOW() - INTERVAL settle_seconds_param SECOND
+        ORDER BY id
+        LIMIT batch_size_param
+    ) batch;
+
+    IF processed_count > 0 THEN
+        INSERT INTO activity_rollups (
+            bucket, bucket_start, category, jobs_posted, proposals, acceptances,
+            completed_contracts, revenue, rating_sum, rating_count
+        )
+        SELECT
+            'hour',
+            DATE(occurred_at) + INTERVAL HOUR(occurred_at) HOUR,
+            COALESCE(category, ''),
+            SUM(event = 'job_posted'),
+            SUM(event = 'proposal_submitted'),
+            SUM(event = 'proposal_accepted'),
+            SUM(event = 'contract_completed'),
+            COALESCE(SUM(IF(event = 'contract_completed', amount, 0)), 0),
+            COALESCE(SUM(IF(event = 'rating_added', amount, 0)), 0),
+            SUM(event = 'rating_added')
+        FROM activity_events
+        WHERE id > v_from_id AND id <= v_to_id
+        GROUP BY 2, 3
+        ON DUPLICATE KEY UPDATE
+            jobs_posted = jobs_posted + VALUES(jobs_posted),
+            proposals = proposals + VALUES(proposals),
+            acceptances = acceptances + VALUES(acceptances),
+            completed_contracts = completed_contracts + VALUES(completed_contracts),
+            revenue = revenue + VALUES(revenue),
+            rating_sum = rating_sum + VALUES(rating_sum),
+            rating_count = rating_count + VALUES(rating_count);
+
+        INSERT INTO activity_rollups (
+            bucket, bucket_start, category, jobs_posted, proposals, acceptances,
+            completed_contracts, revenue, rating_sum, rating_count
+        )
+        SELECT
+            'day',
+            DATE(occurred_at),
+            COALESCE(category, ''),
+            SUM(event = 'job_posted'),
+            SUM(event = 'proposal_submitted'),
+            SUM(event = 'proposal_accepted'),
+            SUM(event = 'contract_completed'),
+            COALESCE(SUM(IF(event = 'contract_completed', amount, 0)), 0),
+            COALESCE(SUM(IF(event = 'rating_added', amount, 0)), 0),
+            SUM(event = 'rating_added')
+        FROM activity_events
+        WHERE id > v_from_id AND id <= v_to_id
+        GROUP BY 2, 3
+        ON DUPLICATE KEY UPDATE
+            jobs_posted = jobs_posted + VALUES(jobs_posted),
+            proposals = proposals + VALUES(proposals),
+            acceptances = acceptances + VALUES(acceptances),
+            completed_contracts = completed_contracts + VALUES(completed_contracts),
+            revenue = revenue + VALUES(revenue),
+            rating_sum = rating_sum + VALUES(rating_sum),
+            rating_count = rating_count + VALUES(rating_count);
+
+        UPDATE rollup_watermarks
+        SET last_event_id = v_to_id, updated_at = NOW()
+        WHERE name = 'activity';
+    END IF;
+
+    COMMIT;
+END //
+
+DELIMITER ;
+
+
+-- Change feed: one row per change a signed-in user may have on screen. The dashboards poll
+-- MAX(id) and read their own rows past a per-session cursor, instead of rerunning every query.
+DELIMITER //
+
+CREATE TRIGGER ChangeFeedAfterInsertJob
+AFTER INSERT ON jobs
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Open' THEN
+        INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+        VALUES ('freelancer', NULL, 'job_posted', NEW.id);
+    END IF;
+END //
+
+CREATE TRIGGER ChangeFeedAfterUpdateJob
+AFTER UPDATE ON jobs
+FOR EACH ROW
+BEGIN
+    IF OLD.status = 'Open' AND NOT (NEW.status <=> 'Open') THEN
+        INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+        VALUES ('freelancer', NULL, 'job_closed', NEW.id);
+    END IF;
+END //
+
+CREATE TRIGGER ChangeFeedAfterInsertProposal
+AFTER INSERT ON proposals
+FOR EACH ROW
+BEGIN
+    INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+    SELECT 'client', client_id, 'proposal_submitted', NEW.id FROM jobs WHERE id = NEW.job_id;
+END //
+
+CREATE TRIGGER ChangeFeedAfterUpdateProposal
+AFTER UPDATE ON proposals
+FOR EACH ROW
+BEGIN
+    IF NEW.status IN ('Accepted', 'Rejected') AND NOT (OLD.status <=> NEW.status) THEN
+        INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+        VALUES ('freelancer', NEW.freelancer_id,
+                IF(NEW.status = 'Accepted', 'proposal_accepted', 'proposal_rejected'), NEW.id);
+    END IF;
+END //
+
+CREATE TRIGGER ChangeFeedAfterUpdateContract
+AFTER UPDATE ON contracts
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Completed' AND NOT (OLD.status <=> 'Completed') THEN
+        INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+        SELECT 'client', client_id, 'contract_completed', NEW.id FROM jobs WHERE id = NEW.job_id;
+        INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+        VALUES ('freelancer', NEW.freelancer_id, 'contract_completed', NEW.id);
+    END IF;
+END //
+
+CREATE TRIGGER ChangeFeedAfterInsertRating
+AFTER INSERT ON ratings
+FOR EACH ROW
+BEGIN
+    INSERT INTO change_events (recipient_type, recipient_id, kind, entity_id)
+    SELECT 'freelancer', freelancer_id, 'rating_added', NEW.rating_id FROM contracts WHERE id = NEW.contract_id;
+END //
+
+DELIMITER ;
+
+
+-- Notifications that must commit with the change they announce. accept_proposal and
+-- review_proposals commit inside the procedure, so the outbox row is written here, in the
+-- same transaction, rather than by the caller afterwards.
+DELIMITER //
+
+CREATE TRIGGER OutboxAfterUpdateProposal
+AFTER UPDATE ON proposals
+FOR EACH ROW
+BEGIN
+    IF NEW.status = 'Accepted' AND NOT (OLD.status <=> 'Accepted') THEN
+        INSERT INTO notification_outbox (recipient_type, recipient_id, title, message)
+        VALUES ('freelancer', NEW.freelancer_id, 'Proposal Accepted', 'Your Proposal has been Accepted');
+    END IF;
+END //
+
+DELIMITER ;
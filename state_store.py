@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Key-value store for state that must be shared by every replica of a dashboard: login
+# sessions, login rate limits, per-user dashboard state and read cache invalidations.
+# STATE_STORE selects the backend:
+#
+#   memory                  this process only (default; a single replica per dashboard)
+#   sqlite:////data/state.db  a SQLite file, for replicas on one host sharing a volume
+#   redis://redis:6379/0    Redis or any server speaking its protocol
+#
+# Values are JSON documents; every key can carry a time to live in seconds.
+
+
+class MemoryStore:
+    shared = False
+
+    def __init__(self):
+        self._values = {}  # key -> (value, expires_at or None)
+        self._lock = threading.Lock()
+
+    def _live(self, key, now):
+        # Caller holds the lock
+        entry = self._values.get(key)
+        if entry is not None and entry[1] is not None and entry[1] < now:
+            del self._values[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key, time.time())
+            return None if entry is None else json.loads(entry[0])
+
+    def set(self, key, value, ttl=None):
+        now = time.time()
+        with self._lock:
+            self._values[key] = (json.dumps(value), now + ttl if ttl else None)
+            # Drop expired keys now and then instead of running a sweeper thread
+            if len(self._values) % 1000 == 0:
+                for expired in [k for k, (_, expires_at) in self._values.items() if expires_at and expires_at < now]:
+                    del self._values[expired]
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def incr(self, key, ttl=None):
+        """ Add one to an integer key and return the new value; ttl applies when the key is created. """
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            if entry is None:
+                self._values[key] = ("1", now + ttl if ttl else None)
+                return 1
+            value = json.loads(entry[0]) + 1
+            self._values[key] = (json.dumps(value), entry[1])
+            return value
+
+    def ttl(self, key):
+        """ Seconds until key expires; None when it has no expiry or does not exist. """
+        now = time.time()
+        with self._lock:
+            entry = self._live(key, now)
+            return None if entry is None or entry[1] is None else max(0.0, entry[1] - now)
+
+
+class SQLiteStore:
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)
+        """)
+        connection.commit()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # One connection per thread; WAL lets readers in other processes run during a write
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, time.time())
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl=None):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO state (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl if ttl else None)
+        )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key, ttl=None):
+        connection = self._connection()
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent increments serialize
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute("DELETE FROM state WHERE key = ? AND expires_at < ?", (key, now))
+            connection.execute(
+                "INSERT INTO state (key, value, expires_at) VALUES (?, '1', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1",
+                (key, now + ttl if ttl else None)
+            )
+            value = connection.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()[0]
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return int(value)
+
+    def ttl(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)", (key, now)
+        ).fetchone()
+        return None if row is None or row[0] is None else max(0.0, row[0] - now)
+
+    def purge_expired(self):
+        return self._connection().execute("DELETE FROM state WHERE expires_at < ?", (time.time(),)).rowcount
+
+
+class RedisStore:
+    shared = True
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._redis.get(key)
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self._redis.set(key, json.dumps(value), ex=max(1, int(ttl)) if ttl else None)
+
+    def delete(self, key):
+        self._redis.delete(key)
+
+    def incr(self, key, ttl=None):
+        value = self._redis.incr(key)
+        if value == 1 and ttl:
+            self._redis.expire(key, max(1, int(ttl)))
+        return value
+
+    def ttl(self, key):
+        seconds = self._redis.pttl(key)
+        # -1: no expiry, -2: no such key
+        return None if seconds < 0 else seconds / 1000
+
+
+def from_url(url):
+    if url == "memory":
+        return MemoryStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(url)
+    raise ValueError(f"Unsupported STATE_STORE {url!r}; expected memory, sqlite:///path or redis://host:port/db")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """ The process-wide store configured by STATE_STORE, created on first use. """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = from_url(os.environ.get("STATE_STORE", "memory"))
+    return _store
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root, next to the dashboards
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import state_store  # noqa: E402
+
+
+@pytest.fixture
+def store(monkeypatch):
+    """ A fresh in-process state store for each test. """
+    memory = state_store.MemoryStore()
+    monkeypatch.setattr(state_store, "_store", memory)
+    return memory
+
+
+class FakeCursor:
+    """ Just enough of a mysql-connector cursor for code that only writes or looks up nothing. """
+
+    def __init__(self, rows=(), rowcount=1):
+        self.rows = list(rows)
+        self.executed = []
+        self.rowcount = rowcount
+
+    def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+
+    def executemany(self, statement, seq_params):
+        seq_params = list(seq_params)
+        self.executed.append((statement, seq_params))
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, cursor=None):
+        self._cursor = cursor or FakeCursor()
+        self.commits = 0
+
+    def cursor(self, **kwargs):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """ Route DatabaseManager connections to one FakeConnection. """
+    from database import DatabaseManager
+
+    connection = FakeConnection()
+    monkeypatch.setattr(DatabaseManager, "get_connection", staticmethod(lambda: connection))
+    monkeypatch.setattr(DatabaseManager, "get_read_connection", staticmethod(lambda tags=(): connection))
+    return connection
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+import activity_rollups
+from conftest import FakeCursor
+
+
+def test_window_start_aligns_to_the_bucket():
+    now = datetime(2024, 5, 10, 13, 45, 12)
+    assert activity_rollups.window_start('hour', 3, now) == datetime(2024, 5, 10, 11)
+    assert activity_rollups.window_start('day', 7, now) == datetime(2024, 5, 4)
+
+
+def test_prune_only_deletes_events_at_or_below_the_watermark(fake_db):
+    fake_db._cursor = FakeCursor([(42,)], rowcount=5)
+
+    assert activity_rollups.prune(retention_days=7, batch_size=1000) == 5
+
+    statement, params = fake_db._cursor.executed[1]
+    assert "DELETE FROM activity_events" in statement
+    assert params == (42, 7, 1000)
@@ -0,0 +1,121 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import auth
+from conftest import FakeCursor
+
+
+@pytest.fixture(autouse=True)
+def signing_key(monkeypatch, store):
+    monkeypatch.setattr(auth, "_secret", b"test secret")
+    # Cheap hashes keep the tests fast; the parameters are part of each hash
+    monkeypatch.setenv("AUTH_SCRYPT_N", "1024")
+    monkeypatch.setattr(auth, "rate_limiter", auth.LoginRateLimiter(max_failures=3, window=60))
+
+
+def test_token_round_trip():
+    token = auth.issue_token("sid", "client", 7, time.time() + 60)
+    claims = auth.read_token(token)
+    assert (claims['sid'], claims['type'], claims['uid']) == ("sid", "client", 7)
+
+
+def test_tampered_token_is_rejected():
+    payload, signature = auth.issue_token("sid", "client", 7, time.time() + 60).split(".")
+    forged = auth._b64encode(b'{"sid":"sid","type":"client","uid":8,"exp":9999999999}')
+    assert auth.read_token(f"{forged}.{signature}") is None
+    assert auth.read_token(f"{payload}.{signature[:-2]}") is None
+    assert auth.read_token("garbage") is None
+    assert auth.read_token(None) is None
+
+
+def test_token_signed_with_another_key_is_rejected(monkeypatch):
+    token = auth.issue_token("sid", "client", 7, time.time() + 60)
+    monkeypatch.setattr(auth, "_secret", b"another replica's key")
+    assert auth.read_token(token) is None
+
+
+def test_expired_token_is_rejected():
+    assert auth.read_token(auth.issue_token("sid", "client", 7, time.time() - 1)) is None
+
+
+def test_password_hashes_verify_and_flag_old_parameters(monkeypatch):
+    stored = auth.hash_password("correct horse")
+    assert auth.verify_password("correct horse", stored)
+    assert not auth.verify_password("wrong", stored)
+    assert not auth.verify_password("correct horse", "not a hash")
+    assert not auth.needs_rehash(stored)
+    monkeypatch.setenv("AUTH_SCRYPT_N", "2048")
+    assert auth.needs_rehash(stored)
+
+
+def test_rate_limiter_allows_max_failures_then_reports_time_left():
+    limiter = auth.rate_limiter
+    for _ in range(3):
+        limiter.attempt(("client", "a@example.com"))
+    with pytest.raises(auth.RateLimitedError) as raised:
+        limiter.attempt(("client", "a@example.com"))
+    assert 0 < raised.value.retry_after <= 60
+    # Other accounts are not affected, and a success clears the count
+    limiter.attempt(("client", "b@example.com"))
+    limiter.success(("client", "a@example.com"))
+    limiter.attempt(("client", "a@example.com"))
+
+
+def test_concurrent_attempts_cannot_exceed_the_limit():
+    def attempt(_):
+        try:
+            auth.rate_limiter.attempt(("freelancer", "target@example.com"))
+            return True
+        except auth.RateLimitedError:
+            return False
+
+    with ThreadPoolExecutor(16) as executor:
+        assert sum(executor.map(attempt, range(100))) == 3
+
+
+def _user(password_hash):
+    return {'user_id': 7, 'name': "Ann", 'password_hash': password_hash}
+
+
+def test_login_opens_a_session_that_validates(fake_db):
+    fake_db._cursor = FakeCursor([_user(auth.hash_password("correct horse"))])
+    token, session = auth.login("client", " Ann@Example.com ", "correct horse")
+    assert session['user_id'] == 7
+    assert auth.validate(token, "client")['name'] == "Ann"
+    assert auth.validate(token, "freelancer") is None
+    auth.logout(token)
+    assert auth.validate(token, "client") is None
+
+
+@pytest.mark.parametrize("password_hash", [None, auth.new_reset_code()[1]])
+def test_accounts_without_a_password_cannot_sign_in(fake_db, password_hash):
+    # Neither a phone number nor anything else signs in to a NULL hash or a reset marker
+    fake_db._cursor = FakeCursor([{**_user(password_hash), 'phone': "5551234"}])
+    assert auth.login("client", "ann@example.com", "5551234") is None
+
+
+def test_reset_code_sets_the_password_once(fake_db):
+    code, marker = auth.new_reset_code()
+    fake_db._cursor = FakeCursor([(7, marker)])
+    assert not auth.reset_password("client", "ann@example.com", "wrong code", "new password")
+    assert auth.reset_password("client", "ann@example.com", code, "new password")
+    statement, params = fake_db._cursor.executed[-1]
+    assert statement.startswith("UPDATE client SET password_hash") and params[2] == marker
+    assert auth.verify_password("new password", params[0])
+
+
+def test_expired_reset_code_is_rejected(monkeypatch):
+    monkeypatch.setenv("AUTH_RESET_TTL", "-1")
+    code, marker = auth.new_reset_code()
+    assert not auth._reset_code_matches(marker, code)
+
+
+def test_resume_code_is_redeemed_once():
+    code = auth.issue_resume_code("token")
+    assert auth.redeem_resume_code(code) == "token"
+    assert auth.redeem_resume_code(code) is None
+    revoked = auth.issue_resume_code("token")
+    auth.revoke_resume_code(revoked)
+    assert auth.redeem_resume_code(revoked) is None
@@ -0,0 +1,75 @@
+import io
+
+import pytest
+
+import bulk_import
+
+
+@pytest.mark.parametrize("row, reason", [
+    ({'name': "", 'email': "a@example.com"}, "missing name"),
+    ({'name': "x" * 256, 'email': "a@example.com"}, "name too long"),
+    ({'name': "Ann", 'email': "not-an-email"}, "invalid email"),
+    ({'name': "Ann", 'email': "a@example.com", 'phone': "12ab"}, "invalid phone"),
+    ({'name': "Ann", 'email': "a@example.com", 'rating': "great"}, "invalid rating"),
+    ({'name': "Ann", 'email': "a@example.com", 'rating': "7"}, "rating out of range"),
+])
+def test_validate_rejects_freelancer_rows(row, reason):
+    assert bulk_import.validate("freelancer", row) == (None, reason)
+
+
+def test_validate_normalizes_freelancer_row():
+    values, reason = bulk_import.validate("freelancer", {
+        'name': " Ann ", 'email': "Ann@Example.COM", 'phone': "+1 (555) 123-4567",
+        'skills': "Python, SQL", 'rating': "4.5", 'is_available': "no",
+    })
+    assert reason is None
+    assert values == ("Ann", "ann@example.com", "+15551234567", "Python, SQL", 4.5, 0)
+
+
+def test_validate_client_posted_jobs():
+    assert bulk_import.validate("client", {'name': "Co", 'email': "c@example.com", 'posted_jobs': "x"}) == \
+        (None, "invalid posted_jobs")
+    values, _ = bulk_import.validate("client", {'name': "Co", 'email': "c@example.com", 'posted_jobs': "3.0"})
+    assert values == ("Co", "c@example.com", None, None, 3)
+
+
+def test_read_csv_positions_follow_records_not_lines():
+    text = 'name,email\n"Ann\nSmith",ann@example.com\nBob,bob@example.com\n\nCid,cid@example.com\n'
+    chunks = list(bulk_import.read_csv(io.BytesIO(text.encode()), chunk_size=2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    positions = [position for chunk in chunks for position, _ in chunk]
+    # Ann's quoted name spans lines 2-3 and the blank line 5 is skipped
+    assert positions == [{'record': 1, 'line': 3}, {'record': 2, 'line': 4}, {'record': 3, 'line': 6}]
+    assert chunks[0][0][1]['name'] == "Ann\nSmith"
+
+
+def test_read_parquet_positions_have_no_lines(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    path = tmp_path / "users.parquet"
+    pq.write_table(pa.table({'name': ["A", "B", "C"], 'email': ["a@x.io", "b@x.io", "c@x.io"]}), path)
+    positions = [position for chunk in bulk_import.read_parquet(str(path), 2) for position, _ in chunk]
+    assert positions == [{'record': n, 'line': None} for n in (1, 2, 3)]
+
+
+def test_rejects_are_capped_and_counted(fake_db):
+    rows = "".join(f"User {n},bad-email-{n}\n" for n in range(10))
+    chunks = bulk_import.read_csv(io.StringIO("name,email\n" + rows), 4)
+    report = bulk_import.BulkImporter("client", 4, max_rejects=3).run(chunks)
+    assert report['processed'] == 10
+    assert report['rejected'] == 10
+    assert len(report['rejects']) == 3
+    assert report['rejects_dropped'] == 7
+    assert report['rejects'][0] == {'record': 1, 'line': 2, 'email': "bad-email-0", 'reason': "invalid email"}
+
+
+def test_duplicate_email_in_file_is_rejected_and_others_get_reset_codes(fake_db):
+    text = "name,email\nAnn,ann@example.com\nAnn again,ANN@example.com\nBob,bob@example.com\n"
+    report = bulk_import.BulkImporter("client", 10).run(bulk_import.read_csv(io.StringIO(text), 10))
+    assert report['inserted'] == 2
+    assert [(r['record'], r['reason']) for r in report['rejects']] == [(2, "duplicate email in file")]
+    assert [entry['email'] for entry in report['reset_codes']] == ["ann@example.com", "bob@example.com"]
+    inserted = fake_db.cursor().executed[-1][1]
+    # No account is imported with a usable password, only a reset marker
+    assert all(values[-1].startswith("reset$") for values in inserted)
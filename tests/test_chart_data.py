@@ -0,0 +1,53 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import activity_rollups
+import chart_data
+from conftest import FakeCursor
+
+
+@pytest.mark.parametrize("buckets, limit, step", [
+    (48, 200, 1), (200, 200, 1), (201, 200, 2), (365, 200, 2), (365, 100, 4), (0, 200, 1),
+])
+def test_step_for_keeps_series_within_limit(buckets, limit, step):
+    assert chart_data.step_for(buckets, limit) == step
+    assert -(-buckets // step) <= limit
+
+
+def test_step_for_defaults_to_chart_max_points(monkeypatch):
+    monkeypatch.setenv("CHART_MAX_POINTS", "10")
+    assert chart_data.step_for(365) == 37
+
+
+def _row(bucket_start, **metrics):
+    return {'bucket_start': bucket_start, 'avg_rating': metrics.pop('avg_rating', None),
+            **{metric: metrics.get(metric, 0) for metric in activity_rollups.METRICS}}
+
+
+def test_activity_series_fills_every_bucket(fake_db, monkeypatch):
+    now = datetime(2026, 3, 10, 15, 42)
+    since = activity_rollups.window_start('hour', 6, now)
+    assert since == datetime(2026, 3, 10, 10)
+    monkeypatch.setattr(activity_rollups, "window_start", lambda bucket, buckets, now=None: since)
+    fake_db._cursor = FakeCursor([_row(since + timedelta(hours=2), jobs_posted=3, avg_rating=4.5)])
+
+    series = chart_data.activity_series('hour', 6, limit=200)
+    assert series['step'] == 1
+    assert series['x'] == [since + timedelta(hours=n) for n in range(6)]
+    assert series['jobs_posted'] == [0.0, 0.0, 3.0, 0.0, 0.0, 0.0]
+    assert series['avg_rating'] == [None, None, 4.5, None, None, None]
+
+
+def test_activity_series_downsampled_points_start_on_group_boundaries(fake_db, monkeypatch):
+    since = activity_rollups.window_start('day', 10, datetime(2026, 3, 10, 8))
+    monkeypatch.setattr(activity_rollups, "window_start", lambda bucket, buckets, now=None: since)
+    # With step 4 the query numbers the groups; group 1 covers days 4-7 of the window
+    fake_db._cursor = FakeCursor([_row(1, proposals=7)])
+
+    series = chart_data.activity_series('day', 10, limit=3)
+    assert series['step'] == 4
+    assert series['x'] == [since, since + timedelta(days=4), since + timedelta(days=8)]
+    assert series['proposals'] == [0.0, 7.0, 0.0]
+    statement, params = fake_db._cursor.executed[0]
+    assert "TIMESTAMPDIFF(DAY" in statement and params[:2] == (since, 4)
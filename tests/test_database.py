@@ -0,0 +1,40 @@
+import database
+
+
+class FakePool:
+    def __init__(self):
+        self.connection = object()
+
+    def get_connection(self):
+        return self.connection
+
+
+def test_reads_stay_on_the_primary_after_a_write_on_another_replica(store, monkeypatch):
+    primary = FakePool()
+    monkeypatch.setattr(database, "get_pool", lambda *args: primary)
+    writer = database.ReplicaRouter([], sticky_window=60)
+    writer.replicas = ["replica"]  # only checked for presence before the reads are routed
+    reader = database.ReplicaRouter([], sticky_window=60)
+    reader.replicas = ["replica"]
+
+    writer.note_writes(["client:7"])
+
+    assert reader.connection(tags=("client:7",)) is primary.connection
+    assert reader._counters['sticky_reads'] == 1
+
+
+def test_writes_are_forgotten_after_the_window(store):
+    router = database.ReplicaRouter([], sticky_window=60)
+    router.replicas = ["replica"]
+    router.note_writes(["job:3"])
+    assert router._recently_written(("job:3",))
+    assert not router._recently_written(("job:4",))
+
+    store.set("written:job:3", store.get("written:job:3") - 61)
+    assert not router._recently_written(("job:3",))
+
+
+def test_no_write_times_are_kept_without_replicas(store):
+    router = database.ReplicaRouter([])
+    router.note_writes(["client:7"])
+    assert store.get("written:client:7") is None
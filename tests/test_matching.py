@@ -0,0 +1,101 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import matching
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """ Replace the bulk load; each call returns the next item of .results (an exception is raised). """
+    monkeypatch.setattr(matching, "_engine", {'engine': None, 'built_at': 0.0, 'version': 0, 'built_version': 0,
+                                               'rebuilding': False, 'failures': 0, 'failed_at': 0.0, 'error': None})
+    monkeypatch.setenv("MATCHING_RETRY_BACKOFF", "60")
+
+    class Loads:
+        results = []
+        calls = 0
+
+    def load(**kwargs):
+        Loads.calls += 1
+        result = Loads.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(matching.MatchingEngine, "load", staticmethod(load))
+    return Loads
+
+
+def _wait_for_rebuild():
+    for _ in range(100):
+        if not matching._engine['rebuilding']:
+            return
+        time.sleep(0.01)
+
+
+def test_invalidated_engine_is_served_while_rebuilt(loads):
+    loads.results = ["first", "second"]
+    assert matching.get_engine() == "first"
+    matching.invalidate()
+    assert matching.get_engine() == "first"
+    _wait_for_rebuild()
+    assert matching.get_engine() == "second"
+    assert loads.calls == 2
+
+
+def test_failed_rebuild_backs_off(loads):
+    loads.results = ["first", RuntimeError("database down")]
+    matching.get_engine()
+    matching.invalidate()
+    matching.get_engine()
+    _wait_for_rebuild()
+    # Still stale, but within the backoff: no new load is started
+    for _ in range(5):
+        assert matching.get_engine() == "first"
+    assert loads.calls == 2
+    assert matching._engine['failures'] == 1
+
+
+def test_first_build_failure_is_not_retried_on_every_call(loads):
+    error = RuntimeError("database down")
+    loads.results = [error]
+    with pytest.raises(RuntimeError):
+        matching.get_engine()
+    with pytest.raises(RuntimeError):
+        matching.get_engine()
+    assert loads.calls == 1
+
+
+def test_first_build_does_not_block_the_engine_lock(loads, monkeypatch):
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load(**kwargs):
+        started.set()
+        release.wait(5)
+        return "engine"
+
+    monkeypatch.setattr(matching.MatchingEngine, "load", staticmethod(slow_load))
+    builder = threading.Thread(target=matching.get_engine)
+    builder.start()
+    started.wait(5)
+    # invalidate() needs the engine lock; it must not wait for the build
+    assert matching._engine_lock.acquire(timeout=1)
+    matching._engine_lock.release()
+    release.set()
+    builder.join()
+    assert matching.get_engine() == "engine"
+
+
+def test_engine_ranks_by_skill_overlap():
+    engine = matching.MatchingEngine(
+        freelancer_ids=[10, 11], freelancer_tags=np.array([[1, 1, 0], [0, 0, 1]]),
+        ratings=[4.0, 4.0], available=[True, True], avg_rates=[50.0, 50.0],
+        job_ids=[1], job_tags=np.array([[1, 1, 0]]), budgets=[100.0],
+    )
+    ranked = engine.recommend_freelancers(1, k=2)
+    assert [freelancer for freelancer, _ in ranked] == [10, 11]
+    assert engine.recommend_jobs(10, k=1)[0][0] == 1
+    assert engine.recommend_freelancers(99) == []
@@ -0,0 +1,32 @@
+import notifications
+from conftest import FakeCursor
+
+
+def test_rows_that_used_up_their_attempts_are_failed_instead_of_claimed(fake_db):
+    fake_db._cursor = FakeCursor(rows=[
+        {'id': 1, 'recipient_type': 'client', 'recipient_id': 4, 'title': "t", 'message': "m", 'attempts': 0},
+        {'id': 2, 'recipient_type': 'client', 'recipient_id': 4, 'title': "t", 'message': "m", 'attempts': 5},
+    ])
+    dispatcher = notifications.NotificationDispatcher(notifications.inbox_channel, max_attempts=5)
+
+    batch = dispatcher.claim()
+
+    assert [(row['id'], row['attempts']) for row in batch] == [(1, 1)]
+    statements = [(" ".join(statement.split()), params) for statement, params in fake_db._cursor.executed[1:]]
+    assert statements[0][0].startswith("UPDATE notification_outbox SET status = 'Failed'")
+    assert statements[0][1] == (2,)
+    assert "attempts = attempts + 1" in statements[1][0]
+    assert statements[1][1] == (120, 1)
+
+
+def test_prune_deletes_in_batches_until_a_short_one(fake_db):
+    counts = iter([3, 3, 1])
+
+    def execute(statement, params=None):
+        fake_db._cursor.executed.append((statement, params))
+        fake_db._cursor.rowcount = next(counts)
+    fake_db._cursor.execute = execute
+
+    assert notifications.prune(retention_days=30, batch_size=3) == 7
+    assert len(fake_db._cursor.executed) == 3
+    assert fake_db.commits == 3
@@ -0,0 +1,76 @@
+import pytest
+
+import read_cache
+from conftest import FakeCursor
+
+
+def test_invalidate_drops_only_entries_with_the_tag():
+    cache = read_cache.ReadCache()
+    cache.get_or_load("jobs", [read_cache.OPEN_JOBS], lambda: ["job 1"])
+    cache.get_or_load("client 7", [read_cache.client(7)], lambda: ["client 7"])
+
+    cache.invalidate(read_cache.client(7))
+    assert cache.get("jobs") == (True, ["job 1"])
+    assert cache.get("client 7") == (False, None)
+    assert cache.get_or_load("client 7", [read_cache.client(7)], lambda: ["reloaded"]) == ["reloaded"]
+
+
+def test_load_racing_an_invalidation_is_not_cached():
+    cache = read_cache.ReadCache()
+
+    def load():
+        # A write to the same entity commits while the rows are being read
+        cache.invalidate(read_cache.job(3))
+        return ["stale"]
+
+    assert cache.get_or_load("job 3", [read_cache.job(3)], load) == ["stale"]
+    assert cache.get("job 3") == (False, None)
+
+
+def test_entry_limit_evicts_least_recently_used():
+    cache = read_cache.ReadCache(max_entries=2)
+    for key in ("a", "b"):
+        cache.get_or_load(key, [], lambda key=key: key)
+    cache.get("a")
+    cache.get_or_load("c", [], lambda: "c")
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "a")
+    assert cache.stats()['evictions'] == 1
+
+
+def test_expired_entries_are_reloaded():
+    cache = read_cache.ReadCache(ttl=-1)
+    cache.get_or_load("a", [], lambda: "old")
+    assert cache.get_or_load("a", [], lambda: "new") == "new"
+
+
+@pytest.mark.parametrize("row", [(5, 9, 2), {'job_id': 5, 'freelancer_id': 9, 'client_id': 2}])
+def test_proposal_tags_name_job_freelancer_and_client(row):
+    tags = read_cache.proposal_tags(FakeCursor([row]), 11)
+    assert tags == [read_cache.job(5), read_cache.freelancer(9), read_cache.client(2)]
+
+
+def test_invalidations_reach_other_replicas_through_a_shared_store(store, monkeypatch):
+    store.shared = True
+    monkeypatch.setattr(read_cache, "cache", read_cache.ReadCache())
+    monkeypatch.setattr(read_cache, "_sync", {'seen': None, 'checked_at': 0.0, 'published': set()})
+    monkeypatch.setenv("READ_CACHE_SYNC_INTERVAL", "0")
+
+    read_cache.cached("client", (7,), [read_cache.client(7)], lambda: "before")
+    # Another replica writes and publishes; it is not this process's own invalidation
+    sequence = store.incr("read_cache:invalidations")
+    store.set(f"read_cache:invalidation:{sequence}", [["client", 7]])
+
+    assert read_cache.cached("client", (7,), [read_cache.client(7)], lambda: "after") == "after"
+
+
+def test_missing_invalidation_log_clears_the_cache(store, monkeypatch):
+    store.shared = True
+    monkeypatch.setattr(read_cache, "cache", read_cache.ReadCache())
+    monkeypatch.setattr(read_cache, "_sync", {'seen': None, 'checked_at': 0.0, 'published': set()})
+    monkeypatch.setenv("READ_CACHE_SYNC_INTERVAL", "0")
+
+    read_cache.cached("jobs", (), [read_cache.OPEN_JOBS], lambda: "before")
+    # The invalidation expired before this replica looked: it cannot know what changed
+    store.incr("read_cache:invalidations")
+    assert read_cache.cached("jobs", (), [read_cache.OPEN_JOBS], lambda: "after") == "after"
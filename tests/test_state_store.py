@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import state_store
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return state_store.MemoryStore()
+    if request.param == "sqlite":
+        return state_store.from_url(f"sqlite:///{tmp_path / 'state.db'}")
+    # Redis is only exercised against a server named by TEST_REDIS_URL (it gets flushed)
+    url = os.environ.get("TEST_REDIS_URL")
+    if not url:
+        pytest.skip("set TEST_REDIS_URL to test the Redis store")
+    store = state_store.from_url(url)
+    store._redis.flushdb()
+    return store
+
+
+def test_values_round_trip_as_json(backend):
+    backend.set("session:1", {'user_id': 7, 'tags': ["a", "b"]})
+    assert backend.get("session:1") == {'user_id': 7, 'tags': ["a", "b"]}
+    backend.delete("session:1")
+    assert backend.get("session:1") is None
+
+
+def test_keys_expire(backend):
+    backend.set("short", 1, ttl=1)
+    backend.set("long", 1, ttl=60)
+    assert backend.ttl("long") == pytest.approx(60, abs=1)
+    assert backend.ttl("missing") is None
+    time.sleep(1.2)
+    assert backend.get("short") is None
+    assert backend.get("long") == 1
+
+
+def test_incr_creates_then_counts(backend):
+    assert backend.incr("counter", ttl=60) == 1
+    assert backend.incr("counter", ttl=60) == 2
+    assert backend.get("counter") == 2
+    # The time to live is set when the key is created and not pushed back by later increments
+    assert backend.ttl("counter") <= 60
+
+
+def test_incr_restarts_after_expiry(backend):
+    backend.incr("window", ttl=1)
+    time.sleep(1.2)
+    assert backend.incr("window", ttl=1) == 1
+
+
+def test_concurrent_increments_are_not_lost(backend):
+    with ThreadPoolExecutor(8) as executor:
+        values = list(executor.map(lambda _: backend.incr("hits"), range(200)))
+    assert sorted(values) == list(range(1, 201))
+
+
+def test_shared_flag_tells_process_local_from_shared_backends(tmp_path):
+    assert not state_store.MemoryStore().shared
+    assert state_store.from_url(f"sqlite:///{tmp_path / 's.db'}").shared
+
+
+def test_unknown_url_is_rejected():
+    with pytest.raises(ValueError):
+        state_store.from_url("postgres://db")
+
+
+def test_sqlite_store_is_shared_between_connections(tmp_path):
+    path = f"sqlite:///{tmp_path / 'state.db'}"
+    first, second = state_store.from_url(path), state_store.from_url(path)
+    first.set("invalidation", [["client", 7]])
+    result = []
+    thread = threading.Thread(target=lambda: result.append(second.get("invalidation")))
+    thread.start()
+    thread.join()
+    assert result == [[["client", 7]]]
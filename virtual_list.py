@@ -0,0 +1,64 @@
+import streamlit as st
+
+# Long lists used to emit several Streamlit elements per row (subheader, writes, buttons,
+# sliders), so a few thousand rows meant tens of thousands of widgets per rerun. render()
+# shows rows as a single table instead, sends only the visible window of rows to the
+# browser, and builds widgets only for the row the user selected. Detail that is expensive
+# to load (full cover letters, review text, job descriptions) is fetched in detail(row),
+# which runs for the selected row only.
+
+
+def _offset(key, total, window):
+    offset = st.session_state.get(f"{key}_offset", 0)
+    if offset >= total:
+        # The list shrank (e.g. rows were accepted or filtered away): jump to its last window
+        offset = max(0, (total - 1) // window * window)
+    st.session_state[f"{key}_offset"] = offset
+    return offset
+
+
+def window_controls(key, offset, total, window):
+    if total <= window:
+        return
+    prev_col, range_col, next_col = st.columns([1, 2, 1])
+    if offset > 0 and prev_col.button("Previous", key=f"{key}_window_prev"):
+        st.session_state[f"{key}_offset"] = max(0, offset - window)
+        st.rerun()
+    range_col.write(f"Rows {offset + 1}–{min(offset + window, total)} of {total}")
+    if offset + window < total and next_col.button("Next", key=f"{key}_window_next"):
+        st.session_state[f"{key}_offset"] = offset + window
+        st.rerun()
+
+
+def render(key, rows, columns, detail=None, window=25, column_config=None, row_id='id'):
+    """ Show rows as one selectable table, `window` rows at a time; returns the selected row or None.
+
+    columns maps row keys to column labels and row_id names the key that identifies a row.
+    When a row is selected, detail(row) is called to render its full content and per-row
+    actions below the table.
+    """
+    total = len(rows)
+    if not total:
+        return None
+    # Imported here so the apps' login pages, which render no lists, start without pandas
+    import pandas as pd
+
+    offset = _offset(key, total, window)
+    visible = rows[offset:offset + window]
+
+    frame = pd.DataFrame(visible, columns=list(columns)).rename(columns=columns)
+    config = {columns[name]: value for name, value in (column_config or {}).items()}
+    # The table key follows the visible rows, so a selection never carries over to a different
+    # row when the window moves or the underlying page changes
+    table_key = f"{key}_table_{hash(tuple(row[row_id] for row in visible))}"
+    event = st.dataframe(frame, key=table_key, hide_index=True, use_container_width=True,
+                         column_config=config,
+                         on_select="rerun" if detail else "ignore", selection_mode="single-row")
+    window_controls(key, offset, total, window)
+
+    if detail is None or not event.selection.rows:
+        return None
+    row = visible[event.selection.rows[0]]
+    with st.container(border=True):
+        detail(row)
+    return row